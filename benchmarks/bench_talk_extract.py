@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "retreive_data"))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from fetch_conference_talks import (  # noqa: E402
+    extract_initial_state,
+    extract_talk_links,
+    make_soup,
+    parse_talk_page_bs4,
+    parse_talk_page_lxml,
+)
+
+"""
+Per-page CPU cost of talk extraction on the saved fixture pages.
+
+    before: regex/html.parser __INITIAL_STATE__ lookup + BeautifulSoup(lxml) tree
+    after:  parse_talk_page_lxml (one lxml tree for everything)
+
+Also times overview-page parsing with html5lib (old get_soup_overview) against
+make_soup. Both extractors must produce identical records.
+"""
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def load_pages() -> list[tuple[str, str]]:
+    index = json.loads((FIXTURES / "talk_pages.json").read_text(encoding="utf-8"))
+    return [(url, (FIXTURES / name).read_text(encoding="utf-8")) for name, url in index.items()]
+
+
+def before(url: str, html: str) -> dict:
+    return parse_talk_page_bs4(url, html, extract_initial_state(html, url))
+
+
+def after(url: str, html: str) -> dict:
+    return parse_talk_page_lxml(url, html)
+
+
+def cpu_ms_per_call(fn, args_list, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        for args in args_list:
+            fn(*args)
+    return (time.process_time() - start) * 1000 / (repeat * len(args_list))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark talk page extraction")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    pages = load_pages()
+    for url, html in pages:
+        if before(url, html) != after(url, html):
+            raise SystemExit(f"Extractors disagree on {url}")
+
+    results = {
+        "talk_page_before_ms": cpu_ms_per_call(before, pages, args.repeat),
+        "talk_page_after_ms": cpu_ms_per_call(after, pages, args.repeat),
+        "overview_html5lib_ms": cpu_ms_per_call(
+            lambda html: extract_talk_links(BeautifulSoup(html, "html5lib")), [(h,) for _, h in pages], args.repeat
+        ),
+        "overview_lxml_ms": cpu_ms_per_call(
+            lambda html: extract_talk_links(make_soup(html)), [(h,) for _, h in pages], args.repeat
+        ),
+    }
+    for name, value in results.items():
+        print(f"{name:<24} {value:8.2f} ms/page")
+    print(f"talk extraction speed-up: {results['talk_page_before_ms'] / results['talk_page_after_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "retreive_data"))
+sys.path.insert(0, str(ROOT / "process_data"))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import fetch_conference_talks  # noqa: E402
+import scripture_refs  # noqa: E402
+import scrape_tg_and_bd  # noqa: E402
+from bench_talk_extract import FIXTURES, after, before, cpu_ms_per_call, load_pages  # noqa: E402
+from chapter_nav import ChapterNav, build_nav, read_range  # noqa: E402
+from citation_graph import CitationGraph, build_graph  # noqa: E402
+from corpus_store import Corpus, build_corpus  # noqa: E402
+from fetch_conference_talks import extract_talk_links, make_soup  # noqa: E402
+from footnote_edges import Ref, build_edges, parse_footnote, ref_label  # noqa: E402
+from graph_rag import GraphRetriever  # noqa: E402
+from near_duplicates import NearDuplicates, build_near_duplicates  # noqa: E402
+from quote_detector import QuoteIndex, build_quote_index, scan_talks  # noqa: E402
+from search_index import SearchIndex, build_index, iter_documents  # noqa: E402
+from span_index import SpanIndex, build_spans, render_chapter  # noqa: E402
+
+"""
+Benchmark harness for the scraping, parsing, indexing and query paths.
+
+Every benchmark writes a flat dict of numbers; the whole run is saved as JSON
+(``benchmarks/results/<timestamp>.json`` by default) together with the git
+commit, Python version and machine, so two runs can be compared:
+
+    python benchmarks/run_benchmarks.py                         # everything
+    python benchmarks/run_benchmarks.py --only uri_parse search_query
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/old.json
+
+Metric names carry their unit and direction: ``*_ms`` / ``*_s`` are lower is
+better, ``*_per_s`` higher is better; anything else is informational.
+``--compare`` flags metrics that got worse by more than ``--threshold`` and
+``--fail-on-regression`` turns that into a non-zero exit code.
+
+Inputs are the checked-in fixtures (talk pages, scripture URIs and verse
+footnotes with their expected parses, query lists), the scripture chapters under ``data/``
+and generated talks quoting randomly chosen verses, for quotation recall.
+Scraping runs against a local HTTP server that serves the fixture pages with
+an artificial per-request latency, so worker counts can be compared offline.
+Build artifacts go to a temporary directory; nothing under ``data/build`` is
+touched.
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+DATA_DIR = ROOT / "data"
+
+DEFAULT_REPEAT = 20
+DEFAULT_THRESHOLD = 0.10        # 10 % slower counts as a regression
+SCRAPE_PAGES = 60               # talk URLs served by the local server
+SCRAPE_LATENCY_MS = 25.0
+SCRAPE_WORKERS = [1, 4, 10, 16]
+
+BENCHMARKS: Dict[str, Callable[["Context"], Dict[str, float]]] = {}
+
+
+def benchmark(name: str):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+class Context:
+    """Shared inputs and lazily built artifacts, so benchmarks can run in any subset."""
+
+    def __init__(self, repeat: int, workdir: Path):
+        self.repeat = repeat
+        self.workdir = workdir
+        self.pages = load_pages()
+        self.queries = json.loads((FIXTURES / "queries.json").read_text(encoding="utf-8"))
+        self._talks_path: Optional[Path] = None
+        self._corpus_path: Optional[Path] = None
+        self._index_path: Optional[Path] = None
+        self._graph_path: Optional[Path] = None
+        self._quoting_talks = None
+
+    @property
+    def talks_path(self) -> Path:
+        """Fixture talks as JSONL (parsed once from the fixture pages)."""
+        if self._talks_path is None:
+            self._talks_path = self.workdir / "talks.jsonl"
+            with self._talks_path.open("w", encoding="utf-8") as fp:
+                for url, html in self.pages:
+                    fp.write(json.dumps(after(url, html), ensure_ascii=False) + "\n")
+        return self._talks_path
+
+    @property
+    def corpus_path(self) -> Path:
+        if self._corpus_path is None:
+            self._corpus_path = self.workdir / "corpus.bin"
+            build_corpus(DATA_DIR, self._corpus_path)
+        return self._corpus_path
+
+    @property
+    def index_path(self) -> Path:
+        if self._index_path is None:
+            self._index_path = self.workdir / "search_index.bin"
+            build_index(self.documents(), self._index_path)
+        return self._index_path
+
+    @property
+    def graph_path(self) -> Path:
+        if self._graph_path is None:
+            self._graph_path = self.workdir / "citation_graph.bin"
+            build_graph(DATA_DIR, self.talks_path, self._graph_path, corpus_path=self.corpus_path)
+        return self._graph_path
+
+    @property
+    def quoting_talks(self):
+        """Talks of one paragraph quoting two random verses each: ``(path, (n, 2) verse IDs)``."""
+        if self._quoting_talks is None:
+            rng = np.random.default_rng(0)
+            path = self.workdir / "quoting_talks.jsonl"
+            with Corpus(self.corpus_path) as corpus, path.open("w", encoding="utf-8") as fp:
+                planted = rng.choice(len(corpus), size=(200, 2), replace=False)
+                for i, (a, b) in enumerate(planted.tolist()):
+                    text = f"As we read in the scriptures, {corpus.verse_text(a)} I testify that {corpus.verse_text(b)}"
+                    para = {"paragraph_number": 1, "paragraph": text}
+                    fp.write(json.dumps({"url": f"planted/{i}", "content": [para]}) + "\n")
+            self._quoting_talks = (path, planted)
+        return self._quoting_talks
+
+    def documents(self):
+        return iter_documents(DATA_DIR, self.talks_path, corpus_path=self.corpus_path)
+
+# ---------------------------------------------------------------------------
+# Timing helpers
+# ---------------------------------------------------------------------------
+
+def latency_percentiles(fn, args_list, repeat: int, prefix: str = "") -> Dict[str, float]:
+    """Wall-clock latency of each call as ``p50/p90/p99/mean`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            fn(*args)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples = np.asarray(samples)
+    return {
+        f"{prefix}p50_ms": float(np.percentile(samples, 50)),
+        f"{prefix}p90_ms": float(np.percentile(samples, 90)),
+        f"{prefix}p99_ms": float(np.percentile(samples, 99)),
+        f"{prefix}mean_ms": float(samples.mean()),
+    }
+
+# ---------------------------------------------------------------------------
+# Scraping and parsing
+# ---------------------------------------------------------------------------
+
+@benchmark("talk_extract")
+def bench_talk_extract(ctx: Context) -> Dict[str, float]:
+    """Per-page CPU cost of talk extraction (lxml path vs the BeautifulSoup one)."""
+    for url, html in ctx.pages:
+        if before(url, html) != after(url, html):
+            raise RuntimeError(f"Extractors disagree on {url}")
+    return {
+        "pages": len(ctx.pages),
+        "lxml_ms": cpu_ms_per_call(after, ctx.pages, ctx.repeat),
+        "bs4_ms": cpu_ms_per_call(before, ctx.pages, ctx.repeat),
+    }
+
+
+@benchmark("overview_parse")
+def bench_overview_parse(ctx: Context) -> Dict[str, float]:
+    """Link extraction from a page: make_soup (lxml) vs the old html5lib tree."""
+    pages = [(html,) for _url, html in ctx.pages]
+    return {
+        "lxml_ms": cpu_ms_per_call(lambda html: extract_talk_links(make_soup(html)), pages, ctx.repeat),
+        "html5lib_ms": cpu_ms_per_call(
+            lambda html: extract_talk_links(BeautifulSoup(html, "html5lib")), pages, max(1, ctx.repeat // 4)
+        ),
+    }
+
+
+@benchmark("uri_parse")
+def bench_uri_parse(ctx: Context) -> Dict[str, float]:
+    """parse_scripture_uri throughput on the fixture URIs, checked against the stored labels."""
+    rows = json.loads((FIXTURES / "scripture_uris.json").read_text(encoding="utf-8"))
+    uris = [row["uri"] for row in rows]
+    mismatches = sum(fetch_conference_talks.parse_scripture_uri(row["uri"]) != row["label"] for row in rows)
+
+    def throughput(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(ctx.repeat):
+            scripture_refs.lookup_book.cache_clear()
+            for uri in uris:
+                fn(uri)
+        return ctx.repeat * len(uris) / (time.perf_counter() - start)
+
+    return {
+        "uris": len(uris),
+        "mismatches": mismatches,
+        "talks_per_s": throughput(fetch_conference_talks.parse_scripture_uri),
+        "tg_bd_per_s": throughput(scrape_tg_and_bd.parse_scripture_uri),
+    }
+
+
+@benchmark("footnote_parse")
+def bench_footnote_parse(ctx: Context) -> Dict[str, float]:
+    """Footnote parser: fixture correctness, uncached strings/s and the full edge-list build."""
+    rows = json.loads((FIXTURES / "footnotes.json").read_text(encoding="utf-8"))
+    mismatches = 0
+    for row in rows:
+        links, _unparsed = parse_footnote(row["footnote"])
+        got = [[kind, ref_label(t) if isinstance(t, Ref) else t] for kind, t in links]
+        mismatches += got != row["links"]
+
+    notes = [row["footnote"] for row in rows]
+    start = time.perf_counter()
+    for _ in range(ctx.repeat):
+        parse_footnote.cache_clear()
+        for note in notes:
+            parse_footnote(note)
+    per_s = ctx.repeat * len(notes) / (time.perf_counter() - start)
+
+    results = {"footnotes": len(rows), "mismatches": mismatches, "fixture_per_s": per_s}
+    for workers in sorted({1, os.cpu_count() or 1}):
+        parse_footnote.cache_clear()
+        start = time.perf_counter()
+        header = build_edges(DATA_DIR, ctx.workdir / "footnote_edges.bin", workers)
+        results[f"build_workers_{workers}_s"] = time.perf_counter() - start
+    results["corpus_footnotes"] = header["n_notes"]
+    results["edges"] = sum(header["n_edges"].values())
+    results["unparsed_parts"] = header["unparsed_parts"]
+    return results
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    pages: List[bytes] = []
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = self.pages[int(self.path.rsplit("/", 1)[-1]) % len(self.pages)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@benchmark("scrape")
+def bench_scrape(ctx: Context) -> Dict[str, float]:
+    """Fetch + parse of talk pages from a local server, per worker count."""
+    handler = type("Handler", (_FixtureHandler,), {
+        "pages": [html.encode("utf-8") for _url, html in ctx.pages],
+        "latency": SCRAPE_LATENCY_MS / 1000,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/talk"
+    urls = [f"{base}/{i}" for i in range(SCRAPE_PAGES)]
+    results: Dict[str, float] = {"pages": SCRAPE_PAGES, "latency_ms": SCRAPE_LATENCY_MS}
+    try:
+        for workers in SCRAPE_WORKERS:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                talks = [t for t in executor.map(fetch_conference_talks.scrape_talk_data, urls) if t]
+            elapsed = time.perf_counter() - start
+            if len(talks) != SCRAPE_PAGES:
+                raise RuntimeError(f"Scraped {len(talks)} of {SCRAPE_PAGES} pages with {workers} workers")
+            results[f"workers_{workers}_pages_per_s"] = SCRAPE_PAGES / elapsed
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+# ---------------------------------------------------------------------------
+# Corpus, indexes and queries
+# ---------------------------------------------------------------------------
+
+@benchmark("corpus_load")
+def bench_corpus_load(ctx: Context) -> Dict[str, float]:
+    """Pack the chapter JSON into the corpus file, then open it and read every verse."""
+    start = time.perf_counter()
+    header = build_corpus(DATA_DIR, ctx.workdir / "corpus_bench.bin")
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with Corpus(ctx.workdir / "corpus_bench.bin") as corpus:
+        open_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        chars = sum(len(text) for _verse_id, text in corpus.iter_verses())
+        scan_ms = (time.perf_counter() - start) * 1000
+    return {"verses": header["n_verses"], "chars": chars, "build_s": build_s, "open_ms": open_ms, "scan_ms": scan_ms}
+
+
+@benchmark("chapter_range")
+def bench_chapter_range(ctx: Context) -> Dict[str, float]:
+    """Reading-order range reads: one chapter span and the whole canon, batched vs chapter by chapter."""
+    start = time.perf_counter()
+    build_nav(DATA_DIR, ctx.workdir / "chapter_nav.bin")
+    results = {"build_s": time.perf_counter() - start}
+    with Corpus(ctx.corpus_path) as corpus, ChapterNav(ctx.workdir / "chapter_nav.bin") as nav:
+        alma = (nav.position("Alma 30"), nav.position("Alma 42"))
+        canon = ((0, None), (len(nav) - 1, None))
+
+        def drain(span, batch):
+            for _verse in read_range(corpus, nav, *span, batch=batch):
+                pass
+
+        results.update(latency_percentiles(drain, [(alma, 16)], ctx.repeat * 5, "alma_30_42_"))
+        results.update(latency_percentiles(drain, [(canon, 16)], ctx.repeat, "canon_"))
+        results.update(latency_percentiles(drain, [(canon, 1)], ctx.repeat, "canon_unbatched_"))
+    return results
+
+
+@benchmark("index_build")
+def bench_index_build(ctx: Context) -> Dict[str, float]:
+    """Full-text index and citation graph builds over the corpus plus the fixture talks."""
+    ctx.corpus_path  # built outside the timed region
+    start = time.perf_counter()
+    header = build_index(ctx.documents(), ctx.workdir / "search_index_bench.bin")
+    index_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    graph = build_graph(DATA_DIR, ctx.talks_path, ctx.workdir / "citation_graph_bench.bin", corpus_path=ctx.corpus_path)
+    graph_s = time.perf_counter() - start
+    return {
+        "docs": header["n_docs"],
+        "terms": header["n_terms"],
+        "search_index_s": index_s,
+        "graph_edges": sum(graph["n_edges"].values()),
+        "citation_graph_s": graph_s,
+    }
+
+
+@benchmark("spans")
+def bench_spans(ctx: Context) -> Dict[str, float]:
+    """Footnote / italic span index: build, covering-range lookups and chapter rendering."""
+    start = time.perf_counter()
+    build_spans(DATA_DIR, ctx.workdir / "spans.bin", ctx.workdir / "footnote_edges_spans.bin")
+    results = {"build_s": time.perf_counter() - start}
+    rng = np.random.default_rng(0)
+    with Corpus(ctx.corpus_path) as corpus, SpanIndex(ctx.workdir / "spans.bin") as spans:
+        lookups = [(int(v), int(a), int(a) + 20) for v, a in zip(rng.integers(0, len(corpus), 200), rng.integers(0, 200, 200))]
+        results.update(latency_percentiles(spans.covering, lookups, ctx.repeat, "covering_"))
+        chapters = [(corpus, spans, book_id, chapter, fmt)
+                    for book_id, chapter, _n in list(corpus.chapters())[::50] for fmt in ("html", "md")]
+        results.update(latency_percentiles(render_chapter, chapters, max(1, ctx.repeat // 4), "render_"))
+    return results
+
+
+@benchmark("near_duplicates")
+def bench_near_duplicates(ctx: Context) -> Dict[str, float]:
+    """MinHash / LSH build over the corpus plus talks quoting known verses, and quote recall."""
+    talks_path, planted = ctx.quoting_talks
+    out = ctx.workdir / "near_duplicates.bin"
+    start = time.perf_counter()
+    header = build_near_duplicates(DATA_DIR, talks_path, out, corpus_path=ctx.corpus_path)
+    results = {
+        "build_s": time.perf_counter() - start,
+        "docs": header["n_docs"],
+        "quotes": header["n_quotes"],
+        "duplicate_pairs": header["n_duplicate_pairs"],
+    }
+    with NearDuplicates(out) as nd:
+        first = header["n_docs"] - len(planted)  # one paragraph per planted talk, indexed last
+        found = sum(len(np.intersect1d(nd.quotes(first + i)[0], pair)) for i, pair in enumerate(planted))
+        results["planted_recall"] = found / planted.size
+        results.update(latency_percentiles(nd.quoted_by, [(int(v),) for v in planted[:, 0]], ctx.repeat, "quoted_by_"))
+    return results
+
+
+@benchmark("quote_scan")
+def bench_quote_scan(ctx: Context) -> Dict[str, float]:
+    """Verse-window index build, talk scan throughput and recall of the planted quotations."""
+    index_path = ctx.workdir / "quote_index.bin"
+    start = time.perf_counter()
+    header = build_quote_index(DATA_DIR, index_path, corpus_path=ctx.corpus_path)
+    results = {"build_s": time.perf_counter() - start, "windows": header["n_windows"]}
+
+    talks_path, planted = ctx.quoting_talks
+    talks = [json.loads(line) for line in talks_path.read_text(encoding="utf-8").splitlines()]
+    talks += [json.loads(line) for line in ctx.talks_path.read_text(encoding="utf-8").splitlines()]
+    paragraphs = sum(len(talk.get("content") or []) for talk in talks)
+    start = time.perf_counter()
+    for _ in range(ctx.repeat):
+        found = list(scan_talks(talks, index_path, workers=1))
+    results["paragraphs_per_s"] = ctx.repeat * paragraphs / (time.perf_counter() - start)
+    results["quotes"] = len(found)
+    hits = {(url, m.verse) for url, _n, m in found}
+    results["planted_recall"] = sum((f"planted/{i}", v) in hits for i, pair in enumerate(planted.tolist()) for v in pair) / planted.size
+    with QuoteIndex(index_path) as index:
+        texts = [([para["paragraph"] for para in talk.get("content") or []],) for talk in talks[-20:]]
+        results.update(latency_percentiles(index.find, texts, ctx.repeat, "talk_"))
+    return results
+
+
+@benchmark("search_query")
+def bench_search_query(ctx: Context) -> Dict[str, float]:
+    """BM25 query latency (keyword and phrase queries) on the full index."""
+    with SearchIndex(ctx.index_path) as index:
+        return latency_percentiles(index.search, [(q, 10) for q in ctx.queries["search"]], ctx.repeat)
+
+
+@benchmark("citation_query")
+def bench_citation_query(ctx: Context) -> Dict[str, float]:
+    """Reference resolution + "who cites this verse" lookups."""
+    with Corpus(ctx.corpus_path) as corpus, CitationGraph(ctx.graph_path) as graph:
+        verses = scripture_refs.VerseTable.from_corpus(corpus)
+
+        def cites(reference: str):
+            verses._cache.clear()
+            return [graph.citing(v) for v in verses.resolve(reference)]
+
+        return latency_percentiles(cites, [(r,) for r in ctx.queries["references"]], ctx.repeat)
+
+
+@benchmark("graph_rag")
+def bench_graph_rag(ctx: Context) -> Dict[str, float]:
+    """GraphRAG retrieval latency (keyword seeds, two hops, result cache disabled)."""
+    with Corpus(ctx.corpus_path) as corpus, CitationGraph(ctx.graph_path) as graph, SearchIndex(ctx.index_path) as index:
+        retriever = GraphRetriever(corpus, graph, index, None, DATA_DIR, ctx.talks_path, cache_size=0)
+        retriever.retrieve("warm up")  # loads the talk / entry text once
+        return latency_percentiles(
+            lambda q: retriever.retrieve(q, budget_ms=1e9), [(q,) for q in ctx.queries["graph_rag"]], ctx.repeat
+        )
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+def run_metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def lower_is_better(metric: str) -> Optional[bool]:
+    if metric.endswith("_per_s"):
+        return False
+    if metric.endswith(("_ms", "_s")):
+        return True
+    return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Print current vs baseline per metric; return the regressed ``bench.metric`` names.
+
+    The printed change is signed so that positive always means worse.
+    """
+    regressions = []
+    for bench, metrics in current["results"].items():
+        old_metrics = baseline.get("results", {}).get(bench, {})
+        for metric, value in metrics.items():
+            direction = lower_is_better(metric)
+            old = old_metrics.get(metric)
+            if direction is None or not old:
+                continue
+            change = (value - old) / old if direction else (old - value) / old
+            flag = "  REGRESSION" if change > threshold else ""
+            print(f"{bench + '.' + metric:<44} {old:12.3f} -> {value:12.3f}  ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(f"{bench}.{metric}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the benchmark suite and save the results as JSON")
+    ap.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run (default: all)")
+    ap.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    ap.add_argument("--out", type=Path, default=None, help="Result file (default: benchmarks/results/<timestamp>.json)")
+    ap.add_argument("--compare", type=Path, default=None, help="Baseline result file to compare against")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative slow-down that counts as a regression")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    report = {"meta": run_metadata(), "repeat": args.repeat, "results": {}}
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        ctx = Context(args.repeat, Path(workdir))
+        for name in args.only or BENCHMARKS:
+            start = time.perf_counter()
+            report["results"][name] = BENCHMARKS[name](ctx)
+            print(f"{name:<16} {time.perf_counter() - start:6.1f}s  {json.dumps(report['results'][name])}")
+
+    out = args.out or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wrote {out}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            if args.fail_on_regression:
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
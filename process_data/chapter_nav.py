@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from corpus_store import BUILD_DIR, DATA_DIR, PackedFile, iter_chapter_files, open_corpus, write_packed
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from scripture_refs import VerseTable, format_ref, parse_chapter_id, parse_reference  # noqa: E402
+
+"""
+Chapter navigation in reading order, from the ``prevChapterId`` /
+``nextChapterId`` links of the chapter JSON.
+
+Those links chain every chapter of the canon into one list (Genesis 1 ...
+Revelation 22, 1 Nephi 1 ... Moroni 10, D&C, Pearl of Great Price), which is
+not the volume order the corpus is packed in. :func:`build_nav` follows the
+chain once, checks that it is a single consistent list, and writes the
+ordinal of every chapter (``data/build/chapter_nav.bin``):
+
+    chapter_ids       chapter IDs in reading order ("genesis1", ...)
+    paths             chapter file, relative to the data directory
+    corpus_chapter    ordinal -> corpus chapter index
+    first_verse       ordinal -> first corpus verse ID
+    verse_count       ordinal -> verses in the chapter
+    verse_ordinal     prefix sums of verse_count (verses before each ordinal)
+
+:func:`read_range` streams the verses between two positions ("Alma 30" to
+"Alma 42", "Moroni 10:30" to "D&C 1:5") straight from the memory-mapped
+corpus: chapters are taken in batches, each batch is merged into contiguous
+corpus slices, and the next batch is prefetched (``madvise(WILLNEED)``)
+while the current one is being consumed. :func:`reading_plan` splits a range
+into portions with about the same number of verses.
+
+    python process_data/chapter_nav.py build
+    python process_data/chapter_nav.py read "Alma 30" "Alma 42"
+    python process_data/chapter_nav.py plan "Genesis 1" "Revelation 22" --days 365
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+NAV_PATH = BUILD_DIR / "chapter_nav.bin"
+READAHEAD_CHAPTERS = 16         # chapters decoded per batch; the next batch is prefetched
+
+MAGIC = b"DLNAVIG1"
+FORMAT_VERSION = 1
+
+# (ordinal, verse number or None for "whole chapter")
+Position = Tuple[int, Optional[int]]
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def build_nav(data_dir: Path = DATA_DIR, out_path: Path = NAV_PATH) -> dict:
+    """Follow the prev/next chapter links under *data_dir* and write the ordinal index."""
+    data_dir = Path(data_dir)
+    with open_corpus(data_dir=data_dir) as corpus:
+        verses = VerseTable.from_corpus(corpus)
+    nodes: Dict[str, dict] = {}
+    for ch, (_volume_id, book_id, chapter, path) in enumerate(iter_chapter_files(data_dir)):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        chapter_id = data["_id"]
+        if parse_chapter_id(chapter_id) != (book_id, chapter):
+            raise ValueError(f"{path} has chapter ID {chapter_id!r}, expected {book_id}{chapter}")
+        nodes[chapter_id] = {
+            "prev": data.get("prevChapterId") or None,
+            "next": data.get("nextChapterId") or None,
+            "path": path.relative_to(data_dir).as_posix(),
+            "corpus_chapter": ch,
+            "verses": verses.chapter_range(book_id, chapter),
+        }
+
+    # The head is the one chapter without a predecessor that links back to it.
+    heads = [cid for cid, node in nodes.items() if node["prev"] not in nodes or nodes[node["prev"]]["next"] != cid]
+    if len(heads) != 1:
+        raise ValueError(f"Expected one first chapter, found {len(heads)}: {heads[:5]}")
+    order: List[str] = []
+    seen = set()
+    cid: Optional[str] = heads[0]
+    while cid is not None:
+        if cid in seen:
+            raise ValueError(f"Chapter links loop back to {cid}")
+        seen.add(cid)
+        order.append(cid)
+        nxt = nodes[cid]["next"]
+        if nxt is not None and nxt not in nodes:
+            raise ValueError(f"{cid} links to unknown chapter {nxt!r}")
+        cid = nxt
+    if len(order) != len(nodes):
+        missing = sorted(set(nodes) - seen)
+        raise ValueError(f"{len(missing)} chapters are not on the chain, e.g. {missing[:5]}")
+
+    corpus_chapter = array("H", (nodes[c]["corpus_chapter"] for c in order))
+    first_verse = array("I", (nodes[c]["verses"].start for c in order))
+    verse_count = array("H", (len(nodes[c]["verses"]) for c in order))
+    verse_ordinal = array("I", [0])
+    for n in verse_count:
+        verse_ordinal.append(verse_ordinal[-1] + n)
+    header = {
+        "version": FORMAT_VERSION,
+        "n_chapters": len(order),
+        "n_verses": verse_ordinal[-1],
+        "first": order[0],
+        "last": order[-1],
+    }
+    return write_packed(out_path, MAGIC, header, [
+        ("chapter_ids", "\n".join(order).encode("utf-8")),
+        ("paths", "\n".join(nodes[c]["path"] for c in order).encode("utf-8")),
+        ("corpus_chapter", corpus_chapter),
+        ("first_verse", first_verse),
+        ("verse_count", verse_count),
+        ("verse_ordinal", verse_ordinal),
+    ])
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+class ChapterNav:
+    """Memory-mapped reader for an index written by :func:`build_nav`."""
+
+    def __init__(self, path: Path = NAV_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+
+        def col(name, dtype):
+            return np.frombuffer(self._packed.raw(name), dtype=dtype)
+
+        self.chapter_ids: List[str] = str(self._packed.raw("chapter_ids"), "utf-8").split("\n")
+        self.paths: List[str] = str(self._packed.raw("paths"), "utf-8").split("\n")
+        self.corpus_chapter = col("corpus_chapter", np.uint16)
+        self.first_verse = col("first_verse", np.uint32)
+        self.verse_count = col("verse_count", np.uint16)
+        self.verse_ordinal = col("verse_ordinal", np.uint32)
+        self._ordinals = {cid: i for i, cid in enumerate(self.chapter_ids)}
+
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "ChapterNav":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.chapter_ids)
+
+    # -- lookups ------------------------------------------------------------
+    def ordinal(self, chapter_id: str) -> int:
+        """Reading-order position of a chapter ID such as ``"alma30"``."""
+        try:
+            return self._ordinals[chapter_id]
+        except KeyError:
+            raise KeyError(f"Unknown chapter {chapter_id!r}") from None
+
+    def next(self, ordinal: int) -> Optional[int]:
+        return ordinal + 1 if ordinal + 1 < len(self) else None
+
+    def prev(self, ordinal: int) -> Optional[int]:
+        return ordinal - 1 if ordinal > 0 else None
+
+    def label(self, ordinal: int) -> str:
+        return format_ref(*parse_chapter_id(self.chapter_ids[ordinal]))
+
+    def position(self, text: str) -> Position:
+        """``(ordinal, verse)`` for "Alma 30", "Alma 30:5" or a chapter ID ("alma30")."""
+        parsed = parse_chapter_id(text.strip())
+        if parsed is not None:
+            return self.ordinal(text.strip()), None
+        refs = parse_reference(text)
+        if not refs:
+            raise KeyError(f"Could not parse {text!r} as a chapter or verse")
+        ref = refs[0]
+        return self.ordinal(f"{ref.book_id}{ref.chapter}"), ref.first
+
+    def verse_span(self, start: Position, end: Position) -> Tuple[int, int]:
+        """Reading-order verse ordinals ``[first, last]`` covered by two positions."""
+        (a, va), (b, vb) = start, end
+        first = int(self.verse_ordinal[a]) + min(va or 1, int(self.verse_count[a])) - 1
+        last = int(self.verse_ordinal[b]) + (min(vb, int(self.verse_count[b])) if vb else int(self.verse_count[b])) - 1
+        if last < first:
+            raise ValueError(f"The range ends ({self.label(b)}) before it starts ({self.label(a)})")
+        return first, last
+
+    # -- range reads --------------------------------------------------------
+    def runs(self, first: int, last: int) -> List[Tuple[int, int]]:
+        """Contiguous corpus verse-ID runs ``(first_id, last_id)`` for verse ordinals ``first .. last``.
+
+        Runs break wherever reading order jumps in the corpus (between volumes).
+        """
+        a = int(np.searchsorted(self.verse_ordinal, first, side="right")) - 1
+        b = int(np.searchsorted(self.verse_ordinal, last, side="right")) - 1
+        runs: List[Tuple[int, int]] = []
+        for o in range(a, b + 1):
+            lo = int(self.first_verse[o]) + max(first - int(self.verse_ordinal[o]), 0)
+            hi = int(self.first_verse[o]) + min(last - int(self.verse_ordinal[o]), int(self.verse_count[o]) - 1)
+            if runs and runs[-1][1] + 1 == lo:
+                runs[-1] = (runs[-1][0], hi)
+            else:
+                runs.append((lo, hi))
+        return runs
+
+
+def open_nav(path: Path = NAV_PATH, data_dir: Path = DATA_DIR) -> ChapterNav:
+    """Open the navigation index, building it first if needed."""
+    if not Path(path).exists():
+        build_nav(data_dir, path)
+    return ChapterNav(path)
+
+
+def read_range(corpus, nav: ChapterNav, start: Position, end: Position, batch: int = READAHEAD_CHAPTERS) -> Iterator[Tuple[int, str]]:
+    """Yield ``(verse_id, text)`` from *start* to *end* (inclusive) in reading order.
+
+    Works through *batch* chapters at a time: each batch becomes a few
+    contiguous corpus slices, and the following batch is prefetched before
+    the current one is decoded.
+    """
+    first, last = nav.verse_span(start, end)
+    a = int(np.searchsorted(nav.verse_ordinal, first, side="right")) - 1
+    b = int(np.searchsorted(nav.verse_ordinal, last, side="right")) - 1
+    bounds = [max(int(nav.verse_ordinal[o]), first) for o in range(a, b + 1, batch)] + [last + 1]
+    batches = [nav.runs(lo, hi - 1) for lo, hi in zip(bounds, bounds[1:])]
+    for run in batches[0]:
+        corpus.prefetch(*run)
+    for i, runs in enumerate(batches):
+        for run in batches[i + 1] if i + 1 < len(batches) else []:
+            corpus.prefetch(*run)
+        for lo, hi in runs:
+            buf = corpus.span_bytes(lo, hi)
+            base = corpus.verse_offsets[lo]
+            for verse_id in range(lo, hi + 1):
+                yield verse_id, str(buf[corpus.verse_offsets[verse_id] - base:corpus.verse_offsets[verse_id + 1] - base], "utf-8")
+
+
+def reading_plan(nav: ChapterNav, start: Position, end: Position, days: int) -> List[Tuple[int, int]]:
+    """Split the chapters from *start* to *end* into *days* ``(first, last)`` ordinal portions.
+
+    Portions hold whole chapters with about the same number of verses each;
+    verse numbers in the positions are ignored. Fewer portions come back when
+    there are fewer chapters than days.
+    """
+    a, b = start[0], end[0]
+    if b < a:
+        raise ValueError(f"The range ends ({nav.label(b)}) before it starts ({nav.label(a)})")
+    cum = nav.verse_ordinal[a:b + 2].astype(np.int64) - int(nav.verse_ordinal[a])
+    targets = cum[-1] * np.arange(1, days) / days
+    # Cut after the chapter whose end is closest to each target.
+    ends = np.searchsorted(cum, targets)
+    ends = np.where(np.abs(cum[np.maximum(ends - 1, 0)] - targets) < np.abs(cum[ends] - targets), ends - 1, ends)
+    cuts = sorted({int(c) for c in ends if 0 < c < len(cum) - 1})
+    bounds = [0] + cuts + [len(cum) - 1]
+    return [(a + lo, a + hi - 1) for lo, hi in zip(bounds, bounds[1:])]
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Reading-order chapter index with range reads")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Follow the prev/next chapter links and write the ordinal index")
+    b.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    b.add_argument("--out", type=Path, default=None, help="Output index (default: <data-dir>/build/chapter_nav.bin)")
+
+    r = sub.add_parser("read", help='Print the verses of a range, e.g. "Alma 30" "Alma 42"')
+    r.add_argument("start")
+    r.add_argument("end", nargs="?", help="Defaults to the end of the start chapter")
+    r.add_argument("--batch", type=int, default=READAHEAD_CHAPTERS)
+    r.add_argument("--quiet", action="store_true", help="Only print the timing")
+    r.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    r.add_argument("--nav", type=Path, default=None, help="Navigation index, built if missing (default: <data-dir>/build/chapter_nav.bin)")
+
+    p = sub.add_parser("plan", help="Split a range into daily portions of similar length")
+    p.add_argument("start")
+    p.add_argument("end")
+    p.add_argument("--days", type=int, required=True)
+    p.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    p.add_argument("--nav", type=Path, default=None, help="Navigation index, built if missing (default: <data-dir>/build/chapter_nav.bin)")
+    args = ap.parse_args()
+    default_nav = Path(args.data_dir) / "build" / NAV_PATH.name
+
+    if args.command == "build":
+        start = time.time()
+        args.out = args.out or default_nav
+        header = build_nav(args.data_dir, args.out)
+        print(f"Wrote {args.out}: {header['n_chapters']} chapters, {header['first']} .. {header['last']} "
+              f"({time.time() - start:.1f}s)")
+        return
+
+    with open_corpus(data_dir=args.data_dir) as corpus, open_nav(args.nav or default_nav, args.data_dir) as nav:
+        verses = VerseTable.from_corpus(corpus)
+        try:
+            start_pos = nav.position(args.start)
+            end_pos = nav.position(args.end) if args.end else (start_pos[0], None)
+            nav.verse_span(start_pos, end_pos)
+        except (KeyError, ValueError) as e:
+            raise SystemExit(str(e).strip("'\""))
+        if args.command == "plan":
+            for day, (lo, hi) in enumerate(reading_plan(nav, start_pos, end_pos, args.days), 1):
+                n = int(nav.verse_ordinal[hi + 1] - nav.verse_ordinal[lo])
+                span = nav.label(lo) if lo == hi else f"{nav.label(lo)} – {nav.label(hi)}"
+                print(f"Day {day:>3}: {span} ({n} verses)")
+            return
+
+        started = time.perf_counter()
+        count = 0
+        for verse_id, text in read_range(corpus, nav, start_pos, end_pos, args.batch):
+            count += 1
+            if not args.quiet:
+                print(f"{verses.label(verse_id)}  {text}")
+        print(f"{count} verses in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
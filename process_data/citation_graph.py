@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from corpus_store import BUILD_DIR, DATA_DIR, PackedFile, iter_chapter_files, open_corpus, verse_footnotes, write_packed
+from footnote_edges import parse_footnote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from scripture_refs import VerseTable  # noqa: E402
+from talk_io import iter_talks  # noqa: E402
+
+"""
+Citation graph joining scripture verses, conference talks and Topical Guide /
+Bible Dictionary entries.
+
+Every reference found in the scraped data is resolved to a corpus verse ID
+(see corpus_store.py) through scripture_refs.VerseTable:
+
+    talk  -> verse   ``parsed_scripture_references`` of each talk footnote
+    entry -> verse   ``scripture_references`` of TG/BD paragraphs
+    verse -> entry   ``TG ...`` / ``BD ...`` topics in the verse footnotes
+    entry -> entry   ``linked_entries`` of TG/BD "see" paragraphs
+
+Each relation is stored in CSR form (``<rel>_indptr`` / ``<rel>_indices``,
+uint32) in one memory-mapped file, together with its transpose, so a lookup
+such as "every talk and entry citing Mosiah 3:19" reads two slices of length
+O(degree) and never touches the JSON. Verse/entry links from both directions
+are merged into the ``verse_entry`` / ``entry_verse`` pair.
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+GRAPH_PATH = BUILD_DIR / "citation_graph.bin"
+BIBLE_DICTIONARY_PATHS = [DATA_DIR / "bible_dictionary.json", DATA_DIR / "bible_dictionary_entries.json"]
+TOPICAL_GUIDE_PATH = DATA_DIR / "topical_guide_entries.json"
+
+ENTRY_SOURCES = ["topical_guide", "bible_dictionary"]
+FOOTNOTE_SOURCES = {"tg": "topical_guide", "bd": "bible_dictionary"}
+
+# relation -> (source node type, target node type)
+RELATIONS = {
+    "talk_verse": ("talk", "verse"),
+    "verse_talk": ("verse", "talk"),
+    "entry_verse": ("entry", "verse"),
+    "verse_entry": ("verse", "entry"),
+    "entry_entry": ("entry", "entry"),
+}
+
+MAGIC = b"DLGRAPH1"
+FORMAT_VERSION = 1
+
+
+def clean_name(name: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", name).split())
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _first_existing(paths: Iterable[Path]) -> Optional[Path]:
+    return next((p for p in paths if p.exists()), None)
+
+
+def _entry_path_key(url: str) -> str:
+    return urlparse(url).path.rstrip("/").lower()
+
+
+def csr(src: np.ndarray, dst: np.ndarray, n_src: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Deduplicated CSR arrays ``(indptr, indices)`` for the edges ``src -> dst``."""
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    if len(src):
+        pairs = np.unique(np.stack([src, dst], axis=1), axis=0)
+        src, dst = pairs[:, 0], pairs[:, 1]
+    indptr = np.zeros(n_src + 1, dtype=np.uint32)
+    np.cumsum(np.bincount(src, minlength=n_src), out=indptr[1:])
+    return indptr, dst.astype(np.uint32)
+
+
+class _Entries:
+    """Entry node table shared by TG and BD, keyed by ``(source, name)``."""
+
+    def __init__(self):
+        self.source: List[int] = []
+        self.name: List[str] = []
+        self.ids: Dict[Tuple[int, str], int] = {}
+        self.by_url: Dict[str, int] = {}
+
+    def get(self, source: str, name: str, url: Optional[str] = None) -> int:
+        key = (ENTRY_SOURCES.index(source), clean_name(name))
+        entry_id = self.ids.get(key)
+        if entry_id is None:
+            entry_id = self.ids[key] = len(self.name)
+            self.source.append(key[0])
+            self.name.append(key[1])
+        if url:
+            self.by_url.setdefault(_entry_path_key(url), entry_id)
+        return entry_id
+
+
+def build_graph(
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    out_path: Path = GRAPH_PATH,
+    corpus_path: Optional[Path] = None,
+) -> dict:
+    """Resolve every citation under *data_dir* (and the talk file) and write the graph.
+
+    *corpus_path* defaults to the corpus of *data_dir*.
+    """
+    edges: Dict[str, Tuple[List[int], List[int]]] = {rel: ([], []) for rel in ("talk_verse", "entry_verse", "entry_entry")}
+    entries = _Entries()
+    talk_urls: List[str] = []
+    unresolved = 0
+
+    with open_corpus(corpus_path, data_dir=data_dir) as corpus:
+        verses = VerseTable.from_corpus(corpus)
+        n_verses = len(corpus)
+
+        # TG / BD entries: their own pages, then the links between them.
+        entry_files = [
+            ("bible_dictionary", _first_existing([data_dir / p.name for p in BIBLE_DICTIONARY_PATHS])),
+            ("topical_guide", data_dir / TOPICAL_GUIDE_PATH.name),
+        ]
+        loaded = []
+        for source, path in entry_files:
+            if path is None or not path.exists():
+                continue
+            for entry in json.loads(path.read_text(encoding="utf-8")):
+                loaded.append((entries.get(source, entry["entry"], entry.get("entry_url")), entry))
+
+        src, dst = edges["entry_verse"]
+        link_src, link_dst = edges["entry_entry"]
+        for entry_id, entry in loaded:
+            for para in entry.get("paragraphs", []):
+                for ref in para.get("scripture_references", []):
+                    verse_ids = verses.resolve(ref)
+                    unresolved += not verse_ids
+                    src.extend([entry_id] * len(verse_ids))
+                    dst.extend(verse_ids)
+                for link in para.get("linked_entries", []):
+                    target = entries.by_url.get(_entry_path_key(link.get("href", "")))
+                    if target is None:
+                        source = "topical_guide" if "/tg/" in link.get("href", "") else "bible_dictionary"
+                        target = entries.get(source, link["entry"], link.get("href"))
+                    link_src.append(entry_id)
+                    link_dst.append(target)
+
+        # Verse footnotes pointing at TG / BD topics (stored entry -> verse).
+        verse_id = 0
+        for _volume_id, _book_id, _chapter, path in iter_chapter_files(data_dir):
+            for verse in json.loads(path.read_text(encoding="utf-8"))["chapter"]["verses"]:
+                for note in verse_footnotes(verse):
+                    links, _unparsed = parse_footnote(note.get("footnote", ""))
+                    for kind, name in links:
+                        if kind in FOOTNOTE_SOURCES:
+                            src.append(entries.get(FOOTNOTE_SOURCES[kind], name))
+                            dst.append(verse_id)
+                verse_id += 1
+        if verse_id != n_verses:
+            raise ValueError(f"Chapter files hold {verse_id} verses but the corpus has {n_verses}; rebuild the corpus")
+
+        # Conference talks.
+        src, dst = edges["talk_verse"]
+        for talk in iter_talks(talks_path):
+            talk_id = len(talk_urls)
+            talk_urls.append(talk["url"])
+            for para in talk.get("content") or []:
+                for note in para.get("linked_footnotes") or []:
+                    for ref in note.get("parsed_scripture_references") or []:
+                        verse_ids = verses.resolve(ref)
+                        unresolved += not verse_ids
+                        src.extend([talk_id] * len(verse_ids))
+                        dst.extend(verse_ids)
+
+    sizes = {"verse": n_verses, "talk": len(talk_urls), "entry": len(entries.name)}
+    columns = []
+    n_edges = {}
+    for rel, (src_type, dst_type) in RELATIONS.items():
+        if rel in edges:
+            src, dst = edges[rel]
+        else:
+            # Transpose of the relation stored the other way round.
+            dst, src = edges[f"{dst_type}_{src_type}"]
+        indptr, indices = csr(src, dst, sizes[src_type])
+        columns += [(f"{rel}_indptr", indptr), (f"{rel}_indices", indices)]
+        n_edges[rel] = len(indices)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "sizes": sizes,
+        "relations": RELATIONS,
+        "n_edges": n_edges,
+        "entry_sources": ENTRY_SOURCES,
+        "unresolved_references": unresolved,
+    }
+    return write_packed(out_path, MAGIC, header, columns + [
+        ("talk_urls", "\n".join(talk_urls).encode("utf-8")),
+        ("entry_source", np.asarray(entries.source, dtype=np.uint8)),
+        ("entry_names", "\n".join(entries.name).encode("utf-8")),
+    ])
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+class CitationGraph:
+    """Memory-mapped reader for a graph written by :func:`build_graph`."""
+
+    def __init__(self, path: Path = GRAPH_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+        header = self._packed.header
+        self.sizes: Dict[str, int] = header["sizes"]
+        self.entry_sources: List[str] = header["entry_sources"]
+        self.relations: Dict[str, List[str]] = header["relations"]
+        self._adj = {
+            rel: (
+                np.frombuffer(self._packed.raw(f"{rel}_indptr"), dtype=np.uint32),
+                np.frombuffer(self._packed.raw(f"{rel}_indices"), dtype=np.uint32),
+            )
+            for rel in header["relations"]
+        }
+        urls = str(self._packed.raw("talk_urls"), "utf-8")
+        self.talk_urls: List[str] = urls.split("\n") if urls else []
+        names = str(self._packed.raw("entry_names"), "utf-8")
+        self.entry_names: List[str] = names.split("\n") if names else []
+        self.entry_source = np.frombuffer(self._packed.raw("entry_source"), dtype=np.uint8)
+        self._talk_ids = {url: i for i, url in enumerate(self.talk_urls)}
+        self._entry_ids = {
+            (self.entry_sources[s], name): i for i, (s, name) in enumerate(zip(self.entry_source, self.entry_names))
+        }
+
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "CitationGraph":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- lookups ------------------------------------------------------------
+    def neighbors(self, relation: str, node: int) -> np.ndarray:
+        """Targets of *node* under *relation* (a zero-copy, sorted uint32 slice)."""
+        indptr, indices = self._adj[relation]
+        return indices[indptr[node]:indptr[node + 1]]
+
+    def degree(self, relation: str, node: int) -> int:
+        indptr, _indices = self._adj[relation]
+        return int(indptr[node + 1] - indptr[node])
+
+    def in_degrees(self, relation: str) -> np.ndarray:
+        """Number of *relation* edges arriving at every target node (int64)."""
+        src_type, dst_type = self.relations[relation]
+        transpose = f"{dst_type}_{src_type}"
+        if transpose != relation and transpose in self._adj:
+            # The stored transpose's out-degrees, without touching the edges.
+            indptr, _indices = self._adj[transpose]
+            return np.diff(indptr.astype(np.int64))
+        _indptr, indices = self._adj[relation]
+        return np.bincount(indices, minlength=self.sizes[dst_type]).astype(np.int64)
+
+    def edges(self, relation: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Every edge of *relation* as parallel ``(sources, targets)`` arrays."""
+        indptr, indices = self._adj[relation]
+        sources = np.repeat(np.arange(len(indptr) - 1, dtype=np.uint32), np.diff(indptr))
+        return sources, indices
+
+    def talk_id(self, url: str) -> int:
+        return self._talk_ids[url]
+
+    def entry_id(self, source: str, name: str) -> int:
+        return self._entry_ids[(source, clean_name(name))]
+
+    def find_talk(self, url: str) -> Optional[int]:
+        """Like :meth:`talk_id`, but None for a URL the graph does not know."""
+        return self._talk_ids.get(url)
+
+    def find_entry(self, source: str, name: str) -> Optional[int]:
+        """Like :meth:`entry_id`, but None for an entry the graph does not know."""
+        return self._entry_ids.get((source, clean_name(name)))
+
+    def entry(self, entry_id: int) -> Tuple[str, str]:
+        """``(source, name)`` of an entry node."""
+        return self.entry_sources[self.entry_source[entry_id]], self.entry_names[entry_id]
+
+    def citing(self, verse_id: int) -> dict:
+        """Talk URLs and ``(source, name)`` entries linked to one verse."""
+        return {
+            "talks": [self.talk_urls[i] for i in self.neighbors("verse_talk", verse_id)],
+            "entries": [self.entry(i) for i in self.neighbors("verse_entry", verse_id)],
+        }
+
+
+def open_graph(
+    path: Path = GRAPH_PATH,
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    corpus_path: Optional[Path] = None,
+) -> CitationGraph:
+    """Open the citation graph, building it from *data_dir* and the talk file first if needed."""
+    if not Path(path).exists():
+        build_graph(data_dir, talks_path, path, corpus_path)
+    return CitationGraph(path)
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or query the verse / talk / TG / BD citation graph")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Resolve all citations into CSR adjacency arrays")
+    b.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    b.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json)")
+    b.add_argument("--out", type=Path, default=None, help="Output graph (default: <data-dir>/build/citation_graph.bin)")
+
+    q = sub.add_parser("cites", help='Everything citing a verse, e.g. "Mosiah 3:19"')
+    q.add_argument("reference")
+    q.add_argument("--data-dir", type=Path, default=DATA_DIR, help="Data the graph was built from")
+    q.add_argument("--graph", type=Path, default=None, help="Graph to query (default: <data-dir>/build/citation_graph.bin)")
+    args = ap.parse_args()
+    default_graph = Path(args.data_dir) / "build" / GRAPH_PATH.name
+
+    if args.command == "build":
+        start = time.time()
+        args.out = args.out or default_graph
+        header = build_graph(args.data_dir, args.talks, args.out)
+        edges = ", ".join(f"{rel} {n}" for rel, n in header["n_edges"].items())
+        print(f"Wrote {args.out}: {header['sizes']} / {edges} ({time.time() - start:.1f}s)")
+        print(f"{header['unresolved_references']} references did not resolve to a verse")
+        return
+
+    with open_corpus(data_dir=args.data_dir) as corpus, CitationGraph(args.graph or default_graph) as graph:
+        verse_ids = VerseTable.from_corpus(corpus).resolve(args.reference)
+        if not verse_ids:
+            raise SystemExit(f"Could not resolve {args.reference!r} to a verse")
+        for verse_id in verse_ids:
+            start = time.perf_counter()
+            hits = graph.citing(verse_id)
+            elapsed = (time.perf_counter() - start) * 1000
+            _vol, book_id, chapter, verse = corpus.verse_key(verse_id)
+            print(f"{book_id} {chapter}:{verse} (verse {verse_id}) — {elapsed:.3f} ms")
+            for url in hits["talks"]:
+                print(f"  talk   {url}")
+            for source, name in hits["entries"]:
+                print(f"  {source:<16} {name}")
+
+
+if __name__ == "__main__":
+    main()
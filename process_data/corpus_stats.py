@@ -0,0 +1,470 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from corpus_store import BUILD_DIR, DATA_DIR, PackedFile, open_corpus, write_packed
+from search_index import tokenize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from talk_io import iter_talks  # noqa: E402
+
+try:
+    import scipy.sparse as sp
+except ImportError:  # optional: only needed for SparseCounts.to_scipy()
+    sp = None
+
+"""
+Vectorised word statistics over the scriptures and conference talks.
+
+The corpus is tokenised once (with ``search_index.tokenize``) into a single
+uint32 array of term IDs plus offset arrays marking verse and talk-paragraph
+boundaries, and cached in ``data/build/corpus_tokens.bin``. Every statistic is
+then a NumPy group-by over that array: documents at any granularity (verse,
+chapter, book, paragraph, talk) are just different segmentations of the same
+tokens, and sparse document-term matrices are built with one ``np.unique``.
+
+    python process_data/corpus_stats.py top --by speaker -k 10
+    python process_data/corpus_stats.py trend faith --by year
+    python process_data/corpus_stats.py books
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+TOKENS_PATH = BUILD_DIR / "corpus_tokens.bin"
+
+GRANULARITIES = ["verse", "chapter", "book", "paragraph", "talk"]
+SEASONS = ["April", "October", ""]
+
+MAGIC = b"DLTOKENS"
+FORMAT_VERSION = 1
+
+# Dropped by the ``top`` queries unless ``stopwords=()`` is passed.
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being but by can could did do does
+for from had has have he her here him his how i if in into is it its let may me more my no nor not now o of on
+one or our out over said saith say shall she should so some such than that the thee their them then there these
+they thine this those thou thus thy to unto up upon us was we were what when which who whom why will with would
+ye yea you your
+""".split())
+
+# ---------------------------------------------------------------------------
+# Sparse counts
+# ---------------------------------------------------------------------------
+
+class SparseCounts:
+    """CSR matrix of integer counts (rows = groups/documents, columns = terms)."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, shape: Tuple[int, int]):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+
+    @classmethod
+    def from_pairs(cls, rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int]) -> "SparseCounts":
+        """Count occurrences of each ``(row, col)`` pair."""
+        keys = rows.astype(np.int64) * shape[1] + cols
+        uniq, counts = np.unique(keys, return_counts=True)
+        row_of = uniq // shape[1]
+        indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_of, minlength=shape[0]), out=indptr[1:])
+        return cls(indptr, (uniq % shape[1]).astype(np.uint32), counts.astype(np.uint32), shape)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """``(term_ids, counts)`` of one row."""
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return self.indices[lo:hi], self.data[lo:hi]
+
+    def row_ids(self) -> np.ndarray:
+        """Row index of every stored entry."""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def row_sums(self) -> np.ndarray:
+        return np.bincount(self.row_ids(), weights=self.data, minlength=self.shape[0]).astype(np.int64)
+
+    def column_sums(self) -> np.ndarray:
+        return np.bincount(self.indices, weights=self.data, minlength=self.shape[1]).astype(np.int64)
+
+    def document_frequency(self) -> np.ndarray:
+        """Number of rows each term occurs in."""
+        return np.bincount(self.indices, minlength=self.shape[1])
+
+    def to_scipy(self):
+        if sp is None:
+            raise RuntimeError("SparseCounts.to_scipy() requires scipy")
+        return sp.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _year(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_tokens(
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    out_path: Path = TOKENS_PATH,
+    corpus_path: Optional[Path] = None,
+) -> dict:
+    """Tokenise every verse and talk paragraph once and write the token file.
+
+    *corpus_path* defaults to the corpus of *data_dir*.
+    """
+    vocab: Dict[str, int] = {}
+    chunks: List[np.ndarray] = []
+    lengths: List[int] = []
+
+    def add(text: str) -> None:
+        ids = [vocab.setdefault(tok, len(vocab)) for tok in tokenize(text)]
+        chunks.append(np.asarray(ids, dtype=np.uint32))
+        lengths.append(len(ids))
+
+    with open_corpus(corpus_path, data_dir=data_dir) as corpus:
+        n_verses = len(corpus)
+        for _verse_id, text in corpus.iter_verses():
+            add(text)
+        chapter_first_verse = np.asarray(corpus.chapter_first_verse, dtype=np.uint32)
+        chapter_book = np.asarray(corpus.chapter_book, dtype=np.uint16)
+        book_ids = [b["id"] for b in corpus.books]
+
+    speakers: Dict[str, int] = {}
+    para_talk: List[int] = []
+    talk_speaker, talk_year, talk_season, talk_urls = [], [], [], []
+    for talk_id, talk in enumerate(iter_talks(talks_path)):
+        talk_urls.append(talk.get("url", ""))
+        talk_speaker.append(speakers.setdefault(talk.get("speaker") or "", len(speakers)))
+        talk_year.append(_year(talk.get("year")))
+        season = talk.get("season") or ""
+        talk_season.append(SEASONS.index(season) if season in SEASONS else SEASONS.index(""))
+        for para in talk.get("content") or []:
+            add(para.get("paragraph") or "")
+            para_talk.append(talk_id)
+
+    # Renumber terms alphabetically so the vocabulary section is sorted.
+    terms = sorted(vocab)
+    remap = np.empty(len(terms), dtype=np.uint32)
+    remap[[vocab[t] for t in terms]] = np.arange(len(terms), dtype=np.uint32)
+    tokens = remap[np.concatenate(chunks)] if chunks and len(terms) else np.zeros(0, dtype=np.uint32)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.uint64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    header = {
+        "version": FORMAT_VERSION,
+        "n_terms": len(terms),
+        "n_tokens": int(offsets[-1]),
+        "n_verses": n_verses,
+        "n_paragraphs": len(para_talk),
+        "n_talks": len(talk_urls),
+        "books": book_ids,
+        "seasons": SEASONS,
+    }
+    return write_packed(out_path, MAGIC, header, [
+        ("terms", "\n".join(terms).encode("utf-8")),
+        ("tokens", tokens),
+        # Verses first, then talk paragraphs: doc_offsets[n_verses + p] starts paragraph p.
+        ("doc_offsets", offsets),
+        ("chapter_first_verse", chapter_first_verse),
+        ("chapter_book", chapter_book),
+        ("para_talk", np.asarray(para_talk, dtype=np.uint32)),
+        ("talk_speaker", np.asarray(talk_speaker, dtype=np.uint32)),
+        ("talk_year", np.asarray(talk_year, dtype=np.uint16)),
+        ("talk_season", np.asarray(talk_season, dtype=np.uint8)),
+        ("speakers", "\n".join(speakers).encode("utf-8")),
+        ("talk_urls", "\n".join(talk_urls).encode("utf-8")),
+    ])
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+class CorpusStats:
+    """Memory-mapped token arrays with vectorised aggregate queries."""
+
+    def __init__(self, path: Path = TOKENS_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+        header = self._packed.header
+        self.n_verses: int = header["n_verses"]
+        self.n_paragraphs: int = header["n_paragraphs"]
+        self.n_talks: int = header["n_talks"]
+        self.books: List[str] = header["books"]
+        self.seasons: List[str] = header["seasons"]
+
+        terms = str(self._packed.raw("terms"), "utf-8")
+        self.terms: List[str] = terms.split("\n") if terms else []
+        self.vocab = {term: i for i, term in enumerate(self.terms)}
+
+        def arr(name, dtype):
+            return np.frombuffer(self._packed.raw(name), dtype=dtype)
+
+        self.tokens = arr("tokens", np.uint32)
+        self.doc_offsets = arr("doc_offsets", np.uint64).astype(np.int64)
+        self.chapter_first_verse = arr("chapter_first_verse", np.uint32)
+        self.chapter_book = arr("chapter_book", np.uint16)
+        self.para_talk = arr("para_talk", np.uint32)
+        self.talk_speaker = arr("talk_speaker", np.uint32)
+        self.talk_year = arr("talk_year", np.uint16)
+        self.talk_season = arr("talk_season", np.uint8)
+        speakers = str(self._packed.raw("speakers"), "utf-8")
+        self.speakers: List[str] = speakers.split("\n") if self.n_talks else []
+        urls = str(self._packed.raw("talk_urls"), "utf-8")
+        self.talk_urls: List[str] = urls.split("\n") if self.n_talks else []
+        self._doc_of_token: Optional[np.ndarray] = None
+
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "CorpusStats":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def n_terms(self) -> int:
+        return len(self.terms)
+
+    # -- segmentation -------------------------------------------------------
+    @property
+    def doc_of_token(self) -> np.ndarray:
+        """Verse / paragraph document index of every token (verses first)."""
+        if self._doc_of_token is None:
+            lengths = np.diff(self.doc_offsets)
+            self._doc_of_token = np.repeat(np.arange(len(lengths), dtype=np.uint32), lengths)
+        return self._doc_of_token
+
+    def _scripture_tokens(self) -> slice:
+        return slice(0, int(self.doc_offsets[self.n_verses]))
+
+    def _talk_tokens(self) -> slice:
+        return slice(int(self.doc_offsets[self.n_verses]), len(self.tokens))
+
+    def segment(self, granularity: str) -> Tuple[np.ndarray, np.ndarray, int]:
+        """``(token_slice_terms, group_of_token, n_groups)`` for a granularity."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {GRANULARITIES}")
+        if granularity in ("verse", "chapter", "book"):
+            sl = self._scripture_tokens()
+            verse = self.doc_of_token[sl]
+            if granularity == "verse":
+                return self.tokens[sl], verse, self.n_verses
+            chapter = np.searchsorted(self.chapter_first_verse, verse, side="right") - 1
+            if granularity == "chapter":
+                return self.tokens[sl], chapter, len(self.chapter_first_verse) - 1
+            return self.tokens[sl], self.chapter_book[chapter], len(self.books)
+        sl = self._talk_tokens()
+        para = self.doc_of_token[sl] - self.n_verses
+        if granularity == "paragraph":
+            return self.tokens[sl], para, self.n_paragraphs
+        return self.tokens[sl], self.para_talk[para], self.n_talks
+
+    def doc_term_matrix(self, granularity: str) -> SparseCounts:
+        terms, groups, n_groups = self.segment(granularity)
+        return SparseCounts.from_pairs(groups, terms, (n_groups, self.n_terms))
+
+    def group_term_matrix(self, granularity: str, labels: np.ndarray, n_labels: int) -> SparseCounts:
+        """Counts summed over documents that share a label (``labels[doc]``)."""
+        terms, groups, _n = self.segment(granularity)
+        return SparseCounts.from_pairs(labels[groups], terms, (n_labels, self.n_terms))
+
+    # -- aggregates ---------------------------------------------------------
+    def term_frequencies(self, source: str = "all") -> np.ndarray:
+        """Corpus-wide count of every term (``source``: all / scripture / talks)."""
+        tokens = {
+            "all": self.tokens,
+            "scripture": self.tokens[self._scripture_tokens()],
+            "talks": self.tokens[self._talk_tokens()],
+        }[source]
+        return np.bincount(tokens, minlength=self.n_terms)
+
+    def _keep_mask(self, stopwords: Iterable[str]) -> np.ndarray:
+        keep = np.ones(self.n_terms, dtype=bool)
+        ids = [self.vocab[w] for w in stopwords if w in self.vocab]
+        keep[ids] = False
+        return keep
+
+    def top_terms(self, k: int = 20, source: str = "all", stopwords: Iterable[str] = STOPWORDS) -> List[Tuple[str, int]]:
+        counts = self.term_frequencies(source) * self._keep_mask(stopwords)
+        return self._top(np.arange(self.n_terms), counts, k)
+
+    def _top(self, term_ids: np.ndarray, counts: np.ndarray, k: int) -> List[Tuple[str, int]]:
+        counts = counts.astype(np.int64)
+        if len(counts) > k:
+            part = np.argpartition(-counts, k)[:k]
+        else:
+            part = np.arange(len(counts))
+        part = part[np.lexsort((term_ids[part], -counts[part]))]
+        return [(self.terms[term_ids[i]], int(counts[i])) for i in part if counts[i] > 0]
+
+    def top_terms_by(
+        self, by: str = "speaker", k: int = 10, stopwords: Iterable[str] = STOPWORDS
+    ) -> Dict[str, List[Tuple[str, int]]]:
+        """Top-k terms per speaker / year / season / book."""
+        matrix, names = self._grouped(by)
+        keep = self._keep_mask(stopwords)
+        out = {}
+        for g, name in enumerate(names):
+            term_ids, counts = matrix.row(g)
+            if len(term_ids):
+                out[name] = self._top(term_ids, counts * keep[term_ids], k)
+        return out
+
+    def _grouped(self, by: str) -> Tuple[SparseCounts, List[str]]:
+        if by == "book":
+            return self.doc_term_matrix("book"), self.books
+        if by == "speaker":
+            return self.group_term_matrix("talk", self.talk_speaker, len(self.speakers)), self.speakers
+        labels, names = self._talk_labels(by)
+        return self.group_term_matrix("talk", labels, len(names)), names
+
+    def _talk_labels(self, by: str) -> Tuple[np.ndarray, List[str]]:
+        """Per-talk group index for ``year``, ``season`` or ``year_season``."""
+        if by == "year":
+            years, labels = np.unique(self.talk_year, return_inverse=True)
+            return labels, [str(y) if y else "unknown" for y in years]
+        if by == "season":
+            return self.talk_season.astype(np.int64), [s or "unknown" for s in self.seasons]
+        if by == "year_season":
+            key = self.talk_year.astype(np.int64) * len(self.seasons) + self.talk_season
+            keys, labels = np.unique(key, return_inverse=True)
+            names = [f"{k // len(self.seasons) or 'unknown'} {self.seasons[k % len(self.seasons)]}".strip() for k in keys]
+            return labels, names
+        raise ValueError("by must be one of: speaker, year, season, year_season, book")
+
+    def term_trend(self, terms: Sequence[str], by: str = "year", per: int = 10_000) -> Dict[str, Dict[str, float]]:
+        """Occurrences of each term per *per* talk tokens, grouped by year/season."""
+        labels, names = self._talk_labels(by)
+        tokens, talks, _n = self.segment("talk")
+        token_group = labels[talks]
+        totals = np.bincount(token_group, minlength=len(names))
+        out = {}
+        for term in terms:
+            term_id = self.vocab.get(term.lower())
+            if term_id is None:
+                hits = np.zeros(len(names))
+            else:
+                hits = np.bincount(token_group[tokens == term_id], minlength=len(names))
+            rate = np.divide(hits * per, totals, out=np.zeros(len(names)), where=totals > 0)
+            out[term] = dict(zip(names, rate.round(3).tolist()))
+        return out
+
+    def book_vocabulary(self) -> List[dict]:
+        """Tokens, distinct terms, hapax legomena and type/token ratio per book."""
+        matrix = self.doc_term_matrix("book")
+        lengths = np.diff(matrix.indptr)
+        row = matrix.row_ids()
+        tokens = matrix.row_sums()
+        hapax = np.bincount(row[matrix.data == 1], minlength=len(self.books))
+        # Terms found in this book and no other.
+        unique_terms = matrix.document_frequency()[matrix.indices] == 1
+        exclusive = np.bincount(row[unique_terms], minlength=len(self.books))
+        return [
+            {
+                "book": book,
+                "tokens": int(tokens[i]),
+                "types": int(lengths[i]),
+                "hapax": int(hapax[i]),
+                "exclusive_terms": int(exclusive[i]),
+                "type_token_ratio": round(float(lengths[i] / tokens[i]), 4) if tokens[i] else 0.0,
+            }
+            for i, book in enumerate(self.books)
+        ]
+
+
+def open_stats(
+    path: Path = TOKENS_PATH,
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    corpus_path: Optional[Path] = None,
+) -> CorpusStats:
+    """Open the token file, building it from *data_dir* and the talk file first if needed."""
+    if not Path(path).exists():
+        build_tokens(data_dir, talks_path, path, corpus_path)
+    return CorpusStats(path)
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Word statistics over scriptures and conference talks")
+    ap.add_argument("--tokens", type=Path, default=None, help="Token file (default: <data-dir>/build/corpus_tokens.bin)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Tokenise the corpus once")
+
+    t = sub.add_parser("top", help="Most frequent terms, overall or per group")
+    t.add_argument("--by", choices=["all", "speaker", "year", "season", "year_season", "book"], default="all")
+    t.add_argument("--source", choices=["all", "scripture", "talks"], default="all")
+    t.add_argument("-k", type=int, default=10)
+    t.add_argument("--keep-stopwords", action="store_true")
+
+    tr = sub.add_parser("trend", help="Term rate per 10k talk tokens over time")
+    tr.add_argument("terms", nargs="+")
+    tr.add_argument("--by", choices=["year", "season", "year_season"], default="year")
+
+    bk = sub.add_parser("books", help="Vocabulary statistics per book")
+
+    # Queries build a missing token file from the same inputs as ``build``.
+    for p in (b, t, tr, bk):
+        p.add_argument("--data-dir", type=Path, default=DATA_DIR)
+        p.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json)")
+    args = ap.parse_args()
+    args.tokens = args.tokens or Path(args.data_dir) / "build" / TOKENS_PATH.name
+
+    if args.command == "build":
+        start = time.time()
+        header = build_tokens(args.data_dir, args.talks, args.tokens)
+        print(
+            f"Tokenised {header['n_tokens']} tokens ({header['n_terms']} terms, {header['n_verses']} verses, "
+            f"{header['n_paragraphs']} talk paragraphs) into {args.tokens} ({time.time() - start:.1f}s)"
+        )
+        return
+
+    with open_stats(args.tokens, args.data_dir, args.talks) as stats:
+        start = time.perf_counter()
+        if args.command == "top":
+            stopwords = () if args.keep_stopwords else STOPWORDS
+            if args.by == "all":
+                result = {args.source: stats.top_terms(args.k, args.source, stopwords)}
+            else:
+                result = stats.top_terms_by(args.by, args.k, stopwords)
+            elapsed = time.perf_counter() - start
+            for group, terms in result.items():
+                print(f"{group}: " + ", ".join(f"{term} ({n})" for term, n in terms))
+        elif args.command == "trend":
+            result = stats.term_trend(args.terms, args.by)
+            elapsed = time.perf_counter() - start
+            for term, series in result.items():
+                print(term)
+                for group, rate in series.items():
+                    print(f"  {group:<16} {rate:8.3f}")
+        else:
+            rows = stats.book_vocabulary()
+            elapsed = time.perf_counter() - start
+            print(f"{'book':<22}{'tokens':>9}{'types':>8}{'hapax':>8}{'only here':>10}{'TTR':>8}")
+            for r in rows:
+                print(
+                    f"{r['book']:<22}{r['tokens']:>9}{r['types']:>8}{r['hapax']:>8}"
+                    f"{r['exclusive_terms']:>10}{r['type_token_ratio']:>8.4f}"
+                )
+        print(f"\n({elapsed * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
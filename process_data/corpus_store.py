@@ -0,0 +1,411 @@
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+"""
+Packs the per-chapter scripture JSON written by ``fetch_books_data.py`` into a
+single columnar file that can be memory-mapped instead of parsing ~1,600 JSON
+files on every start-up.
+
+Layout (all integers in the byte order recorded in the header):
+
+    b"DLCORPUS" | uint32 header length | JSON header | padding
+    chapter_book         uint16[n_chapters]     index into header["books"]
+    chapter_number       uint16[n_chapters]
+    chapter_first_verse  uint32[n_chapters + 1] index into verse_offsets
+    verse_offsets        uint32[n_verses + 1]   byte offsets into text
+    text                 UTF-8 verse text, concatenated
+
+The global verse index (0 .. n_verses-1) follows canonical volume/book/chapter
+order and is used as the verse ID by the other modules in this folder.
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+DATA_DIR = Path("data")
+BUILD_DIR = DATA_DIR / "build"
+CORPUS_PATH = BUILD_DIR / "corpus.bin"
+
+
+def corpus_path(data_dir: Path = DATA_DIR) -> Path:
+    """Where the packed corpus of *data_dir* lives (``<data_dir>/build/corpus.bin``)."""
+    return Path(data_dir) / "build" / CORPUS_PATH.name
+
+# Same order as fetch_books_data.VOLUMES
+VOLUMES = [
+    "bookofmormon",
+    "oldtestament",
+    "newtestament",
+    "doctrineandcovenants",
+    "pearlofgreatprice",
+]
+
+MAGIC = b"DLCORPUS"
+FORMAT_VERSION = 1
+ALIGN = 8
+
+# ---------------------------------------------------------------------------
+# Helpers shared by readers of the raw chapter JSON
+# ---------------------------------------------------------------------------
+
+def verse_footnotes(verse: dict) -> list:
+    """Footnotes of a verse (a few D&C chapters use the ``footNotes`` key)."""
+    return verse.get("footnotes") or verse.get("footNotes") or []
+
+
+def iter_chapter_files(data_dir: Path = DATA_DIR) -> Iterator[Tuple[str, str, int, Path]]:
+    """Yield ``(volume_id, book_id, chapter_number, path)`` in canonical order."""
+    for volume_id in VOLUMES:
+        volume_dir = data_dir / volume_id
+        meta_path = volume_dir / f"{volume_id}_data.json"
+        if not meta_path.exists():
+            continue
+        volume_data = json.loads(meta_path.read_text(encoding="utf-8"))
+        for book in volume_data.get("books", []):
+            book_id = book["_id"]
+            chapter = 1
+            while True:
+                path = volume_dir / book_id / f"{book_id}_{chapter}.json"
+                if not path.exists():
+                    break
+                yield volume_id, book_id, chapter, path
+                chapter += 1
+
+# ---------------------------------------------------------------------------
+# Packed file format (shared by the other build artefacts in this folder)
+# ---------------------------------------------------------------------------
+
+def _pad(fp, pos: int) -> int:
+    extra = (-pos) % ALIGN
+    fp.write(b"\0" * extra)
+    return pos + extra
+
+
+def write_packed(path: Path, magic: bytes, header: dict, columns: List[Tuple[str, object]]) -> dict:
+    """Write ``magic | header | aligned columns`` to *path*.
+
+    *columns* are ``(name, buffer)`` pairs where *buffer* is anything exposing
+    the buffer protocol (``array``, ``bytes``, NumPy arrays). Their offsets,
+    element counts and struct formats are recorded in ``header["sections"]``.
+    """
+    views = [(name, memoryview(col)) for name, col in columns]
+
+    # Offsets depend on the header length, so lay the sections out relative
+    # to the end of the (padded) header and grow the header until it fits.
+    relative: dict[str, tuple] = {}
+    pos = 0
+    for name, view in views:
+        relative[name] = (pos, view.nbytes // view.itemsize, view.format.lstrip("@=<"))
+        pos += view.nbytes
+        pos += (-pos) % ALIGN
+
+    header = {**header, "byteorder": sys.byteorder}
+    base = 0
+    while True:
+        header["sections"] = {k: [off + base, n, t] for k, (off, n, t) in relative.items()}
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        needed = len(magic) + 4 + len(header_bytes)
+        needed += (-needed) % ALIGN
+        if needed <= base:
+            header_bytes = header_bytes.ljust(base - len(magic) - 4, b" ")
+            break
+        base = needed
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as fp:
+        fp.write(magic)
+        fp.write(len(header_bytes).to_bytes(4, "little"))
+        fp.write(header_bytes)
+        pos = base
+        for _name, view in views:
+            fp.write(view)
+            pos = _pad(fp, pos + view.nbytes)
+    return header
+
+
+class PackedFile:
+    """Memory-mapped reader for files written by :func:`write_packed`."""
+
+    def __init__(self, path: Path, magic: bytes, version: Optional[int] = None):
+        self.path = Path(path)
+        self._fp = self.path.open("rb")
+        self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: list[memoryview] = []
+        self.buf = self._track(memoryview(self._mm))
+        if bytes(self.buf[:len(magic)]) != magic:
+            self.close()
+            raise ValueError(f"{self.path} is not a {magic.decode()} file")
+        header_len = int.from_bytes(self.buf[len(magic):len(magic) + 4], "little")
+        start = len(magic) + 4
+        self.header = json.loads(bytes(self.buf[start:start + header_len]))
+        if version is not None and self.header.get("version") != version:
+            self.close()
+            raise ValueError(f"Unsupported {magic.decode()} version {self.header.get('version')}")
+        self.swapped = self.header["byteorder"] != sys.byteorder
+
+    def _track(self, view: memoryview) -> memoryview:
+        self._views.append(view)
+        return view
+
+    def raw(self, name: str) -> memoryview:
+        """Uncast bytes of one section (e.g. for ``numpy.frombuffer``)."""
+        off, count, fmt = self.header["sections"][name]
+        return self._track(self.buf[off:off + count * struct.calcsize(fmt)])
+
+    def willneed(self, offset: int, length: int) -> None:
+        """Hint the OS to read ``[offset, offset + length)`` ahead (no-op without madvise)."""
+        if self._mm is None or length <= 0 or not hasattr(mmap, "MADV_WILLNEED"):
+            return
+        start = offset - offset % mmap.PAGESIZE
+        self._mm.madvise(mmap.MADV_WILLNEED, start, min(offset + length, len(self._mm)) - start)
+
+    def column(self, name: str):
+        """One section as a typed, zero-copy ``memoryview``."""
+        fmt = self.header["sections"][name][2]
+        view = self.raw(name)
+        if fmt == "B":
+            return view
+        if not self.swapped:
+            return self._track(view.cast(fmt))
+        # Foreign byte order: fall back to a private, swapped copy.
+        arr = array(fmt, view.tobytes())
+        arr.byteswap()
+        return arr
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if getattr(self, "_mm", None) is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # A caller still holds a slice; the mapping is released once
+                # the last slice is garbage collected.
+                pass
+            self._mm = None
+        self._fp.close()
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def build_corpus(data_dir: Path = DATA_DIR, out_path: Optional[Path] = None) -> dict:
+    """Read every chapter file under *data_dir* and write the packed corpus (default: :func:`corpus_path`)."""
+    out_path = corpus_path(data_dir) if out_path is None else out_path
+    volumes: list[dict] = []
+    books: list[dict] = []
+    book_index: dict[str, int] = {}
+
+    chapter_book = array("H")
+    chapter_number = array("H")
+    chapter_first_verse = array("I")
+    verse_offsets = array("I", [0])
+    text = bytearray()
+
+    for volume_id, book_id, number, path in iter_chapter_files(data_dir):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if not volumes or volumes[-1]["id"] != volume_id:
+            volumes.append({"id": volume_id, "title": data["volume"]["title"]})
+        if book_id not in book_index:
+            book_index[book_id] = len(books)
+            books.append({
+                "id": book_id,
+                "title": data["book"]["title"],
+                "volume": len(volumes) - 1,
+                "first_chapter": len(chapter_book),
+            })
+
+        chapter_book.append(book_index[book_id])
+        chapter_number.append(number)
+        chapter_first_verse.append(len(verse_offsets) - 1)
+        for verse in data["chapter"]["verses"]:
+            text += verse["text"].encode("utf-8")
+            verse_offsets.append(len(text))
+    chapter_first_verse.append(len(verse_offsets) - 1)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "n_chapters": len(chapter_book),
+        "n_verses": len(verse_offsets) - 1,
+        "volumes": volumes,
+        "books": books,
+    }
+    return write_packed(out_path, MAGIC, header, [
+        ("chapter_book", chapter_book),
+        ("chapter_number", chapter_number),
+        ("chapter_first_verse", chapter_first_verse),
+        ("verse_offsets", verse_offsets),
+        ("text", text),
+    ])
+
+# ---------------------------------------------------------------------------
+# Loader
+# ---------------------------------------------------------------------------
+
+class Corpus:
+    """Read-only, memory-mapped view of a corpus built by :func:`build_corpus`.
+
+    Verse accessors return ``memoryview`` slices of the mapping, so nothing is
+    copied until the caller decodes the text.
+    """
+
+    def __init__(self, path: Path = CORPUS_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+        self.path = self._packed.path
+        self.header = self._packed.header
+
+        self.volumes: List[dict] = self.header["volumes"]
+        self.books: List[dict] = self.header["books"]
+        self._book_index = {b["id"]: i for i, b in enumerate(self.books)}
+
+        self.chapter_book = self._packed.column("chapter_book")
+        self.chapter_number = self._packed.column("chapter_number")
+        self.chapter_first_verse = self._packed.column("chapter_first_verse")
+        self.verse_offsets = self._packed.column("verse_offsets")
+        self.text = self._packed.column("text")
+
+    # -- lifecycle ----------------------------------------------------------
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- sizes --------------------------------------------------------------
+    def __len__(self) -> int:
+        return self.header["n_verses"]
+
+    @property
+    def n_chapters(self) -> int:
+        return self.header["n_chapters"]
+
+    # -- lookups ------------------------------------------------------------
+    def chapter_index(self, book_id: str, chapter: int) -> int:
+        """Global chapter index for ``book_id`` chapter *chapter* (1-based)."""
+        try:
+            book = self.books[self._book_index[book_id]]
+        except KeyError:
+            raise KeyError(f"Unknown book {book_id!r}") from None
+        idx = book["first_chapter"] + chapter - 1
+        if chapter < 1 or idx >= self.n_chapters or self.chapter_book[idx] != self._book_index[book_id]:
+            raise KeyError(f"{book_id} has no chapter {chapter}")
+        return idx
+
+    def chapter_range(self, book_id: str, chapter: int) -> range:
+        """Verse IDs belonging to one chapter."""
+        idx = self.chapter_index(book_id, chapter)
+        return range(self.chapter_first_verse[idx], self.chapter_first_verse[idx + 1])
+
+    def locate(self, book_id: str, chapter: int, verse: int) -> int:
+        """Verse ID for ``book_id chapter:verse`` (all 1-based)."""
+        verses = self.chapter_range(book_id, chapter)
+        if not 1 <= verse <= len(verses):
+            raise KeyError(f"{book_id} {chapter} has no verse {verse}")
+        return verses[verse - 1]
+
+    def chapter_of(self, verse_id: int) -> int:
+        """Global chapter index containing *verse_id*."""
+        if not 0 <= verse_id < len(self):
+            raise IndexError(verse_id)
+        return bisect_right(self.chapter_first_verse, verse_id) - 1
+
+    def verse_key(self, verse_id: int) -> Tuple[str, str, int, int]:
+        """``(volume_id, book_id, chapter, verse)`` for a verse ID."""
+        ch = self.chapter_of(verse_id)
+        book = self.books[self.chapter_book[ch]]
+        return (
+            self.volumes[book["volume"]]["id"],
+            book["id"],
+            self.chapter_number[ch],
+            verse_id - self.chapter_first_verse[ch] + 1,
+        )
+
+    def chapters(self) -> Iterator[Tuple[str, int, int]]:
+        """Yield ``(book_id, chapter, verse_count)`` in canonical order."""
+        for ch in range(self.n_chapters):
+            yield (
+                self.books[self.chapter_book[ch]]["id"],
+                self.chapter_number[ch],
+                self.chapter_first_verse[ch + 1] - self.chapter_first_verse[ch],
+            )
+
+    # -- text ---------------------------------------------------------------
+    def verse_bytes(self, verse_id: int) -> memoryview:
+        """Zero-copy UTF-8 slice for one verse."""
+        if not 0 <= verse_id < len(self):
+            raise IndexError(verse_id)
+        return self.text[self.verse_offsets[verse_id]:self.verse_offsets[verse_id + 1]]
+
+    def verse_text(self, verse_id: int) -> str:
+        return str(self.verse_bytes(verse_id), "utf-8")
+
+    def span_bytes(self, first: int, last: int) -> memoryview:
+        """Zero-copy slice covering verses ``first .. last`` (inclusive)."""
+        if not 0 <= first <= last < len(self):
+            raise IndexError((first, last))
+        return self.text[self.verse_offsets[first]:self.verse_offsets[last + 1]]
+
+    def prefetch(self, first: int, last: int) -> None:
+        """Start paging in the text of verses ``first .. last`` (inclusive) in the background."""
+        base = self.header["sections"]["text"][0]
+        start = self.verse_offsets[first]
+        self._packed.willneed(base + start, self.verse_offsets[last + 1] - start)
+
+    def iter_verses(self, verses: Optional[range] = None) -> Iterator[Tuple[int, str]]:
+        """Yield ``(verse_id, text)`` for *verses* (default: the whole corpus)."""
+        for verse_id in verses if verses is not None else range(len(self)):
+            yield verse_id, self.verse_text(verse_id)
+
+
+def open_corpus(path: Optional[Path] = None, data_dir: Path = DATA_DIR) -> Corpus:
+    """Open the packed corpus of *data_dir*, building it first if it does not exist yet.
+
+    *path* defaults to :func:`corpus_path` of *data_dir*, so each data
+    directory gets its own corpus file wherever the process runs from.
+    """
+    path = corpus_path(data_dir) if path is None else path
+    if not Path(path).exists():
+        build_corpus(data_dir, path)
+    return Corpus(path)
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Pack scripture chapter JSON into one memory-mapped corpus file")
+    ap.add_argument("--data-dir", type=Path, default=DATA_DIR, help="Directory written by fetch_books_data.py")
+    ap.add_argument("--out", type=Path, default=None, help="Output corpus file (default: <data-dir>/build/corpus.bin)")
+    args = ap.parse_args()
+    args.out = args.out or corpus_path(args.data_dir)
+
+    start = time.time()
+    header = build_corpus(args.data_dir, args.out)
+    print(
+        f"Packed {header['n_verses']} verses in {header['n_chapters']} chapters "
+        f"into {args.out} ({time.time() - start:.2f}s)"
+    )
+
+    start = time.perf_counter()
+    with Corpus(args.out) as corpus:
+        corpus.verse_text(len(corpus) - 1)
+    print(f"Cold open + first read: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
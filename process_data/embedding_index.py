@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import zlib
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from corpus_store import BUILD_DIR, DATA_DIR
+from search_index import iter_documents, tokenize
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional: without it the hashing encoder is used
+    SentenceTransformer = None
+
+"""
+Dense-vector index for semantic search over verses, dictionary / Topical
+Guide paragraphs and conference talk paragraphs.
+
+Documents come from ``search_index.iter_documents`` and are encoded in large
+batches on the CPU. With ``sentence-transformers`` installed the default
+encoder is ``DEFAULT_MODEL`` (``all-MiniLM-L6-v2``) and any other local model
+can be chosen with ``--model``; without it, or with ``--model hashing``, a
+dependency-free hashing encoder (signed feature hashing of word unigrams and
+bigrams) keeps the pipeline usable offline.
+
+Vectors are L2-normalised and stored row by row in a memory-mapped matrix,
+either float16 or int8 with one float32 scale per row. An IVF index (k-means
+centroids, one inverted list per centroid) narrows each query to the
+``nprobe`` closest lists; rows are scored exactly inside those lists.
+
+Everything in the index directory is append-only: ``update`` encodes only
+documents whose key is not in ``keys.txt`` yet, appends their vectors and
+assigns them to the existing centroids, so new talks never trigger a
+re-embedding of the corpus. ``--retrain`` recomputes the centroids. The row
+count in ``meta.json`` is written last and is authoritative: rows past it
+(left by an interrupted update) are cut off before the next append.
+
+    embeddings/
+        meta.json      dim, dtype, encoder, row count, IVF settings
+        keys.txt       "<source>\\t<locator>" per row
+        vectors.bin    float16[n, dim] or int8[n, dim]
+        scales.bin     float32[n]          (int8 only)
+        centroids.npy  float32[nlist, dim]
+        assign.bin     int32[n]            centroid of each row
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+INDEX_DIR = BUILD_DIR / "embeddings"
+FORMAT_VERSION = 1
+
+HASHING_ENCODER = "hashing"
+DEFAULT_MODEL = "all-MiniLM-L6-v2" if SentenceTransformer is not None else HASHING_ENCODER
+DEFAULT_DIM = 384
+DEFAULT_BATCH = 512
+DTYPES = {"float16": np.float16, "int8": np.int8}
+
+# IVF: about sqrt(n) lists, trained on a sample, queried with a few probes.
+TRAIN_SAMPLE = 50_000
+KMEANS_ITERS = 12
+DEFAULT_NPROBE = 8
+
+# ---------------------------------------------------------------------------
+# Encoders
+# ---------------------------------------------------------------------------
+
+class HashingEncoder:
+    """Signed feature hashing of unigrams + bigrams with sublinear term weights."""
+
+    name = HASHING_ENCODER
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> Iterator[int]:
+        tokens = tokenize(text)
+        yield from (zlib.crc32(t.encode("utf-8")) for t in tokens)
+        yield from (zlib.crc32(f"{a} {b}".encode("utf-8")) for a, b in zip(tokens, tokens[1:]))
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        rows, hashes = [], []
+        for i, text in enumerate(texts):
+            h = list(self._features(text))
+            hashes.extend(h)
+            rows.extend([i] * len(h))
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = (hashes % self.dim).astype(np.int64)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(out, (rows, cols), signs)
+        out = np.sign(out) * np.log1p(np.abs(out))
+        return _normalize(out)
+
+
+class SentenceEncoder:
+    """Wrapper around a local sentence-transformers model."""
+
+    def __init__(self, model: str, batch_size: int = 64):
+        if SentenceTransformer is None:
+            raise RuntimeError(f"Encoder {model!r} requires the sentence-transformers package")
+        self.name = model
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vecs = self._model.encode(list(texts), batch_size=self.batch_size, convert_to_numpy=True)
+        return _normalize(vecs.astype(np.float32))
+
+
+def load_encoder(name: str = DEFAULT_MODEL, dim: int = DEFAULT_DIM):
+    return HashingEncoder(dim) if name == HASHING_ENCODER else SentenceEncoder(name)
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-12)
+
+# ---------------------------------------------------------------------------
+# Quantisation / k-means
+# ---------------------------------------------------------------------------
+
+def quantize(vecs: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """``(stored rows, per-row scales or None)``."""
+    if dtype == "float16":
+        return vecs.astype(np.float16), None
+    scales = np.maximum(np.abs(vecs).max(axis=1), 1e-12) / 127.0
+    return np.round(vecs / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def kmeans(sample: np.ndarray, k: int, iters: int = KMEANS_ITERS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (cosine) on unit vectors."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=k) == 0
+        # Re-seed empty lists with random sample rows.
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class EmbeddingIndex:
+    """Append-only vector store with an IVF index; see the module docstring."""
+
+    def __init__(self, directory: Path = INDEX_DIR):
+        self.directory = Path(directory)
+        meta_path = self.directory / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No embedding index in {self.directory}; run 'build' first")
+        self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported embedding index version {self.meta.get('version')}")
+        self.dim: int = self.meta["dim"]
+        self.dtype: str = self.meta["dtype"]
+        self._encoder = None
+        self.reload()
+
+    # -- creation -----------------------------------------------------------
+    @classmethod
+    def create(cls, directory: Path = INDEX_DIR, encoder: str = DEFAULT_MODEL, dim: int = DEFAULT_DIM,
+               dtype: str = "float16") -> "EmbeddingIndex":
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {list(DTYPES)}")
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ("keys.txt", "vectors.bin", "scales.bin", "assign.bin", "centroids.npy"):
+            (directory / name).unlink(missing_ok=True)
+        enc = load_encoder(encoder, dim)
+        meta = {"version": FORMAT_VERSION, "encoder": enc.name, "dim": enc.dim, "dtype": dtype, "n": 0, "nlist": 0}
+        (directory / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        index = cls(directory)
+        index._encoder = enc
+        return index
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = load_encoder(self.meta["encoder"], self.dim)
+        return self._encoder
+
+    # -- loading ------------------------------------------------------------
+    def _memmap(self, name: str, dtype, shape) -> np.ndarray:
+        path = self.directory / name
+        if not shape[0] or not path.exists():
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def reload(self) -> None:
+        """(Re)map the files after they have been appended to."""
+        n = self.meta["n"]
+        keys_path = self.directory / "keys.txt"
+        self.keys: List[str] = keys_path.read_text(encoding="utf-8").split("\n")[:n] if n else []
+        self._key_set = set(self.keys)
+        self.sources = np.array([k.split("\t", 1)[0] for k in self.keys], dtype=object)
+        self.vectors = self._memmap("vectors.bin", DTYPES[self.dtype], (n, self.dim))
+        self.scales = self._memmap("scales.bin", np.float32, (n,)) if self.dtype == "int8" else None
+        self.assign = self._memmap("assign.bin", np.int32, (n,))
+        centroids_path = self.directory / "centroids.npy"
+        self.centroids = np.load(centroids_path) if centroids_path.exists() else None
+        if self.centroids is not None:
+            # Inverted lists: rows grouped by centroid.
+            self._order = np.argsort(self.assign, kind="stable")
+            self._list_offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.assign, minlength=len(self.centroids)), out=self._list_offsets[1:])
+
+    def __len__(self) -> int:
+        return self.meta["n"]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_set
+
+    def _save_meta(self) -> None:
+        tmp = self.directory / "meta.json.tmp"
+        tmp.write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+        tmp.replace(self.directory / "meta.json")
+
+    # -- writing ------------------------------------------------------------
+    def _nearest_centroid(self, vecs: np.ndarray) -> np.ndarray:
+        return np.argmax(vecs @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _truncate(self) -> None:
+        """Cut every row file back to the ``meta.json`` row count.
+
+        An interrupted update can leave rows past ``meta["n"]``, and the four
+        files at different lengths; appending after them would misalign
+        vectors and keys.
+        """
+        n = self.meta["n"]
+        row_bytes = {
+            "vectors.bin": n * self.dim * np.dtype(DTYPES[self.dtype]).itemsize,
+            "scales.bin": n * 4 if self.dtype == "int8" else 0,
+            "assign.bin": n * 4,
+        }
+        for name, size in row_bytes.items():
+            path = self.directory / name
+            if path.exists() and path.stat().st_size != size:
+                with path.open("r+b") as fp:
+                    fp.truncate(size)
+        keys_path = self.directory / "keys.txt"
+        if keys_path.exists():
+            data = keys_path.read_bytes()
+            end = 0
+            for _ in range(n):
+                end = data.index(b"\n", end) + 1
+            if end != len(data):
+                with keys_path.open("r+b") as fp:
+                    fp.truncate(end)
+
+    def update(self, documents: Iterable[Tuple[str, str, str]], batch_size: int = DEFAULT_BATCH,
+               progress: bool = True) -> int:
+        """Encode and append documents whose key is new; return how many were added.
+
+        Files are appended batch by batch and ``meta.json`` (the row count) is
+        written last, so an interrupted update leaves the index readable, and
+        the next update first truncates the rows it left behind.
+        """
+        self._truncate()
+        added = 0
+        start = time.time()
+        new_docs = (
+            (f"{source}\t{locator}", text)
+            for source, locator, text in documents
+            if f"{source}\t{locator}" not in self._key_set
+        )
+        with (self.directory / "vectors.bin").open("ab") as vec_fp, \
+                (self.directory / "keys.txt").open("a", encoding="utf-8") as key_fp, \
+                (self.directory / "assign.bin").open("ab") as assign_fp, \
+                (self.directory / "scales.bin").open("ab") as scale_fp:
+            for batch in _batched(new_docs, batch_size):
+                keys = [k for k, _ in batch]
+                vecs = self.encoder.encode([t for _, t in batch])
+                rows, scales = quantize(vecs, self.dtype)
+                vec_fp.write(rows.tobytes())
+                if scales is not None:
+                    scale_fp.write(scales.tobytes())
+                assign = self._nearest_centroid(vecs) if self.centroids is not None else np.zeros(len(keys), np.int32)
+                assign_fp.write(assign.tobytes())
+                key_fp.write("".join(f"{k}\n" for k in keys))
+                self._key_set.update(keys)
+                added += len(keys)
+                if progress:
+                    rate = added / max(time.time() - start, 1e-9)
+                    print(f"\rEncoded {added} documents ({rate:.0f}/s)", end="", flush=True)
+        if progress and added:
+            print()
+        self.meta["n"] += added
+        self._save_meta()
+        self.reload()
+        return added
+
+    def train(self, nlist: Optional[int] = None, seed: int = 0) -> None:
+        """(Re)compute IVF centroids from a sample and re-assign every row."""
+        n = len(self)
+        if not n:
+            return
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+        sample_ids = np.sort(rng.choice(n, size=min(n, TRAIN_SAMPLE), replace=False))
+        centroids = kmeans(self._rows(sample_ids), nlist, seed=seed)
+        assign = np.empty(n, dtype=np.int32)
+        for lo in range(0, n, 65536):
+            rows = np.arange(lo, min(n, lo + 65536))
+            assign[rows] = np.argmax(self._rows(rows) @ centroids.T, axis=1)
+        np.save(self.directory / "centroids.npy", centroids)
+        assign.tofile(self.directory / "assign.bin")
+        self.meta["nlist"] = int(nlist)
+        self._save_meta()
+        self.reload()
+
+    # -- search -------------------------------------------------------------
+    def _rows(self, ids: np.ndarray) -> np.ndarray:
+        """Dequantised float32 rows."""
+        rows = np.asarray(self.vectors[ids], dtype=np.float32)
+        if self.scales is not None:
+            rows *= self.scales[ids][:, None]
+        return rows
+
+    def search_vector(self, query: np.ndarray, k: int = 10, nprobe: int = DEFAULT_NPROBE,
+                      sources: Optional[Sequence[str]] = None) -> List[Tuple[str, str, float]]:
+        if not len(self):
+            return []
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if self.centroids is None or nprobe >= len(self.centroids):
+            candidates = np.arange(len(self))
+        else:
+            lists = np.argpartition(-(self.centroids @ query), nprobe)[:nprobe]
+            candidates = np.concatenate([
+                self._order[self._list_offsets[c]:self._list_offsets[c + 1]] for c in lists
+            ])
+        if sources:
+            candidates = candidates[np.isin(self.sources[candidates], list(sources))]
+            if len(candidates) < k:
+                # The probed lists hold too few rows of these sources: scan them all.
+                candidates = np.flatnonzero(np.isin(self.sources, list(sources)))
+            if not len(candidates):
+                return []
+        candidates = np.sort(candidates)
+        scores = self._rows(candidates) @ query
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        out = []
+        for i in top:
+            source, locator = self.keys[candidates[i]].split("\t", 1)
+            out.append((source, locator, float(scores[i])))
+        return out
+
+    def search(self, text: str, k: int = 10, nprobe: int = DEFAULT_NPROBE,
+               sources: Optional[Sequence[str]] = None) -> List[Tuple[str, str, float]]:
+        """Top-*k* ``(source, locator, cosine)`` for a free-text query."""
+        return self.search_vector(self.encoder.encode([text])[0], k, nprobe, sources)
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Build, update or query the embedding index")
+    ap.add_argument("--index", type=Path, default=None, help="Index directory (default: <data-dir>/build/embeddings)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Embed everything from scratch")
+    b.add_argument("--model", default=DEFAULT_MODEL,
+                   help=f"sentence-transformers model name, or 'hashing' (default: {DEFAULT_MODEL})")
+    b.add_argument("--dim", type=int, default=DEFAULT_DIM, help="Dimensions of the hashing encoder")
+    b.add_argument("--dtype", choices=list(DTYPES), default="float16")
+    b.add_argument("--nlist", type=int, default=None, help="IVF lists (default: sqrt(n))")
+
+    for name, help_text in (("build", None), ("update", "Embed only documents not indexed yet")):
+        p = b if name == "build" else sub.add_parser(name, help=help_text)
+        p.add_argument("--data-dir", type=Path, default=DATA_DIR)
+        p.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json)")
+        p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH)
+    sub.choices["update"].add_argument("--retrain", action="store_true", help="Recompute IVF centroids afterwards")
+
+    q = sub.add_parser("query", help="Semantic search")
+    q.add_argument("query")
+    q.add_argument("-k", type=int, default=10)
+    q.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    q.add_argument("--source", action="append", help="Restrict to a source (repeatable)")
+    q.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    args = ap.parse_args()
+    args.index = args.index or Path(args.data_dir) / "build" / INDEX_DIR.name
+
+    start = time.time()
+    if args.command == "build":
+        index = EmbeddingIndex.create(args.index, args.model, args.dim, args.dtype)
+        index.update(iter_documents(args.data_dir, args.talks), args.batch_size)
+        index.train(args.nlist)
+        print(f"Embedded {len(index)} documents into {args.index} "
+              f"({index.meta['nlist']} IVF lists, {time.time() - start:.1f}s)")
+        return
+
+    index = EmbeddingIndex(args.index)
+    if args.command == "update":
+        added = index.update(iter_documents(args.data_dir, args.talks), args.batch_size)
+        if args.retrain:
+            index.train(index.meta["nlist"] or None)
+        print(f"Added {added} documents; index holds {len(index)} ({time.time() - start:.1f}s)")
+        return
+
+    hits = index.search(args.query, args.k, args.nprobe, args.source)
+    elapsed = (time.time() - start) * 1000
+    for source, locator, score in hits:
+        print(f"{score:6.3f}  {source:<16} {locator}")
+    print(f"\n{len(hits)} hits in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
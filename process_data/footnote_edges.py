@@ -0,0 +1,482 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from corpus_store import BUILD_DIR, DATA_DIR, PackedFile, iter_chapter_files, open_corpus, verse_footnotes, write_packed
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from scripture_refs import BOOKS, VERSE_PART_RE, Ref, VerseTable, format_ref  # noqa: E402
+
+"""
+Structured edges from the verse footnotes of the chapter JSON.
+
+Each footnote is a short free-text string attached to a character span of the
+verse (``start`` / ``end``):
+
+    "Mosiah 1:2 (2–3); D&C 68:25 (25, 28). TG Honoring Father and Mother."
+    "1 Ne. 16:10 (10, 16, 26); 18:12 (12, 21); 2 Ne. 5:12."
+    "Ps. 2:9; Rev. 2:27; JST Rev. 19:15 (Rev. 19:15 note a)."
+    "GR narrow; see also 2 Ne. 31:17–21."
+
+:func:`parse_footnote` turns one string into typed links:
+
+    ref       a cross-reference ("Mosiah 1:2"); a bare "18:12" keeps the
+              previous book
+    context   the parenthetical range around it ("(2–3)", "(25, 28)")
+    jst       a Joseph Smith Translation passage, linked to the KJV verse
+    tg / bd   Topical Guide / Bible Dictionary topics ("TG A; B")
+
+IE / OR / HEB / GR glosses carry no link except an embedded "see also", and
+chapter-only references ("Alma 31–62") parse but resolve to no verse. Book
+names are matched by one compiled alternation of every footnote abbreviation
+and full name (longest first), so a string is parsed with a handful of regex
+calls and no backtracking over book names; identical strings (most TG notes)
+hit an LRU cache.
+
+:func:`build_edges` parses every chapter file, in parallel processes when
+there are several cores, and writes an array-backed edge list
+(``data/build/footnote_edges.bin``): one row per footnote (verse, start, end)
+and one row per edge (footnote, kind, target). Targets are verse IDs for
+ref / context / jst and topic IDs for tg / bd.
+
+    python process_data/footnote_edges.py build
+    python process_data/footnote_edges.py show "Mosiah 3:19"
+    python process_data/footnote_edges.py parse "D&C 68:25 (25, 28). TG Family."
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+EDGES_PATH = BUILD_DIR / "footnote_edges.bin"
+
+KINDS = ["ref", "context", "jst", "tg", "bd"]
+VERSE_KINDS = frozenset(["ref", "context", "jst"])
+TOPIC_PREFIXES = {"TG": "tg", "BD": "bd"}
+GLOSS_PREFIXES = ["IE", "OR", "HEB", "GR"]      # alternate readings; no link of their own
+
+BATCH_CHAPTERS = 64             # chapter files per worker task
+
+MAGIC = b"DLFNOTES"
+FORMAT_VERSION = 1
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def _book_spellings() -> Dict[str, str]:
+    """Every book name and footnote abbreviation (plus hyphenated "JS-H") -> book_id."""
+    spellings: Dict[str, str] = {}
+    for book_id, name, abbr, _slug in BOOKS:
+        for spelling in (name, abbr):
+            spellings[spelling] = spellings[spelling.replace("—", "-")] = book_id
+    return spellings
+
+
+BOOK_SPELLINGS = _book_spellings()
+BOOK_PATTERN = "|".join(re.escape(s) for s in sorted(BOOK_SPELLINGS, key=len, reverse=True))
+VERSES_PATTERN = r"\d+(?:\s*[-–—]\s*\d+(?:\s*:\s*\d+)?)?(?:\s*,\s*\d+(?:\s*[-–—]\s*\d+)?)*"
+
+# "[Book] chapter[–chapter]" optionally followed by ":" and verse items
+REF_HEAD_RE = re.compile(
+    rf"(?:(?P<book>{BOOK_PATTERN})\s*)?(?P<chapter>\d+)(?:\s*[-–—]\s*(?P<last_chapter>\d+))?(?P<colon>\s*:\s*)?"
+)
+# one verse item "21", "21–23" or "43–33:2" with its own "(context)"
+VERSE_ITEM_RE = re.compile(r"(?P<verses>\d+(?:\s*[-–—]\s*\d+(?:\s*:\s*\d+)?)?)(?:\s*\((?P<context>[^)]*)\))?\s*")
+CONTEXT_RE = re.compile(rf"\s*{VERSES_PATTERN}\s*$")
+# ". " before a non-digit ("Ne. 3:7" is not a break), or a topic list after a quotation ("… TG Dream")
+SENTENCE_RE = re.compile(rf"\.\s+(?=[^\d\s])|\s+(?=(?:{'|'.join(TOPIC_PREFIXES)})\s)")
+PART_RE = re.compile(r";\s*(?![^()]*\))")          # semicolons outside parentheses
+PREFIX_RE = re.compile(rf"({'|'.join(['JST', *TOPIC_PREFIXES, *GLOSS_PREFIXES])})\s+")
+SEE_RE = re.compile(r"see(?: also)?\s+", re.I)
+
+
+class Link(NamedTuple):
+    """One parsed footnote link: a :class:`Ref` for verse kinds, a topic name for tg / bd."""
+
+    kind: str
+    target: Union[Ref, str]
+
+
+def _verse_refs(book_id: str, chapter: int, verses: str) -> List[Ref]:
+    refs = []
+    for first, last, last_verse in VERSE_PART_RE.findall(verses):
+        if last_verse:
+            refs.append(Ref(book_id, chapter, int(first), int(last_verse), int(last)))
+        else:
+            refs.append(Ref(book_id, chapter, int(first), int(last or first)))
+    return refs
+
+
+def _parse_ref_part(part: str, book_id: Optional[str], kind: str, links: List[Link]) -> Tuple[Optional[str], bool]:
+    """Append the links of one ``[Book] ch:v [(context)][, v [(context)]]`` part.
+
+    A part without a book continues the previous one (*book_id*); one without
+    verses is a chapter or chapter range ("Alma 31–62", a bare "52"). Returns
+    the book to carry into the next part and whether the whole part parsed.
+    JST parts only need to start with a reference (a quotation or
+    "(Appendix)" may follow).
+    """
+    m = REF_HEAD_RE.match(part)
+    if not m or (m.group("book") is None and book_id is None):
+        return book_id, False
+    book = BOOK_SPELLINGS[m.group("book")] if m.group("book") else book_id
+    chapter = int(m.group("chapter"))
+    n_links = len(links)
+    if not m.group("colon"):
+        last_chapter = int(m.group("last_chapter") or chapter)
+        if last_chapter < chapter or (kind != "jst" and m.end() != len(part)):
+            return book_id, False
+        links.extend(Link(kind, Ref(book, c)) for c in range(chapter, last_chapter + 1))
+        return book, True
+    if m.group("last_chapter"):
+        return book_id, False
+
+    pos = m.end()
+    while True:
+        item = VERSE_ITEM_RE.match(part, pos)
+        if not item:
+            break
+        links.extend(Link(kind, ref) for ref in _verse_refs(book, chapter, item.group("verses")))
+        context = item.group("context")
+        if kind == "ref" and context and CONTEXT_RE.match(context):
+            links.extend(Link("context", ref) for ref in _verse_refs(book, chapter, context))
+        pos = item.end()
+        if not part.startswith(",", pos):
+            break
+        pos += 1
+        while pos < len(part) and part[pos].isspace():
+            pos += 1
+    if len(links) == n_links or (kind != "jst" and pos != len(part)):
+        del links[n_links:]
+        return book_id, False
+    return book, True
+
+
+@lru_cache(maxsize=65536)
+def parse_footnote(text: str) -> Tuple[Tuple[Link, ...], int]:
+    """``(links, unparsed)`` for one footnote string.
+
+    *unparsed* counts parts that looked like references (they contain a digit)
+    but did not parse; quotations and glosses without digits are not counted.
+    """
+    links: List[Link] = []
+    unparsed = 0
+    text = text.replace("\xa0", " ").strip().rstrip(".")
+    for sentence in SENTENCE_RE.split(text):
+        mode = "ref"
+        book_id = None
+        for part in PART_RE.split(sentence):
+            part = part.strip()
+            m = SEE_RE.match(part)
+            if m:
+                part, mode = part[m.end():], "ref"
+            m = PREFIX_RE.match(part)
+            if m:
+                prefix, part = m.group(1), part[m.end():]
+                if prefix == "JST":
+                    book_id, ok = _parse_ref_part(part, None, "jst", links)
+                    unparsed += not ok
+                    mode = "ref"
+                    continue
+                mode = TOPIC_PREFIXES.get(prefix, "gloss")
+            if mode == "ref":
+                book_id, ok = _parse_ref_part(part, book_id, "ref", links)
+                unparsed += not ok and any(ch.isdigit() for ch in part)
+            elif mode != "gloss" and part:
+                links.append(Link(mode, part))
+    return tuple(links), unparsed
+
+
+def resolve_links(links: Sequence[Link], verses: VerseTable) -> Iterator[Tuple[str, Union[int, str]]]:
+    """``(kind, verse_id or topic name)`` for parsed links, de-duplicated.
+
+    Chapter-only references resolve to nothing; a context verse that is also
+    a direct reference of the same footnote is reported once, as ``ref``.
+    """
+    seen = set()
+    direct = set()
+    for link in links:
+        if link.kind == "ref":
+            direct.update(verses.expand(link.target))
+    for link in links:
+        if link.kind in VERSE_KINDS:
+            for verse_id in verses.expand(link.target):
+                if link.kind == "context" and verse_id in direct:
+                    continue
+                if (link.kind, verse_id) not in seen:
+                    seen.add((link.kind, verse_id))
+                    yield link.kind, verse_id
+        elif (link.kind, link.target) not in seen:
+            seen.add((link.kind, link.target))
+            yield link.kind, link.target
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+_worker_verses: Optional[VerseTable] = None
+
+
+def _init_worker(chapters: List[Tuple[str, int, int]]) -> None:
+    global _worker_verses
+    _worker_verses = VerseTable(chapters)
+
+
+def _parse_chapters(batch: List[Tuple[int, str]]) -> dict:
+    """Parse the footnotes of ``(first verse ID, path)`` chapter files.
+
+    Topic targets are indices into the batch's own ``topics`` list; the parent
+    maps them to global IDs.
+    """
+    verses = _worker_verses
+    kind_code = {kind: i for i, kind in enumerate(KINDS)}
+    out = {
+        "note_verse": array("I"), "note_start": array("I"), "note_end": array("I"),
+        "edge_note": array("I"), "edge_kind": array("B"), "edge_target": array("I"),
+        "topics": [], "unparsed": 0, "unresolved": 0, "n_verses": 0,
+    }
+    topic_index: Dict[Tuple[str, str], int] = {}
+    for verse_id, path in batch:
+        chapter_verses = json.loads(Path(path).read_text(encoding="utf-8"))["chapter"]["verses"]
+        out["n_verses"] += len(chapter_verses)
+        for verse in chapter_verses:
+            for note in verse_footnotes(verse):
+                note_id = len(out["note_verse"])
+                out["note_verse"].append(verse_id)
+                out["note_start"].append(note.get("start", 0))
+                out["note_end"].append(note.get("end", 0))
+                links, unparsed = parse_footnote(note.get("footnote", ""))
+                out["unparsed"] += unparsed
+                resolved = 0
+                for kind, target in resolve_links(links, verses):
+                    if kind not in VERSE_KINDS:
+                        key = (kind, target)
+                        if key not in topic_index:
+                            topic_index[key] = len(out["topics"])
+                            out["topics"].append(key)
+                        target = topic_index[key]
+                    out["edge_note"].append(note_id)
+                    out["edge_kind"].append(kind_code[kind])
+                    out["edge_target"].append(target)
+                    resolved += 1
+                out["unresolved"] += bool(links) and not resolved
+            verse_id += 1
+    return out
+
+
+def _batches(data_dir: Path, verses: VerseTable) -> List[List[Tuple[int, str]]]:
+    files = [(verses.chapter_range(book_id, chapter).start, str(path))
+             for _volume_id, book_id, chapter, path in iter_chapter_files(data_dir)]
+    return [files[i:i + BATCH_CHAPTERS] for i in range(0, len(files), BATCH_CHAPTERS)]
+
+
+def build_edges(data_dir: Path = DATA_DIR, out_path: Path = EDGES_PATH, workers: Optional[int] = None) -> dict:
+    """Parse every verse footnote under *data_dir* and write the edge list.
+
+    *workers* defaults to the number of cores; 1 parses in this process.
+    """
+    with open_corpus(data_dir=data_dir) as corpus:
+        verses = VerseTable.from_corpus(corpus)
+    chapters = list(verses.chapters())
+    batches = _batches(Path(data_dir), verses)
+    workers = min(workers or os.cpu_count() or 1, len(batches)) or 1
+
+    if workers == 1:
+        _init_worker(chapters)
+        results = map(_parse_chapters, batches)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(chapters,))
+        results = pool.map(_parse_chapters, batches)
+
+    columns = {name: array(code) for name, code in (
+        ("note_verse", "I"), ("note_start", "I"), ("note_end", "I"),
+        ("edge_note", "I"), ("edge_kind", "B"), ("edge_target", "I"),
+    )}
+    topics: List[Tuple[str, str]] = []
+    topic_ids: Dict[Tuple[str, str], int] = {}
+    unparsed = unresolved = n_verses = 0
+    try:
+        for part in results:  # in batch order, so note and verse IDs stay sorted
+            local = np.empty(len(part["topics"]), dtype=np.uint32)
+            for i, key in enumerate(part["topics"]):
+                if key not in topic_ids:
+                    topic_ids[key] = len(topics)
+                    topics.append(key)
+                local[i] = topic_ids[key]
+            kinds = np.frombuffer(part["edge_kind"], dtype=np.uint8)
+            targets = np.frombuffer(part["edge_target"], dtype=np.uint32).copy()
+            is_topic = kinds >= KINDS.index("tg")
+            targets[is_topic] = local[targets[is_topic]]
+            notes = np.frombuffer(part["edge_note"], dtype=np.uint32) + len(columns["note_verse"])
+
+            for name in ("note_verse", "note_start", "note_end", "edge_kind"):
+                columns[name].extend(part[name])
+            columns["edge_note"].frombytes(notes.astype(np.uint32).tobytes())
+            columns["edge_target"].frombytes(targets.tobytes())
+            unparsed += part["unparsed"]
+            unresolved += part["unresolved"]
+            n_verses += part["n_verses"]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if n_verses != len(verses):
+        raise ValueError(f"Chapter files hold {n_verses} verses but the corpus has {len(verses)}; rebuild the corpus")
+
+    edge_kind = np.frombuffer(columns["edge_kind"], dtype=np.uint8)
+    header = {
+        "version": FORMAT_VERSION,
+        "kinds": KINDS,
+        "n_verses": n_verses,
+        "n_notes": len(columns["note_verse"]),
+        "n_edges": {kind: int((edge_kind == i).sum()) for i, kind in enumerate(KINDS)},
+        "n_topics": len(topics),
+        "unparsed_parts": unparsed,
+        "unresolved_notes": unresolved,
+    }
+    return write_packed(out_path, MAGIC, header, list(columns.items()) + [
+        ("topic_kind", np.asarray([KINDS.index(kind) for kind, _name in topics], dtype=np.uint8)),
+        ("topic_names", "\n".join(name for _kind, name in topics).encode("utf-8")),
+    ])
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+class FootnoteEdges:
+    """Memory-mapped reader for an edge list written by :func:`build_edges`."""
+
+    def __init__(self, path: Path = EDGES_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+        header = self._packed.header
+        self.kinds: List[str] = header["kinds"]
+        self.n_edges: Dict[str, int] = header["n_edges"]
+
+        def col(name, dtype):
+            return np.frombuffer(self._packed.raw(name), dtype=dtype)
+
+        self.note_verse = col("note_verse", np.uint32)
+        self.note_start = col("note_start", np.uint32)
+        self.note_end = col("note_end", np.uint32)
+        self.edge_note = col("edge_note", np.uint32)
+        self.edge_kind = col("edge_kind", np.uint8)
+        self.edge_target = col("edge_target", np.uint32)
+        self.topic_kind = col("topic_kind", np.uint8)
+        names = str(self._packed.raw("topic_names"), "utf-8")
+        self.topic_names: List[str] = names.split("\n") if names else []
+
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "FootnoteEdges":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def edges(self, kind: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Every edge of *kind* as parallel ``(source verse IDs, targets)`` arrays."""
+        mask = self.edge_kind == self.kinds.index(kind)
+        return self.note_verse[self.edge_note[mask]], self.edge_target[mask]
+
+    def notes(self, verse_id: int) -> range:
+        """Footnote IDs of one verse (footnotes are stored in verse order)."""
+        lo, hi = np.searchsorted(self.note_verse, [verse_id, verse_id + 1])
+        return range(int(lo), int(hi))
+
+    def note_edges(self, note_id: int) -> List[Tuple[str, int]]:
+        """``(kind, target)`` edges of one footnote."""
+        lo, hi = np.searchsorted(self.edge_note, [note_id, note_id + 1])
+        return [(self.kinds[k], int(t)) for k, t in zip(self.edge_kind[lo:hi], self.edge_target[lo:hi])]
+
+    def topic(self, topic_id: int) -> Tuple[str, str]:
+        """``(kind, name)`` of a TG / BD topic."""
+        return self.kinds[self.topic_kind[topic_id]], self.topic_names[topic_id]
+
+
+def open_edges(path: Path = EDGES_PATH, data_dir: Path = DATA_DIR) -> FootnoteEdges:
+    """Open the footnote edge list, building it first if needed."""
+    if not Path(path).exists():
+        build_edges(data_dir, path)
+    return FootnoteEdges(path)
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def ref_label(ref: Ref) -> str:
+    """"Book ch:first–last" for a parsed Ref (chapter-only refs as "Book ch")."""
+    if ref.first is None:
+        return format_ref(ref.book_id, ref.chapter)
+    label = format_ref(ref.book_id, ref.chapter, ref.first)
+    if ref.last_chapter and ref.last_chapter != ref.chapter:
+        return f"{label}–{ref.last_chapter}:{ref.last}"
+    return f"{label}–{ref.last}" if ref.last != ref.first else label
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parse verse footnotes into typed cross-reference / topic edges")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Parse every chapter file and write the edge list")
+    b.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    b.add_argument("--out", type=Path, default=None, help="Output edge list (default: <data-dir>/build/footnote_edges.bin)")
+    b.add_argument("--workers", type=int, default=None, help="Processes (default: one per core; 1 = no pool)")
+
+    s = sub.add_parser("show", help='Footnote edges of a verse, e.g. "Mosiah 3:19"')
+    s.add_argument("reference")
+    s.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    s.add_argument("--edges", type=Path, default=None, help="Edge list, built if missing (default: <data-dir>/build/footnote_edges.bin)")
+
+    p = sub.add_parser("parse", help="Parse one footnote string")
+    p.add_argument("text")
+    args = ap.parse_args()
+
+    if args.command == "build":
+        start = time.time()
+        args.out = args.out or Path(args.data_dir) / "build" / EDGES_PATH.name
+        header = build_edges(args.data_dir, args.out, args.workers)
+        counts = ", ".join(f"{kind} {n}" for kind, n in header["n_edges"].items())
+        print(f"Wrote {args.out}: {header['n_notes']} footnotes / {counts} "
+              f"({time.time() - start:.1f}s)")
+        print(f"{header['unparsed_parts']} reference-like parts did not parse; "
+              f"{header['unresolved_notes']} footnotes resolved to nothing")
+        return
+
+    if args.command == "parse":
+        links, unparsed = parse_footnote(args.text)
+        for kind, target in links:
+            print(f"{kind:<8} {ref_label(target) if isinstance(target, Ref) else target}")
+        if unparsed:
+            print(f"({unparsed} part(s) did not parse)")
+        return
+
+    args.edges = args.edges or Path(args.data_dir) / "build" / EDGES_PATH.name
+    with open_corpus(data_dir=args.data_dir) as corpus, open_edges(args.edges, args.data_dir) as edges:
+        verses = VerseTable.from_corpus(corpus)
+        verse_ids = verses.resolve(args.reference)
+        if not verse_ids:
+            raise SystemExit(f"Could not resolve {args.reference!r} to a verse")
+        for verse_id in verse_ids:
+            print(verses.label(verse_id))
+            for note_id in edges.notes(verse_id):
+                print(f"  [{edges.note_start[note_id]}:{edges.note_end[note_id]}]")
+                for kind, target in edges.note_edges(note_id):
+                    label = verses.label(target) if kind in VERSE_KINDS else edges.topic(target)[1]
+                    print(f"    {kind:<8} {label}")
+
+
+if __name__ == "__main__":
+    main()
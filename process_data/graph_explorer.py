@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from citation_graph import GRAPH_PATH, CitationGraph, open_graph
+from corpus_store import DATA_DIR, open_corpus
+from graph_rag import EXPANSION, NODE_TYPES
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from scripture_refs import VerseTable  # noqa: E402
+
+"""
+Bounded neighbourhoods of the citation graph for interactive display.
+
+Everything a graph view needs is computed here, on the server:
+
+* a breadth-first neighbourhood around one node (verse, talk or TG / BD
+  entry), following the same edges as graph_rag.py;
+* degree-capped sampling: a node with more than ``cap`` neighbours (a verse
+  cited by thousands of talks) contributes a deterministic random sample of
+  ``cap`` of them and reports how many were left out;
+* a hard limit on the number of nodes, plus every edge between the nodes
+  that made it in;
+* a force-directed (Fruchterman-Reingold) layout in NumPy with the centre
+  pinned at the origin.
+
+The result is a small JSON-able dict, so a front end only ever receives a
+bounded subgraph with ready-made coordinates.
+
+    python process_data/graph_explorer.py "Mosiah 3:19" --hops 2 --cap 15
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+DEFAULT_HOPS = 1
+DEFAULT_CAP = 20
+DEFAULT_MAX_NODES = 150
+LAYOUT_ITERATIONS = 120
+
+# relation -> (edge label, True when the stored direction is target -> source)
+EDGE_LABELS = {
+    "talk_verse": ("cites", False),
+    "verse_talk": ("cites", True),
+    "entry_verse": ("references", False),
+    "verse_entry": ("references", True),
+    "entry_entry": ("see also", False),
+}
+
+Node = Tuple[str, int]
+
+# ---------------------------------------------------------------------------
+# Node lookup
+# ---------------------------------------------------------------------------
+
+def find_node(graph: CitationGraph, verses: VerseTable, text: str) -> Optional[Node]:
+    """Node for a talk URL, ``TG name`` / ``BD name``, scripture reference or entry name."""
+    text = text.strip()
+    if not text:
+        return None
+    if text.startswith(("http://", "https://")):
+        talk_id = graph.find_talk(text)
+        return None if talk_id is None else ("talk", talk_id)
+    prefix, _, rest = text.partition(" ")
+    if prefix in ("TG", "BD") and rest:
+        source = "topical_guide" if prefix == "TG" else "bible_dictionary"
+        entry_id = graph.find_entry(source, rest)
+        return None if entry_id is None else ("entry", entry_id)
+    verse_ids = verses.resolve(text)
+    if verse_ids:
+        return "verse", verse_ids[0]
+    for source in graph.entry_sources:
+        entry_id = graph.find_entry(source, text)
+        if entry_id is not None:
+            return "entry", entry_id
+    return None
+
+
+def node_label(graph: CitationGraph, verses: VerseTable, node: Node) -> str:
+    t, i = node
+    if t == "verse":
+        return verses.label(i)
+    if t == "talk":
+        return graph.talk_urls[i]
+    source, name = graph.entry(i)
+    return f"{'TG' if source == 'topical_guide' else 'BD'} {name}"
+
+# ---------------------------------------------------------------------------
+# Sampling
+# ---------------------------------------------------------------------------
+
+def _sample(nbrs: np.ndarray, cap: int, node: Node, seed: int) -> np.ndarray:
+    """At most *cap* neighbours, the same ones every time for a given node."""
+    if len(nbrs) <= cap:
+        return nbrs
+    rng = np.random.default_rng([seed, NODE_TYPES.index(node[0]), node[1]])
+    return np.sort(rng.choice(nbrs, size=cap, replace=False))
+
+
+def neighborhood(
+    graph: CitationGraph,
+    center: Node,
+    hops: int = DEFAULT_HOPS,
+    cap: int = DEFAULT_CAP,
+    max_nodes: int = DEFAULT_MAX_NODES,
+    seed: int = 0,
+) -> Tuple[Dict[Node, int], List[Tuple[Node, Node, str]], Dict[Node, int], bool]:
+    """Breadth-first, degree-capped neighbourhood of *center*.
+
+    Returns ``(hop of each node, edges, degree of each node, truncated)``;
+    edges are ``(source, target, label)`` in their citing direction and cover
+    every edge among the chosen nodes, sampled or not. *truncated* is set when
+    sampling or *max_nodes* left neighbours out.
+    """
+    hop_of: Dict[Node, int] = {center: 0}
+    frontier = [center]
+    truncated = False
+    for hop in range(1, hops + 1):
+        nxt = []
+        for node in frontier:
+            for relation, target in EXPANSION[node[0]]:
+                nbrs = graph.neighbors(relation, node[1])
+                sampled = _sample(nbrs, cap, node, seed)
+                truncated |= len(sampled) < len(nbrs)
+                for n in sampled.tolist():
+                    key = (target, n)
+                    if key in hop_of:
+                        continue
+                    if len(hop_of) >= max_nodes:
+                        truncated = True
+                        break
+                    hop_of[key] = hop
+                    nxt.append(key)
+        frontier = nxt
+
+    # Induced edges and full degrees.
+    ids = {t: np.asarray(sorted(i for (tt, i) in hop_of if tt == t), dtype=np.int64) for t in NODE_TYPES}
+    edges: List[Tuple[Node, Node, str]] = []
+    degree: Dict[Node, int] = {}
+    for node in hop_of:
+        total = 0
+        for relation, target in EXPANSION[node[0]]:
+            nbrs = graph.neighbors(relation, node[1])
+            total += len(nbrs)
+            label, reverse = EDGE_LABELS[relation]
+            if reverse:
+                continue  # the same edge is listed from the other end
+            for n in np.intersect1d(nbrs, ids[target], assume_unique=True).tolist():
+                edges.append((node, (target, n), label))
+        degree[node] = total
+    return hop_of, edges, degree, truncated
+
+# ---------------------------------------------------------------------------
+# Layout
+# ---------------------------------------------------------------------------
+
+def spring_layout(n: int, edges: np.ndarray, iterations: int = LAYOUT_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Fruchterman-Reingold positions in [-1, 1]² for *n* nodes; node 0 stays at the origin.
+
+    *edges* is an ``(m, 2)`` int array of node positions.
+    """
+    if n == 1:
+        return np.zeros((1, 2))
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-1, 1, size=(n, 2))
+    pos[0] = 0
+    k = np.sqrt(4.0 / n)
+    step = 0.2
+    src, dst = (edges[:, 0], edges[:, 1]) if len(edges) else (np.zeros(0, int), np.zeros(0, int))
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist = np.maximum(np.linalg.norm(delta, axis=-1), 1e-3)
+        np.fill_diagonal(dist, np.inf)
+        disp = (delta * (k * k / dist ** 2)[..., None]).sum(axis=1)
+        if len(src):
+            d = pos[src] - pos[dst]
+            length = np.maximum(np.linalg.norm(d, axis=1, keepdims=True), 1e-3)
+            pull = d * length / k
+            np.add.at(disp, src, -pull)
+            np.add.at(disp, dst, pull)
+        length = np.maximum(np.linalg.norm(disp, axis=1, keepdims=True), 1e-9)
+        pos += disp / length * np.minimum(length, step)
+        pos[0] = 0
+        step = max(step * 0.97, 0.005)
+    scale = np.abs(pos).max()
+    return pos / scale if scale > 0 else pos
+
+# ---------------------------------------------------------------------------
+# Subgraph
+# ---------------------------------------------------------------------------
+
+def explore(
+    graph: CitationGraph,
+    verses: VerseTable,
+    center: Node,
+    hops: int = DEFAULT_HOPS,
+    cap: int = DEFAULT_CAP,
+    max_nodes: int = DEFAULT_MAX_NODES,
+    seed: int = 0,
+) -> dict:
+    """Bounded, laid-out subgraph around *center* as plain JSON-able data."""
+    hop_of, edges, degree, truncated = neighborhood(graph, center, hops, cap, max_nodes, seed)
+    order = sorted(hop_of, key=lambda node: (hop_of[node], NODE_TYPES.index(node[0]), node[1]))
+    index = {node: i for i, node in enumerate(order)}
+    pairs = np.asarray([(index[a], index[b]) for a, b, _label in edges], dtype=np.int64).reshape(-1, 2)
+    pos = spring_layout(len(order), pairs, seed=seed)
+
+    shown = {node: 0 for node in order}
+    for a, b, _label in edges:
+        shown[a] += 1
+        shown[b] += 1
+    nodes = [
+        {
+            "key": f"{node[0]}:{node[1]}",
+            "type": node[0],
+            "id": node[1],
+            "label": node_label(graph, verses, node),
+            "hop": hop_of[node],
+            "degree": degree[node],
+            "hidden": max(degree[node] - shown[node], 0),
+            "x": round(float(pos[i, 0]), 4),
+            "y": round(float(pos[i, 1]), 4),
+        }
+        for i, node in enumerate(order)
+    ]
+    return {
+        "center": nodes[0]["key"],
+        "nodes": nodes,
+        "edges": [{"source": f"{a[0]}:{a[1]}", "target": f"{b[0]}:{b[1]}", "label": label} for a, b, label in edges],
+        "truncated": truncated,
+    }
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Sample and lay out a neighbourhood of the citation graph")
+    ap.add_argument("node", help='Scripture reference, talk URL, or "TG name" / "BD name"')
+    ap.add_argument("--hops", type=int, default=DEFAULT_HOPS)
+    ap.add_argument("--cap", type=int, default=DEFAULT_CAP, help="Neighbours kept per node")
+    ap.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES)
+    ap.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    ap.add_argument("--graph", type=Path, default=None, help="Citation graph, built if missing (default: <data-dir>/build/citation_graph.bin)")
+    ap.add_argument("--json", action="store_true", help="Print the subgraph as JSON")
+    args = ap.parse_args()
+    args.graph = args.graph or Path(args.data_dir) / "build" / GRAPH_PATH.name
+
+    with open_corpus(data_dir=args.data_dir) as corpus, open_graph(args.graph, args.data_dir) as graph:
+        verses = VerseTable.from_corpus(corpus)
+        center = find_node(graph, verses, args.node)
+        if center is None:
+            raise SystemExit(f"No graph node matches {args.node!r}")
+        start = time.perf_counter()
+        sub = explore(graph, verses, center, args.hops, args.cap, args.max_nodes)
+        elapsed = (time.perf_counter() - start) * 1000
+    if args.json:
+        print(json.dumps(sub, indent=2, ensure_ascii=False))
+        return
+    for node in sub["nodes"]:
+        more = f" (+{node['hidden']} not shown)" if node["hidden"] else ""
+        print(f"hop {node['hop']}  {node['type']:<5} {node['label']}  degree {node['degree']}{more}")
+    flag = ", sampled" if sub["truncated"] else ""
+    print(f"\n{len(sub['nodes'])} nodes / {len(sub['edges'])} edges in {elapsed:.1f} ms{flag}")
+
+
+if __name__ == "__main__":
+    main()
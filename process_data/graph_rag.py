@@ -0,0 +1,488 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from citation_graph import (
+    BIBLE_DICTIONARY_PATHS,
+    GRAPH_PATH,
+    RELATIONS,
+    TOPICAL_GUIDE_PATH,
+    CitationGraph,
+    clean_name,
+    open_graph,
+)
+from corpus_store import DATA_DIR, open_corpus
+from embedding_index import INDEX_DIR as EMBEDDINGS_DIR
+from embedding_index import EmbeddingIndex
+from neo4j_export import DEFAULT_BATCH as NEO4J_BATCH
+from neo4j_export import load_neo4j
+from search_index import INDEX_PATH, SearchIndex, open_index
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from scripture_refs import VerseTable  # noqa: E402
+from talk_io import iter_talks  # noqa: E402
+
+"""
+GraphRAG retrieval over scriptures, conference talks and TG / BD entries.
+
+A query is answered in three steps:
+
+1. Seeds: BM25 hits from search_index.py and, when an embedding index exists,
+   nearest neighbours from embedding_index.py. Hits are mapped to graph nodes
+   (verse, talk, entry) and fused by reciprocal rank.
+2. Expansion: scores spread along the citation edges of citation_graph.py
+   (talk -> verse -> TG entry -> verse -> talk ...) for ``hops`` rounds. An
+   edge passes ``decay / sqrt(out-degree * in-degree)`` of the source score,
+   so hub verses and entries do not swamp the result; nodes with more than
+   ``max_fanout`` neighbours only pass to an evenly spaced subset. Frontier nodes are
+   expanded best first and expansion stops at the latency budget.
+3. Bundle: the top ``k`` nodes with their text (verse text, matching talk
+   paragraphs, entry paragraphs) and the edge that reached them.
+
+The graph stays in process (memory-mapped CSR arrays); ``export-neo4j`` copies
+it into a Neo4j database for the Cypher-based demos (see neo4j_export.py).
+Bundles are kept in an LRU cache keyed by the query and its parameters.
+
+    python process_data/graph_rag.py query "faith unto repentance" --hops 2
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+NODE_TYPES = ["verse", "talk", "entry"]
+
+# node type -> relations followed during expansion
+EXPANSION = {
+    "talk": [("talk_verse", "verse")],
+    "verse": [("verse_talk", "talk"), ("verse_entry", "entry")],
+    "entry": [("entry_verse", "verse"), ("entry_entry", "entry")],
+}
+
+DEFAULT_K = 10
+DEFAULT_SEEDS = 20
+DEFAULT_HOPS = 2
+DEFAULT_BUDGET_MS = 250.0
+DEFAULT_DECAY = 0.5
+DEFAULT_FANOUT = 64
+DEFAULT_CACHE_SIZE = 256
+RRF_K = 60                  # reciprocal rank fusion constant
+MAX_PARAGRAPHS = 3          # talk / entry paragraphs per bundle item
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping with a fixed number of slots."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._data: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _first_existing(paths: Iterable[Path]) -> Optional[Path]:
+    return next((p for p in paths if p.exists()), None)
+
+
+def _split_locator(locator: str) -> Tuple[str, Optional[int]]:
+    """``"url#3"`` -> ``("url", 3)``."""
+    base, _, para = locator.rpartition("#")
+    if not base or not para.isdigit():
+        return locator, None
+    return base, int(para)
+
+# ---------------------------------------------------------------------------
+# Text lookups
+# ---------------------------------------------------------------------------
+
+class _TextStore:
+    """Talk and TG / BD paragraphs, loaded on first use."""
+
+    def __init__(self, data_dir: Path, talks_path: Optional[Path]):
+        self.data_dir = Path(data_dir)
+        self.talks_path = talks_path
+        self._talks: Optional[Dict[str, dict]] = None
+        self._entries: Optional[Dict[Tuple[str, str], List[str]]] = None
+        self._lock = threading.Lock()
+
+    def talks(self) -> Dict[str, dict]:
+        with self._lock:
+            if self._talks is None:
+                self._talks = {
+                    talk["url"]: {
+                        "speaker": talk.get("speaker"),
+                        "year": talk.get("year"),
+                        "season": talk.get("season"),
+                        "paragraphs": {p["paragraph_number"]: p["paragraph"] for p in talk.get("content") or []},
+                    }
+                    for talk in iter_talks(self.talks_path)
+                }
+            return self._talks
+
+    def entries(self) -> Dict[Tuple[str, str], List[str]]:
+        with self._lock:
+            if self._entries is None:
+                self._entries = {}
+                for source, path in (
+                    ("bible_dictionary", _first_existing([self.data_dir / p.name for p in BIBLE_DICTIONARY_PATHS])),
+                    ("topical_guide", self.data_dir / TOPICAL_GUIDE_PATH.name),
+                ):
+                    if path is None or not path.exists():
+                        continue
+                    for entry in json.loads(path.read_text(encoding="utf-8")):
+                        self._entries[(source, clean_name(entry["entry"]))] = [
+                            p["text"] for p in entry.get("paragraphs", [])
+                        ]
+            return self._entries
+
+# ---------------------------------------------------------------------------
+# Retrieval
+# ---------------------------------------------------------------------------
+
+class GraphRetriever:
+    """Seed + expand + bundle retrieval; see the module docstring."""
+
+    def __init__(
+        self,
+        corpus,
+        graph: CitationGraph,
+        index: SearchIndex,
+        embeddings: Optional[EmbeddingIndex] = None,
+        data_dir: Path = DATA_DIR,
+        talks_path: Optional[Path] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.corpus = corpus
+        self.graph = graph
+        self.index = index
+        self.embeddings = embeddings
+        self.verses = VerseTable.from_corpus(corpus)
+        self.texts = _TextStore(data_dir, talks_path)
+        self.cache = LRUCache(cache_size)
+        self.sizes = {"verse": len(corpus), "talk": graph.sizes["talk"], "entry": graph.sizes["entry"]}
+        # In-degree of every target under each expansion relation, floored at 1 for the score division.
+        self._in_degree = {relation: np.maximum(graph.in_degrees(relation), 1) for relation in RELATIONS}
+
+    # -- seeds --------------------------------------------------------------
+    def _node(self, source: str, locator: str, doc_id: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """Graph node for a search hit, or None if the graph does not know it."""
+        if source == "verse":
+            if doc_id is not None:
+                return "verse", doc_id
+            verse_ids = self.verses.resolve(locator)
+            return ("verse", verse_ids[0]) if verse_ids else None
+        base, _para = _split_locator(locator)
+        if source == "conference":
+            talk_id = self.graph.find_talk(base)
+            return None if talk_id is None else ("talk", talk_id)
+        entry_id = self.graph.find_entry(source, base)
+        return None if entry_id is None else ("entry", entry_id)
+
+    def seeds(self, query: str, n: int = DEFAULT_SEEDS, use_vectors: bool = True) -> Tuple[Dict[Tuple[str, int], float], Dict[Tuple[str, int], List[int]]]:
+        """Fused seed scores per node and the matching talk / entry paragraphs."""
+        ranked: List[List[Tuple[str, str, Optional[int]]]] = []
+        keyword = []
+        for doc_id, _score in self.index.search_ids(query, n):
+            source = self.index.sources[self.index.doc_source[doc_id]]
+            keyword.append((source, self.index.locator(doc_id), doc_id if source == "verse" else None))
+        ranked.append(keyword)
+        if use_vectors and self.embeddings is not None and len(self.embeddings):
+            ranked.append([(s, loc, None) for s, loc, _score in self.embeddings.search(query, n)])
+
+        scores: Dict[Tuple[str, int], float] = {}
+        paragraphs: Dict[Tuple[str, int], List[int]] = {}
+        for hits in ranked:
+            seen = set()
+            for rank, (source, locator, doc_id) in enumerate(hits):
+                node = self._node(source, locator, doc_id)
+                if node is None:
+                    continue
+                if node not in seen:
+                    # Only a node's best paragraph counts, so long talks and entries are not favoured.
+                    seen.add(node)
+                    scores[node] = scores.get(node, 0.0) + 1.0 / (RRF_K + rank + 1)
+                _base, para = _split_locator(locator)
+                if node[0] != "verse" and para is not None and para not in paragraphs.setdefault(node, []):
+                    paragraphs[node].append(para)
+        if scores:
+            top = max(scores.values())
+            scores = {node: s / top for node, s in scores.items()}
+        return scores, paragraphs
+
+    # -- expansion ----------------------------------------------------------
+    def expand(
+        self,
+        seeds: Dict[Tuple[str, int], float],
+        hops: int = DEFAULT_HOPS,
+        decay: float = DEFAULT_DECAY,
+        max_fanout: int = DEFAULT_FANOUT,
+        deadline: Optional[float] = None,
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, np.ndarray], bool]:
+        """Spread seed scores over the citation edges.
+
+        Returns ``(scores, parent_type, parent_id, truncated)`` with one dense
+        array per node type; ``parent_type`` is -1 for seeds and unreached nodes.
+        """
+        scores = {t: np.zeros(n) for t, n in self.sizes.items()}
+        best = {t: np.zeros(n) for t, n in self.sizes.items()}
+        parent_type = {t: np.full(n, -1, dtype=np.int8) for t, n in self.sizes.items()}
+        parent_id = {t: np.full(n, -1, dtype=np.int64) for t, n in self.sizes.items()}
+        for (t, node), s in seeds.items():
+            scores[t][node] += s
+        delta = {t: s.copy() for t, s in scores.items()}
+
+        truncated = False
+        for _hop in range(hops):
+            nxt = {t: np.zeros(n) for t, n in self.sizes.items()}
+            frontier = [
+                (t, node, delta[t][node]) for t in NODE_TYPES for node in np.flatnonzero(delta[t])
+            ]
+            frontier.sort(key=lambda item: -item[2])
+            for t, node, mass in frontier:
+                if deadline is not None and time.perf_counter() > deadline:
+                    truncated = True
+                    break
+                for relation, target in EXPANSION[t]:
+                    nbrs = self.graph.neighbors(relation, node)
+                    degree = len(nbrs)
+                    if not degree:
+                        continue
+                    if degree > max_fanout:
+                        nbrs = nbrs[np.linspace(0, degree - 1, max_fanout).astype(np.int64)]
+                    contrib = mass * decay / np.sqrt(degree * self._in_degree[relation][nbrs])
+                    # CSR rows are de-duplicated, so plain fancy indexing is safe.
+                    nxt[target][nbrs] += contrib
+                    better = best[target][nbrs] < contrib
+                    if better.any():
+                        won = nbrs[better]
+                        best[target][won] = contrib[better]
+                        parent_type[target][won] = NODE_TYPES.index(t)
+                        parent_id[target][won] = node
+            for t in NODE_TYPES:
+                scores[t] += nxt[t]
+            delta = nxt
+            if truncated:
+                break
+        for (t, node) in seeds:
+            parent_type[t][node] = -1
+        return scores, parent_type, parent_id, truncated
+
+    # -- text ---------------------------------------------------------------
+    def text(self, source: str, locator: str) -> str:
+        """Text of one search hit (a verse, talk paragraph or TG / BD paragraph)."""
+        if source == "verse":
+            verse_ids = self.verses.resolve(locator)
+            return self.corpus.verse_text(verse_ids[0]) if verse_ids else ""
+        base, para = _split_locator(locator)
+        if para is None:
+            return ""
+        if source == "conference":
+            talk = self.texts.talks().get(base)
+            return talk["paragraphs"].get(para, "") if talk else ""
+        paras = self.texts.entries().get((source, clean_name(base))) or []
+        return paras[para - 1] if 0 < para <= len(paras) else ""
+
+    # -- bundle -------------------------------------------------------------
+    def _label(self, t: str, node: int) -> str:
+        if t == "verse":
+            return self.verses.label(node)
+        if t == "talk":
+            return self.graph.talk_urls[node]
+        source, name = self.graph.entry(node)
+        return f"{'TG' if source == 'topical_guide' else 'BD'} {name}"
+
+    def _item(self, t: str, node: int, score: float, parent: Optional[Tuple[str, int]],
+              paragraphs: Dict[Tuple[str, int], List[int]]) -> dict:
+        item = {"type": t, "id": int(node), "label": self._label(t, node), "score": round(float(score), 6)}
+        if parent is None:
+            item["seed"] = True
+        else:
+            item["via"] = {"type": parent[0], "id": int(parent[1]), "label": self._label(*parent)}
+
+        if t == "verse":
+            item["text"] = [self.corpus.verse_text(node)]
+        elif t == "talk":
+            talk = self.texts.talks().get(self.graph.talk_urls[node])
+            if talk:
+                wanted = paragraphs.get((t, node)) or sorted(talk["paragraphs"])[:1]
+                item.update(speaker=talk["speaker"], year=talk["year"], season=talk["season"])
+                item["text"] = [talk["paragraphs"][p] for p in wanted[:MAX_PARAGRAPHS] if p in talk["paragraphs"]]
+        else:
+            source, name = self.graph.entry(node)
+            paras = self.texts.entries().get((source, name)) or []
+            wanted = [p - 1 for p in paragraphs.get((t, node), [])] or list(range(len(paras)))
+            item["text"] = [paras[p] for p in wanted[:MAX_PARAGRAPHS] if 0 <= p < len(paras)]
+        return item
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = DEFAULT_K,
+        hops: int = DEFAULT_HOPS,
+        n_seeds: int = DEFAULT_SEEDS,
+        budget_ms: float = DEFAULT_BUDGET_MS,
+        decay: float = DEFAULT_DECAY,
+        max_fanout: int = DEFAULT_FANOUT,
+        types: Optional[Sequence[str]] = None,
+        use_vectors: bool = True,
+    ) -> dict:
+        """Ranked context bundle for *query*.
+
+        Cached bundles are shared between callers; treat them as read-only.
+        """
+        types = tuple(types) if types else tuple(NODE_TYPES)
+        key = (query, k, hops, n_seeds, budget_ms, decay, max_fanout, types, use_vectors)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000
+        seeds, paragraphs = self.seeds(query, n_seeds, use_vectors)
+        scores, parent_type, parent_id, truncated = self.expand(seeds, hops, decay, max_fanout, deadline)
+
+        candidates = []
+        for t in types:
+            s = scores[t]
+            top = np.flatnonzero(s)
+            if len(top) > k:
+                top = top[np.argpartition(-s[top], k)[:k]]
+            candidates += [(float(s[node]), t, int(node)) for node in top]
+        candidates.sort(key=lambda c: (-c[0], NODE_TYPES.index(c[1]), c[2]))
+
+        items = []
+        for score, t, node in candidates[:k]:
+            p = parent_type[t][node]
+            parent = None if p < 0 else (NODE_TYPES[p], int(parent_id[t][node]))
+            items.append(self._item(t, node, score, parent, paragraphs))
+
+        bundle = {
+            "query": query,
+            "items": items,
+            "seeds": len(seeds),
+            "truncated": truncated,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        self.cache.put(key, bundle)
+        return bundle
+
+
+def open_retriever(
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    corpus_path: Optional[Path] = None,
+    graph_path: Path = GRAPH_PATH,
+    index_path: Path = INDEX_PATH,
+    embeddings_dir: Optional[Path] = EMBEDDINGS_DIR,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+) -> GraphRetriever:
+    """Open (building where missing) everything a retriever needs.
+
+    The embedding index is optional and only used when it has been built.
+    """
+    corpus = open_corpus(corpus_path, data_dir)
+    graph = open_graph(graph_path, data_dir, talks_path, corpus_path)
+    index = open_index(index_path, data_dir, talks_path, corpus_path)
+    embeddings = None
+    if embeddings_dir is not None and (Path(embeddings_dir) / "meta.json").exists():
+        embeddings = EmbeddingIndex(embeddings_dir)
+    return GraphRetriever(corpus, graph, index, embeddings, data_dir, talks_path, cache_size)
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Graph-backed retrieval (GraphRAG) over scriptures, talks and TG / BD")
+    ap.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    ap.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json)")
+    ap.add_argument("--graph", type=Path, default=None, help="Citation graph, built if missing (default: <data-dir>/build/citation_graph.bin)")
+    ap.add_argument("--index", type=Path, default=None, help="Search index, built if missing (default: <data-dir>/build/search_index.bin)")
+    ap.add_argument("--embeddings", type=Path, default=None,
+                    help="Embedding index, used if built (default: <data-dir>/build/embeddings)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    q = sub.add_parser("query", help="Retrieve a ranked context bundle")
+    q.add_argument("query")
+    q.add_argument("-k", type=int, default=DEFAULT_K)
+    q.add_argument("--hops", type=int, default=DEFAULT_HOPS)
+    q.add_argument("--seeds", type=int, default=DEFAULT_SEEDS)
+    q.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    q.add_argument("--type", action="append", choices=NODE_TYPES, help="Restrict results to a node type (repeatable)")
+    q.add_argument("--no-vectors", action="store_true", help="Keyword seeds only")
+    q.add_argument("--json", action="store_true", help="Print the bundle as JSON")
+
+    e = sub.add_parser("export-neo4j", help="Copy the citation graph into a Neo4j database")
+    e.add_argument("--uri", default="bolt://localhost:7687")
+    e.add_argument("--user", default="neo4j")
+    e.add_argument("--password", default=None)
+    e.add_argument("--database", default=None)
+    e.add_argument("--batch-size", type=int, default=NEO4J_BATCH)
+    args = ap.parse_args()
+    build_dir = Path(args.data_dir) / "build"
+    args.graph = args.graph or build_dir / GRAPH_PATH.name
+    args.index = args.index or build_dir / INDEX_PATH.name
+    args.embeddings = args.embeddings or build_dir / EMBEDDINGS_DIR.name
+
+    if args.command == "export-neo4j":
+        start = time.time()
+        with open_corpus(data_dir=args.data_dir) as corpus, open_graph(args.graph, args.data_dir, args.talks) as graph:
+            auth = (args.user, args.password) if args.password else None
+            counts = load_neo4j(corpus, graph, args.uri, auth, args.database, args.talks, batch_size=args.batch_size)
+        print(f"Exported {counts} to {args.uri} ({time.time() - start:.1f}s)")
+        return
+
+    retriever = open_retriever(args.data_dir, args.talks, graph_path=args.graph, index_path=args.index,
+                               embeddings_dir=args.embeddings)
+    bundle = retriever.retrieve(args.query, args.k, args.hops, args.seeds, args.budget_ms,
+                                types=args.type, use_vectors=not args.no_vectors)
+    if args.json:
+        print(json.dumps(bundle, indent=2, ensure_ascii=False))
+        return
+    for item in bundle["items"]:
+        via = f"  <- {item['via']['label']}" if "via" in item else "  (seed)"
+        print(f"{item['score']:7.4f}  {item['type']:<5} {item['label']}{via}")
+        for text in item.get("text", [])[:1]:
+            print(f"         {text[:100]}")
+    flag = ", truncated at budget" if bundle["truncated"] else ""
+    print(f"\n{len(bundle['items'])} items from {bundle['seeds']} seeds in {bundle['elapsed_ms']:.1f} ms{flag}")
+
+
+if __name__ == "__main__":
+    main()
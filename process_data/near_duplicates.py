@@ -0,0 +1,573 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from citation_graph import csr
+from corpus_store import BUILD_DIR, DATA_DIR, PackedFile, open_corpus, write_packed
+from search_index import SOURCES, iter_documents, tokenize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from scripture_refs import VerseTable  # noqa: E402
+
+"""
+Quotation and near-duplicate detection with MinHash and locality-sensitive
+hashing over every verse, Bible Dictionary / Topical Guide paragraph and
+conference talk paragraph (the documents of search_index.py, in the same
+order, so document IDs match the search index and a verse's document ID is
+its corpus verse ID).
+
+Text is reduced to word 3-shingles. Each set gets a MinHash signature
+(``NUM_PERM`` multiply-add permutations of 64-bit shingle hashes), and the
+signature is cut into ``BANDS`` bands of ``ROWS`` rows; two sets share a band
+bucket with high probability once their Jaccard similarity passes roughly
+``(1 / BANDS) ** (1 / ROWS)`` (0.5). Only pairs that share a bucket are ever
+compared, so the work grows with the corpus plus the number of real matches
+instead of with the number of pairs. Two passes run over the signatures:
+
+* quotations: sentences are the units, so a verse quoted inside a long
+  paragraph still collides with the sentence that quotes it. Candidate
+  (verse sentence, paragraph) pairs are kept when at least ``QUOTE_MIN`` of
+  the verse sentence's shingles occur in the paragraph and so do either
+  ``QUOTE_MIN`` of the whole verse's or ``QUOTE_MIN_SHINGLES`` of them (a
+  long partial quote). Each kept pair becomes a "paragraph quotes verse" edge
+  scored by the fraction of the verse that the paragraph contains;
+* near-duplicates: whole documents are the units. Candidate pairs with an
+  exact shingle Jaccard of at least ``DUP_MIN`` are kept and grouped into
+  clusters (repeated boilerplate, Isaiah in 2 Nephi, a talk quoted verbatim
+  by a later one).
+
+Everything is written to ``data/build/near_duplicates.bin``.
+
+    python process_data/near_duplicates.py build --talks conference_talks.jsonl
+    python process_data/near_duplicates.py quoted "Moroni 10:4"
+    python process_data/near_duplicates.py clusters --source bible_dictionary
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+NEAR_DUPLICATES_PATH = BUILD_DIR / "near_duplicates.bin"
+
+SHINGLE = 3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SEED = 20240601
+
+MIN_SHINGLES = 3      # shorter units are too generic to match on
+QUOTE_MIN = 0.5       # verse sentence shingles found in the paragraph, and of the whole verse...
+QUOTE_MIN_SHINGLES = 12  # ...unless at least this many verse shingles are (a long partial quote)
+DUP_MIN = 0.8         # whole-document Jaccard
+MAX_BUCKET = 64       # verse sentences per quote bucket / documents per duplicate bucket
+
+SENTENCE_RE = re.compile(r"(?<=[.!?;:])\s+")
+
+MAGIC = b"DLNEARDP"
+FORMAT_VERSION = 1
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_MIX2 = np.uint64(0xBF58476D1CE4E5B9)
+
+# ---------------------------------------------------------------------------
+# Shingles and signatures
+# ---------------------------------------------------------------------------
+
+def _tokenize_documents(documents: Iterable[Tuple[str, str, str]]) -> dict:
+    """Token IDs of every sentence, with the owning document of each sentence."""
+    vocab: Dict[str, int] = {}
+    tokens = array("I")
+    sent_len = array("I")
+    sent_doc = array("I")
+    doc_source = array("B")
+    locators: List[str] = []
+    for doc_id, (source, locator, text) in enumerate(documents):
+        for sentence in SENTENCE_RE.split(text):
+            words = tokenize(sentence)
+            if words:
+                tokens.extend(vocab.setdefault(w, len(vocab)) for w in words)
+                sent_len.append(len(words))
+                sent_doc.append(doc_id)
+        doc_source.append(SOURCES.index(source))
+        locators.append(locator)
+    return {
+        "tokens": np.frombuffer(tokens, dtype=np.uint32),
+        "sent_len": np.frombuffer(sent_len, dtype=np.uint32),
+        "sent_doc": np.frombuffer(sent_doc, dtype=np.uint32),
+        "doc_source": np.frombuffer(doc_source, dtype=np.uint8),
+        "locators": locators,
+    }
+
+
+def shingle_hashes(tokens: np.ndarray, owner: np.ndarray, k: int = SHINGLE) -> Tuple[np.ndarray, np.ndarray]:
+    """64-bit polynomial hash of every *k*-token window that stays inside one owner.
+
+    *owner* gives the (non-decreasing) owner of each token; returns
+    ``(hashes, index of each window's first token)``.
+    """
+    n = len(tokens) - k + 1
+    if n <= 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+    t = tokens.astype(np.uint64)
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        h = (h + t[j:j + n] + np.uint64(1)) * _MIX
+    h ^= h >> np.uint64(31)
+    h *= _MIX2
+    h ^= h >> np.uint64(29)
+    starts = np.flatnonzero(owner[:n] == owner[k - 1:])
+    return h[starts], starts
+
+
+def shingle_sets(hashes: np.ndarray, owner: np.ndarray, n_owner: int) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR ``(indptr, values)``: the sorted, distinct shingle hashes of each owner."""
+    order = np.lexsort((hashes, owner))
+    hashes, owner = hashes[order], owner[order]
+    first = np.ones(len(hashes), dtype=bool)
+    first[1:] = (hashes[1:] != hashes[:-1]) | (owner[1:] != owner[:-1])
+    hashes, owner = hashes[first], owner[first]
+    indptr = np.zeros(n_owner + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner, minlength=n_owner), out=indptr[1:])
+    return indptr, hashes
+
+
+def minhash(indptr: np.ndarray, values: np.ndarray, num_perm: int = NUM_PERM, seed: int = SEED) -> np.ndarray:
+    """``(n_owner, num_perm)`` uint32 MinHash signatures of CSR shingle sets.
+
+    Permutation *i* is ``h * a_i + b_i`` mod 2**64 with odd ``a_i``, a
+    bijection on 64-bit hashes; the high 32 bits of each minimum are kept.
+    Empty sets get all-ones signatures and should not be bucketed.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    n_owner = len(indptr) - 1
+    sig = np.full((n_owner, num_perm), 0xFFFFFFFF, dtype=np.uint32)
+    has = np.flatnonzero(np.diff(indptr) > 0)
+    if len(has):
+        starts = indptr[:-1][has]
+        for i in range(num_perm):
+            permuted = values * a[i] + b[i]
+            sig[has, i] = (np.minimum.reduceat(permuted, starts) >> np.uint64(32)).astype(np.uint32)
+    return sig
+
+# ---------------------------------------------------------------------------
+# Locality-sensitive hashing
+# ---------------------------------------------------------------------------
+
+def band_keys(sig: np.ndarray, band: int, rows: int = ROWS) -> np.ndarray:
+    """One 64-bit bucket key per signature for rows ``band * rows ... + rows``."""
+    block = sig[:, band * rows:(band + 1) * rows].astype(np.uint64)
+    key = np.zeros(len(sig), dtype=np.uint64)
+    for r in range(rows):
+        key = (key ^ block[:, r]) * _MIX
+    return key
+
+
+def runs(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and length of each run of equal values in sorted *keys*."""
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return starts, np.diff(np.append(starts, len(keys)))
+
+
+def ragged_arange(counts: np.ndarray) -> np.ndarray:
+    """``[0..c0), [0..c1), ...`` concatenated."""
+    total = int(counts.sum())
+    return np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
+def unique_pairs(pairs: np.ndarray, n: int) -> np.ndarray:
+    """Distinct rows of an ``(m, 2)`` array of IDs below *n*, sorted."""
+    key = np.unique(pairs[:, 0].astype(np.int64) * n + pairs[:, 1])
+    return np.stack([key // n, key % n], axis=1)
+
+
+def cross_pairs(sig: np.ndarray, units: np.ndarray, left: np.ndarray, max_left: int = MAX_BUCKET) -> np.ndarray:
+    """Unit pairs ``(l, r)`` with ``left[l]`` and not ``left[r]`` that share a band bucket.
+
+    *units* are the signature rows taking part. Buckets holding more than
+    *max_left* left-side units are skipped as too generic.
+    """
+    found = []
+    for band in range(BANDS):
+        keys = band_keys(sig[units], band)
+        is_right = ~left[units]
+        order = np.lexsort((is_right, keys))
+        members, is_right = units[order], is_right[order]
+        starts, sizes = runs(keys[order])
+        n_right = np.add.reduceat(is_right.astype(np.int64), starts) if len(starts) else starts
+        n_left = sizes - n_right
+        ok = (n_left > 0) & (n_right > 0) & (n_left <= max_left)
+        starts, n_left, n_right = starts[ok], n_left[ok], n_right[ok]
+        counts = n_left * n_right
+        k = ragged_arange(counts)
+        l = np.repeat(starts, counts) + k // np.repeat(n_right, counts)
+        r = np.repeat(starts + n_left, counts) + k % np.repeat(n_right, counts)
+        found.append(np.stack([members[l], members[r]], axis=1))
+    return unique_pairs(np.concatenate(found), len(sig)) if found else np.zeros((0, 2), dtype=np.int64)
+
+
+def bucket_pairs(sig: np.ndarray, units: np.ndarray, max_bucket: int = MAX_BUCKET) -> np.ndarray:
+    """Unit pairs ``(a, b)``, ``a < b``, that share a band bucket.
+
+    Buckets larger than *max_bucket* only contribute consecutive members, which
+    keeps them connected for clustering without a quadratic blow-up.
+    """
+    found = []
+    for band in range(BANDS):
+        keys = band_keys(sig[units], band)
+        order = np.argsort(keys, kind="stable")
+        members = units[order]
+        starts, sizes = runs(keys[order])
+        small = (sizes > 1) & (sizes <= max_bucket)
+        s, n = starts[small], sizes[small]
+        first = np.repeat(s, n) + ragged_arange(n)
+        counts = np.repeat(s + n, n) - first - 1
+        a = np.repeat(first, counts)
+        b = a + 1 + ragged_arange(counts)
+        large = sizes > max_bucket
+        chain = np.repeat(starts[large], sizes[large] - 1) + ragged_arange(sizes[large] - 1)
+        a = np.concatenate([a, chain])
+        b = np.concatenate([b, chain + 1])
+        found.append(np.sort(np.stack([members[a], members[b]], axis=1), axis=1))
+    return unique_pairs(np.concatenate(found), len(sig)) if found else np.zeros((0, 2), dtype=np.int64)
+
+
+def owner_keys(indptr: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """Sorted ``owner << 32 | rank`` keys for CSR sets of sorted shingle ranks."""
+    owner = np.repeat(np.arange(len(indptr) - 1, dtype=np.uint64), np.diff(indptr))
+    return (owner << np.uint64(32)) | ranks.astype(np.uint64)
+
+
+def overlap_counts(
+    a_ptr: np.ndarray,
+    a_ranks: np.ndarray,
+    a_ids: np.ndarray,
+    b_keys: np.ndarray,
+    b_ids: np.ndarray,
+    chunk: int = 1 << 16,
+) -> np.ndarray:
+    """``|A[a_ids[i]] ∩ B[b_ids[i]]|`` for every pair; B is given by its :func:`owner_keys`."""
+    out = np.zeros(len(a_ids), dtype=np.int64)
+    if not len(b_keys):
+        return out
+    for lo in range(0, len(a_ids), chunk):
+        a, b = a_ids[lo:lo + chunk], b_ids[lo:lo + chunk]
+        lens = a_ptr[a + 1] - a_ptr[a]
+        pos = np.repeat(a_ptr[a], lens) + ragged_arange(lens)
+        query = (np.repeat(b.astype(np.uint64), lens) << np.uint64(32)) | a_ranks[pos].astype(np.uint64)
+        hit = b_keys[np.minimum(np.searchsorted(b_keys, query), len(b_keys) - 1)] == query
+        out[lo:lo + len(a)] = np.bincount(np.repeat(np.arange(len(a)), lens), weights=hit, minlength=len(a))
+    return out
+
+
+def _clusters(pairs: np.ndarray, n: int) -> np.ndarray:
+    """Connected-component label of every node (``-1`` for nodes with no pair)."""
+    parent = list(range(n))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs.tolist():
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    label = np.full(n, -1, dtype=np.int64)
+    nodes = np.unique(pairs)
+    label[nodes] = [find(x) for x in nodes.tolist()]
+    return label
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def build_near_duplicates(
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    out_path: Path = NEAR_DUPLICATES_PATH,
+    corpus_path: Optional[Path] = None,
+) -> dict:
+    """Detect quotations and near-duplicates and write the edge tables.
+
+    *corpus_path* defaults to the corpus of *data_dir*.
+    """
+    docs = _tokenize_documents(iter_documents(data_dir, talks_path, corpus_path))
+    n_docs = len(docs["locators"])
+    n_verses = int(np.count_nonzero(docs["doc_source"] == SOURCES.index("verse")))
+    sent_doc = docs["sent_doc"].astype(np.int64)
+    n_sents = len(sent_doc)
+    token_sent = np.repeat(np.arange(n_sents, dtype=np.int64), docs["sent_len"])
+
+    token_doc = sent_doc[token_sent]
+    hashes, starts = shingle_hashes(docs["tokens"], token_doc)
+    doc_ptr, doc_sh = shingle_sets(hashes, token_doc[starts], n_docs)
+    hashes, starts = shingle_hashes(docs["tokens"], token_sent)
+    sent_ptr, sent_sh = shingle_sets(hashes, token_sent[starts], n_sents)
+
+    # Shingles as ranks in one sorted vocabulary, for vectorised set overlaps.
+    vocab, doc_rank = np.unique(doc_sh, return_inverse=True)
+    doc_rank = doc_rank.astype(np.uint32)
+    sent_rank = np.searchsorted(vocab, sent_sh).astype(np.uint32)
+    doc_keys = owner_keys(doc_ptr, doc_rank)
+    doc_size = np.diff(doc_ptr)
+
+    # Quotations: verse sentences against sentences of every other document.
+    sent_sig = minhash(sent_ptr, sent_sh)
+    units = np.flatnonzero(np.diff(sent_ptr) >= MIN_SHINGLES)
+    candidates = cross_pairs(sent_sig, units, sent_doc < n_verses)
+    sent, doc = unique_pairs(np.stack([candidates[:, 0], sent_doc[candidates[:, 1]]], axis=1), n_sents).T
+    ok = overlap_counts(sent_ptr, sent_rank, sent, doc_keys, doc) >= QUOTE_MIN * np.diff(sent_ptr)[sent]
+    pairs = unique_pairs(np.stack([doc[ok], sent_doc[sent[ok]]], axis=1), n_docs)  # (document, verse)
+    common = overlap_counts(doc_ptr, doc_rank, pairs[:, 1], doc_keys, pairs[:, 0])
+    size = doc_size[pairs[:, 1]]
+    keep = common >= np.minimum(QUOTE_MIN * size, QUOTE_MIN_SHINGLES)
+    quote_pairs = pairs[keep]
+    quote_score = (common / np.maximum(size, 1))[keep].astype(np.float32)
+
+    # Near-duplicates: whole documents.
+    doc_sig = minhash(doc_ptr, doc_sh)
+    units = np.flatnonzero(doc_size >= MIN_SHINGLES)
+    pairs = bucket_pairs(doc_sig, units)
+    common = overlap_counts(doc_ptr, doc_rank, pairs[:, 0], doc_keys, pairs[:, 1])
+    similarity = common / np.maximum(doc_size[pairs[:, 0]] + doc_size[pairs[:, 1]] - common, 1)
+    keep = similarity >= DUP_MIN
+    dup_pairs = pairs[keep]
+    dup_sim = similarity[keep].astype(np.float32)
+
+    label = _clusters(dup_pairs, n_docs)
+    members = np.flatnonzero(label >= 0)
+    roots, inverse, sizes = np.unique(label[members], return_inverse=True, return_counts=True)
+    rank = np.empty(len(roots), dtype=np.int64)
+    rank[np.lexsort((roots, -sizes))] = np.arange(len(roots))
+    doc_cluster = np.full(n_docs, -1, dtype=np.int32)
+    doc_cluster[members] = rank[inverse]
+    cluster_indptr, cluster_docs = csr(doc_cluster[members], members, len(roots))
+
+    quote_indptr, quote_verse = csr(quote_pairs[:, 0], quote_pairs[:, 1], n_docs)
+    order_by_verse = np.lexsort((quote_pairs[:, 0], quote_pairs[:, 1]))
+    quoted_indptr, quoted_doc = csr(quote_pairs[order_by_verse, 1], quote_pairs[order_by_verse, 0], n_verses)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "sources": SOURCES,
+        "n_docs": n_docs,
+        "n_verses": n_verses,
+        "n_quotes": len(quote_pairs),
+        "n_duplicate_pairs": len(dup_pairs),
+        "n_clusters": len(roots),
+        "params": {
+            "shingle": SHINGLE, "num_perm": NUM_PERM, "bands": BANDS, "rows": ROWS, "seed": SEED,
+            "min_shingles": MIN_SHINGLES, "quote_min": QUOTE_MIN,
+            "quote_min_shingles": QUOTE_MIN_SHINGLES, "dup_min": DUP_MIN, "max_bucket": MAX_BUCKET,
+        },
+    }
+    return write_packed(out_path, MAGIC, header, [
+        ("doc_source", docs["doc_source"]),
+        ("locators", "\n".join(docs["locators"]).encode("utf-8")),
+        ("quote_indptr", quote_indptr),
+        ("quote_verse", quote_verse),
+        ("quote_score", quote_score),
+        ("quoted_indptr", quoted_indptr),
+        ("quoted_doc", quoted_doc),
+        ("quoted_score", quote_score[order_by_verse]),
+        ("dup_pairs", dup_pairs.astype(np.uint32)),
+        ("dup_similarity", dup_sim),
+        ("doc_cluster", doc_cluster),
+        ("cluster_indptr", cluster_indptr),
+        ("cluster_docs", cluster_docs),
+    ])
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+class NearDuplicates:
+    """Memory-mapped reader for the tables written by :func:`build_near_duplicates`."""
+
+    def __init__(self, path: Path = NEAR_DUPLICATES_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+        header = self._packed.header
+        self.sources: List[str] = header["sources"]
+        self.n_docs: int = header["n_docs"]
+        self.n_verses: int = header["n_verses"]
+        self.params: dict = header["params"]
+        self.doc_source = np.frombuffer(self._packed.raw("doc_source"), dtype=np.uint8)
+        locators = str(self._packed.raw("locators"), "utf-8")
+        self.locators: List[str] = locators.split("\n") if locators else []
+        self._doc_ids: Optional[Dict[str, int]] = None
+
+        def arr(name: str, dtype) -> np.ndarray:
+            return np.frombuffer(self._packed.raw(name), dtype=dtype)
+
+        self._quote_indptr = arr("quote_indptr", np.uint32)
+        self._quote_verse = arr("quote_verse", np.uint32)
+        self._quote_score = arr("quote_score", np.float32)
+        self._quoted_indptr = arr("quoted_indptr", np.uint32)
+        self._quoted_doc = arr("quoted_doc", np.uint32)
+        self._quoted_score = arr("quoted_score", np.float32)
+        self.dup_pairs = arr("dup_pairs", np.uint32).reshape(-1, 2)
+        self.dup_similarity = arr("dup_similarity", np.float32)
+        self.doc_cluster = arr("doc_cluster", np.int32)
+        self._cluster_indptr = arr("cluster_indptr", np.uint32)
+        self._cluster_docs = arr("cluster_docs", np.uint32)
+
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "NearDuplicates":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- documents ----------------------------------------------------------
+    def doc(self, doc_id: int) -> Tuple[str, str]:
+        """``(source, locator)`` of a document."""
+        return self.sources[self.doc_source[doc_id]], self.locators[doc_id]
+
+    def doc_id(self, locator: str) -> Optional[int]:
+        if self._doc_ids is None:
+            self._doc_ids = {loc: i for i, loc in enumerate(self.locators)}
+        return self._doc_ids.get(locator)
+
+    # -- quotations ---------------------------------------------------------
+    def quotes(self, doc_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """``(verse_ids, scores)`` quoted by a document; a score is the fraction of the verse quoted."""
+        lo, hi = self._quote_indptr[doc_id], self._quote_indptr[doc_id + 1]
+        return self._quote_verse[lo:hi], self._quote_score[lo:hi]
+
+    def quoted_by(self, verse_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """``(doc_ids, scores)`` of the documents quoting a verse."""
+        lo, hi = self._quoted_indptr[verse_id], self._quoted_indptr[verse_id + 1]
+        return self._quoted_doc[lo:hi], self._quoted_score[lo:hi]
+
+    # -- near-duplicates ----------------------------------------------------
+    @property
+    def n_clusters(self) -> int:
+        return len(self._cluster_indptr) - 1
+
+    def cluster(self, cluster_id: int) -> np.ndarray:
+        """Documents of one cluster; clusters are numbered largest first."""
+        return self._cluster_docs[self._cluster_indptr[cluster_id]:self._cluster_indptr[cluster_id + 1]]
+
+    def duplicates(self, doc_id: int) -> np.ndarray:
+        """The other documents in *doc_id*'s near-duplicate cluster."""
+        cluster_id = int(self.doc_cluster[doc_id])
+        if cluster_id < 0:
+            return self._cluster_docs[:0]
+        members = self.cluster(cluster_id)
+        return members[members != doc_id]
+
+
+def open_near_duplicates(
+    path: Path = NEAR_DUPLICATES_PATH,
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    corpus_path: Optional[Path] = None,
+) -> NearDuplicates:
+    """Open the near-duplicate tables, building them from *data_dir* and the talk file first if needed."""
+    if not Path(path).exists():
+        build_near_duplicates(data_dir, talks_path, path, corpus_path)
+    return NearDuplicates(path)
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Find quotations and near-duplicate paragraphs with MinHash / LSH")
+    sub = ap.add_subparsers(dest="command", required=True)
+    path_help = "Near-duplicate tables, built if missing (default: <data-dir>/build/near_duplicates.bin)"
+
+    b = sub.add_parser("build", help="Detect quotations and near-duplicates")
+    b.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    b.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json)")
+    b.add_argument("--out", type=Path, default=None, help="Output tables (default: <data-dir>/build/near_duplicates.bin)")
+
+    q = sub.add_parser("quoted", help="Documents quoting a scripture reference")
+    q.add_argument("reference")
+    q.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    q.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json), used if the tables need building")
+    q.add_argument("--path", type=Path, default=None, help=path_help)
+
+    s = sub.add_parser("quotes", help="Verses quoted by one document, e.g. 'https://...#3'")
+    s.add_argument("locator")
+    s.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    s.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json), used if the tables need building")
+    s.add_argument("--path", type=Path, default=None, help=path_help)
+
+    c = sub.add_parser("clusters", help="Largest near-duplicate clusters")
+    c.add_argument("--source", choices=SOURCES, help="Only clusters containing this source")
+    c.add_argument("-n", type=int, default=10)
+    c.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    c.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json), used if the tables need building")
+    c.add_argument("--path", type=Path, default=None, help=path_help)
+    args = ap.parse_args()
+    default_path = Path(args.data_dir) / "build" / NEAR_DUPLICATES_PATH.name
+
+    if args.command == "build":
+        start = time.time()
+        args.out = args.out or default_path
+        header = build_near_duplicates(args.data_dir, args.talks, args.out)
+        print(
+            f"{header['n_quotes']} quotations, {header['n_duplicate_pairs']} near-duplicate pairs in "
+            f"{header['n_clusters']} clusters over {header['n_docs']} documents -> {args.out} "
+            f"({time.time() - start:.1f}s)"
+        )
+        return
+
+    args.path = args.path or default_path
+    if args.command == "clusters":
+        with open_near_duplicates(args.path, args.data_dir, args.talks) as nd:
+            shown = 0
+            for cluster_id in range(nd.n_clusters):
+                members = nd.cluster(cluster_id)
+                if args.source and args.source not in {nd.doc(d)[0] for d in members.tolist()}:
+                    continue
+                print(f"cluster {cluster_id}: {len(members)} documents")
+                for d in members[:5].tolist():
+                    print(f"    {nd.doc(d)[0]:<16} {nd.doc(d)[1]}")
+                if len(members) > 5:
+                    print(f"    ... {len(members) - 5} more")
+                shown += 1
+                if shown >= args.n:
+                    break
+        return
+
+    with open_corpus(data_dir=args.data_dir) as corpus, open_near_duplicates(args.path, args.data_dir, args.talks) as nd:
+        verses = VerseTable.from_corpus(corpus)
+        if args.command == "quoted":
+            verse_ids = verses.resolve(args.reference)
+            if not verse_ids:
+                raise SystemExit(f"Unknown reference {args.reference!r}")
+            for verse_id in verse_ids:
+                doc_ids, scores = nd.quoted_by(verse_id)
+                print(f"{verses.label(verse_id)}: quoted by {len(doc_ids)}")
+                for doc_id, score in zip(doc_ids.tolist(), scores.tolist()):
+                    source, locator = nd.doc(doc_id)
+                    print(f"  {score:4.0%}  {source:<16} {locator}")
+            return
+        doc_id = nd.doc_id(args.locator)
+        if doc_id is None:
+            raise SystemExit(f"No document {args.locator!r}")
+        verse_ids, scores = nd.quotes(doc_id)
+        for verse_id, score in zip(verse_ids.tolist(), scores.tolist()):
+            print(f"  {score:4.0%}  {verses.label(verse_id)}")
+        for other in nd.duplicates(doc_id).tolist():
+            print(f"  near-duplicate of {nd.doc(other)[0]} {nd.doc(other)[1]}")
+
+
+if __name__ == "__main__":
+    main()
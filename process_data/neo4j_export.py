@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import shlex
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from citation_graph import GRAPH_PATH, CitationGraph, open_graph
+from corpus_store import BUILD_DIR, DATA_DIR, open_corpus
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from talk_io import iter_talks  # noqa: E402
+
+try:
+    from neo4j import GraphDatabase
+except ImportError:  # optional: only needed for 'load'
+    GraphDatabase = None
+
+"""
+Neo4j export of the citation graph (see citation_graph.py).
+
+Two paths, sharing one schema:
+
+``csv``
+    Node and relationship files in ``neo4j-admin database import`` format
+    plus an ``import.sh`` holding the matching command. An offline full
+    import of the whole corpus (~42k verses, the talks, every TG / BD entry
+    and all citation edges) takes seconds.
+
+``load``
+    Batched, parameterised ``UNWIND $rows ... MERGE`` statements against a
+    running database through the neo4j driver, for incremental updates such
+    as a new conference (``--since-year``). Statements are idempotent, so a
+    batch can be re-sent after a failure. ``--dry-run`` prints the batches
+    instead of connecting.
+
+Schema:
+
+    (:Verse {id, ref, book, chapter, verse, text})
+    (:Talk {url, speaker, year, season})
+    (:Entry {id, source, name})
+    (:Talk)-[:CITES]->(:Verse)
+    (:Entry)-[:REFERENCES]->(:Verse)
+    (:Entry)-[:SEE_ALSO]->(:Entry)
+
+Verse and Entry ``id`` values are the citation graph IDs (verse IDs are corpus
+verse IDs), stored as integers by both paths. Talks are keyed by ``url``: a
+talk's graph ID is only its position in the talk file, which changes when
+the archive is re-scraped in a different order, so it is used to wire the
+CSV import but never stored.
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+CSV_DIR = BUILD_DIR / "neo4j_import"
+DEFAULT_BATCH = 5000
+
+# label -> csv file
+NODE_FILES = {
+    "Verse": "verses.csv",
+    "Talk": "talks.csv",
+    "Entry": "entries.csv",
+}
+
+# label -> property that identifies a node across loads
+NODE_KEYS = {
+    "Verse": "id",
+    "Talk": "url",
+    "Entry": "id",
+}
+
+# relation in the citation graph -> (start label, type, end label, csv file)
+RELATIONSHIPS = {
+    "talk_verse": ("Talk", "CITES", "Verse", "cites.csv"),
+    "entry_verse": ("Entry", "REFERENCES", "Verse", "references.csv"),
+    "entry_entry": ("Entry", "SEE_ALSO", "Entry", "see_also.csv"),
+}
+
+# ---------------------------------------------------------------------------
+# Rows
+# ---------------------------------------------------------------------------
+
+def verse_rows(corpus) -> Iterator[dict]:
+    titles = [b["title"] for b in corpus.books]
+    for ch, (book_id, chapter, _n) in enumerate(corpus.chapters()):
+        title = titles[corpus.chapter_book[ch]]
+        first = corpus.chapter_first_verse[ch]
+        for number, verse_id in enumerate(range(first, corpus.chapter_first_verse[ch + 1]), 1):
+            yield {
+                "id": verse_id,
+                "ref": f"{title} {chapter}:{number}",
+                "book": book_id,
+                "chapter": chapter,
+                "verse": number,
+                "text": corpus.verse_text(verse_id),
+            }
+
+
+def _year(value) -> Optional[int]:
+    return int(value) if str(value or "").strip().isdigit() else None
+
+
+def talk_rows(graph: CitationGraph, talks_path: Optional[Path] = None) -> List[dict]:
+    """One row per graph talk node, with metadata from the talk file where available."""
+    meta = {
+        talk["url"]: (talk.get("speaker") or "", _year(talk.get("year")), talk.get("season") or "")
+        for talk in iter_talks(talks_path)
+    }
+    rows = []
+    for talk_id, url in enumerate(graph.talk_urls):
+        speaker, year, season = meta.get(url, ("", None, ""))
+        rows.append({"id": talk_id, "url": url, "speaker": speaker, "year": year, "season": season})
+    return rows
+
+
+def entry_rows(graph: CitationGraph) -> List[dict]:
+    rows = []
+    for entry_id in range(graph.sizes["entry"]):
+        source, name = graph.entry(entry_id)
+        rows.append({"id": entry_id, "source": source, "name": name})
+    return rows
+
+# ---------------------------------------------------------------------------
+# neo4j-admin CSV
+# ---------------------------------------------------------------------------
+
+# label -> header columns (``name:type``); the first is the node ID, and an
+# unnamed ``:ID`` column wires relationships without being stored
+NODE_HEADERS = {
+    "Verse": ["id:ID(Verse)", "ref", "book", "chapter:int", "verse:int", "text"],
+    "Talk": [":ID(Talk)", "url", "speaker", "year:int", "season"],
+    "Entry": ["id:ID(Entry)", "source", "name"],
+}
+
+
+def _write_nodes(path: Path, header: List[str], rows: Iterable[dict]) -> int:
+    fields = [h.split(":")[0] or "id" for h in header]
+    n = 0
+    with path.open("w", encoding="utf-8", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(header)
+        for row in rows:
+            # None -> empty field, which neo4j-admin imports as a missing property.
+            writer.writerow(["" if row[f] is None else row[f] for f in fields])
+            n += 1
+    return n
+
+
+def _write_edges(path: Path, start_label: str, end_label: str, src: np.ndarray, dst: np.ndarray) -> int:
+    with path.open("w", encoding="utf-8", newline="") as fp:
+        fp.write(f":START_ID({start_label}),:END_ID({end_label})\n")
+        if len(src):
+            np.savetxt(fp, np.column_stack([src, dst]).astype(np.int64), fmt="%d", delimiter=",")
+    return len(src)
+
+
+def import_command(out_dir: Path, database: str = "neo4j") -> List[str]:
+    """``neo4j-admin database import full`` arguments for the files in *out_dir*.
+
+    ``--id-type=integer`` stores Verse / Entry ``id`` properties as integers,
+    the same type the UNWIND loaders MERGE on.
+    """
+    args = ["neo4j-admin", "database", "import", "full", database, "--overwrite-destination", "--id-type=integer"]
+    args += [f"--nodes={label}={out_dir / name}" for label, name in NODE_FILES.items()]
+    args += [
+        f"--relationships={rel_type}={out_dir / name}"
+        for _start, rel_type, _end, name in RELATIONSHIPS.values()
+    ]
+    return args
+
+
+def write_import_csvs(
+    corpus,
+    graph: CitationGraph,
+    out_dir: Path = CSV_DIR,
+    talks_path: Optional[Path] = None,
+    database: str = "neo4j",
+) -> Dict[str, int]:
+    """Write node / relationship CSVs and ``import.sh``; return row counts per file."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rows = {"Verse": verse_rows(corpus), "Talk": talk_rows(graph, talks_path), "Entry": entry_rows(graph)}
+    counts = {}
+    for label, name in NODE_FILES.items():
+        counts[name] = _write_nodes(out_dir / name, NODE_HEADERS[label], rows[label])
+    for relation, (start, _rel_type, end, name) in RELATIONSHIPS.items():
+        counts[name] = _write_edges(out_dir / name, start, end, *graph.edges(relation))
+
+    script = out_dir / "import.sh"
+    script.write_text("#!/bin/sh\n# Run with the database stopped.\n" + shlex.join(import_command(out_dir, database)) + "\n",
+                      encoding="utf-8")
+    script.chmod(0o755)
+    return counts
+
+# ---------------------------------------------------------------------------
+# Batched UNWIND loaders
+# ---------------------------------------------------------------------------
+
+def _batched(rows: Sequence[dict], size: int) -> Iterator[Sequence[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def schema_statements() -> List[str]:
+    return [
+        f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.{key} IS UNIQUE"
+        for label, key in NODE_KEYS.items()
+    ]
+
+
+def node_statement(label: str) -> str:
+    key = NODE_KEYS[label]
+    return f"UNWIND $rows AS row MERGE (n:{label} {{{key}: row.{key}}}) SET n += row"
+
+
+def edge_statement(start: str, rel_type: str, end: str) -> str:
+    return (
+        f"UNWIND $rows AS row "
+        f"MATCH (a:{start} {{{NODE_KEYS[start]}: row.s}}) MATCH (b:{end} {{{NODE_KEYS[end]}: row.e}}) "
+        f"MERGE (a)-[:{rel_type}]->(b)"
+    )
+
+
+def unwind_batches(
+    corpus,
+    graph: CitationGraph,
+    talks_path: Optional[Path] = None,
+    since_year: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH,
+) -> Iterator[Tuple[str, str, List[dict]]]:
+    """Yield ``(label or relationship type, cypher, rows)`` batches that load the graph.
+
+    With *since_year* only talks from that year on, and their ``CITES``
+    edges, are emitted; verses and entries are assumed to be loaded already.
+    """
+    talks = talk_rows(graph, talks_path)
+    if since_year is not None:
+        talks = [t for t in talks if t["year"] is not None and t["year"] >= since_year]
+        nodes = {"Talk": talks}
+        relations = ["talk_verse"]
+    else:
+        nodes = {"Verse": list(verse_rows(corpus)), "Talk": talks, "Entry": entry_rows(graph)}
+        relations = list(RELATIONSHIPS)
+
+    for label, rows in nodes.items():
+        if label == "Talk":
+            rows = [{k: v for k, v in row.items() if k != "id"} for row in rows]
+        for batch in _batched(rows, batch_size):
+            yield label, node_statement(label), list(batch)
+
+    wanted_talks = np.asarray([t["id"] for t in talks], dtype=np.int64)
+    urls = graph.talk_urls
+    for relation in relations:
+        start, rel_type, end, _name = RELATIONSHIPS[relation]
+        src, dst = graph.edges(relation)
+        if since_year is not None:
+            keep = np.isin(src, wanted_talks)
+            src, dst = src[keep], dst[keep]
+        statement = edge_statement(start, rel_type, end)
+        for lo in range(0, len(src), batch_size):
+            starts = src[lo:lo + batch_size].tolist()
+            if start == "Talk":
+                starts = [urls[s] for s in starts]
+            yield rel_type, statement, [{"s": s, "e": e} for s, e in zip(starts, dst[lo:lo + batch_size].tolist())]
+
+
+def run_batches(session, batches: Iterable[Tuple[str, str, List[dict]]]) -> Dict[str, int]:
+    """Send *batches* through *session* (anything with ``run(cypher, **params)``).
+
+    Returns the number of rows sent per label / relationship type.
+    """
+    for statement in schema_statements():
+        session.run(statement)
+    counts: Dict[str, int] = {}
+    for kind, statement, rows in batches:
+        session.run(statement, rows=rows)
+        counts[kind] = counts.get(kind, 0) + len(rows)
+    return counts
+
+
+def load_neo4j(
+    corpus,
+    graph: CitationGraph,
+    uri: str,
+    auth: Optional[Tuple[str, str]] = None,
+    database: Optional[str] = None,
+    talks_path: Optional[Path] = None,
+    since_year: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH,
+) -> Dict[str, int]:
+    """Load the graph (or the talks since *since_year*) into a running Neo4j."""
+    if GraphDatabase is None:
+        raise RuntimeError("Loading into Neo4j requires the neo4j package (pip install neo4j)")
+    batches = unwind_batches(corpus, graph, talks_path, since_year, batch_size)
+    with GraphDatabase.driver(uri, auth=auth) as driver, driver.session(database=database) as session:
+        return run_batches(session, batches)
+
+
+class _PrintSession:
+    """Stand-in session for ``--dry-run``: prints each statement and batch size."""
+
+    def run(self, statement: str, rows: Optional[List[dict]] = None) -> None:
+        print(statement if rows is None else f"{statement}  [{len(rows)} rows]")
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the citation graph to Neo4j")
+    ap.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    ap.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json)")
+    ap.add_argument("--graph", type=Path, default=None, help="Citation graph, built if missing (default: <data-dir>/build/citation_graph.bin)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    c = sub.add_parser("csv", help="Write neo4j-admin import CSVs")
+    c.add_argument("--out", type=Path, default=None, help="Output directory (default: <data-dir>/build/neo4j_import)")
+    c.add_argument("--database", default="neo4j")
+
+    load = sub.add_parser("load", help="Load through the driver with batched UNWIND statements")
+    load.add_argument("--uri", default="bolt://localhost:7687")
+    load.add_argument("--user", default="neo4j")
+    load.add_argument("--password", default=None)
+    load.add_argument("--database", default=None)
+    load.add_argument("--since-year", type=int, default=None, help="Only talks from this year on (incremental)")
+    load.add_argument("--batch-size", type=int, default=DEFAULT_BATCH)
+    load.add_argument("--dry-run", action="store_true", help="Print the statements instead of connecting")
+    args = ap.parse_args()
+    args.graph = args.graph or Path(args.data_dir) / "build" / GRAPH_PATH.name
+    if args.command == "csv":
+        args.out = args.out or Path(args.data_dir) / "build" / CSV_DIR.name
+
+    start = time.time()
+    with open_corpus(data_dir=args.data_dir) as corpus, open_graph(args.graph, args.data_dir, args.talks) as graph:
+        if args.command == "csv":
+            counts = write_import_csvs(corpus, graph, args.out, args.talks, args.database)
+            print(f"Wrote {counts} to {args.out} ({time.time() - start:.1f}s)")
+            print(f"Import with: {args.out / 'import.sh'}")
+            return
+        if args.dry_run:
+            counts = run_batches(_PrintSession(), unwind_batches(corpus, graph, args.talks, args.since_year, args.batch_size))
+        else:
+            auth = (args.user, args.password) if args.password else None
+            counts = load_neo4j(corpus, graph, args.uri, auth, args.database, args.talks, args.since_year, args.batch_size)
+    print(f"Loaded {counts} ({time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from corpus_store import BUILD_DIR, DATA_DIR, PackedFile, open_corpus, write_packed
+from near_duplicates import ragged_arange, runs, shingle_hashes
+from search_index import tokenize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from scripture_refs import VerseTable  # noqa: E402
+from talk_io import iter_talks  # noqa: E402
+
+"""
+Inline scripture quotations in conference talks, found without footnotes.
+
+The index holds every ``NGRAM``-word window of every verse as a 64-bit
+polynomial hash with its verse and word position, sorted by hash
+(``data/build/quote_index.bin``). Windows that occur in more than
+``MAX_POSTINGS`` verses ("and it came to", "i say unto you") are dropped as
+uninformative.
+
+Scanning a talk is one pass over its words: every window of every paragraph
+is hashed and looked up with a binary search, and the hits are chained per
+(paragraph, verse) while both the paragraph and the verse positions keep
+moving forward by at most ``MAX_GAP`` words. A chain is a quotation when it
+covers at least ``MIN_TOKENS`` words of the verse, or ``MIN_COVERAGE`` of a
+shorter verse. Gaps let a chain run through a changed word, an inserted
+"[and]" or a dropped stop-gram, so lightly edited quotations still align;
+verses of fewer than ``NGRAM`` words cannot be detected. Where chains for
+different verses share at least ``OVERLAP`` of their paragraph words, only
+the ones covering the most verse words are kept, so a passage aligns to the
+verse it quotes rather than to every verse sharing a phrase with it (exact
+parallels such as Isaiah in 2 Nephi tie and are all reported).
+
+Each match is (talk URL, paragraph number, verse ID, character span in the
+paragraph) plus the quoted word range of the verse and the fraction of the
+verse covered.
+
+    python process_data/quote_detector.py build
+    python process_data/quote_detector.py scan --talks conference_talks.jsonl --out quotes.jsonl
+    python process_data/quote_detector.py match "for my soul delighteth in the scriptures"
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+QUOTE_INDEX_PATH = BUILD_DIR / "quote_index.bin"
+QUOTES_PATH = BUILD_DIR / "verse_quotes.jsonl"
+
+NGRAM = 4
+MAX_POSTINGS = 64     # verses a window may occur in before it is dropped
+MAX_GAP = 6           # words between consecutive hits of one quotation
+MIN_TOKENS = 8        # verse words a quotation must cover...
+MIN_COVERAGE = 0.8    # ...or this fraction of a shorter verse
+OVERLAP = 0.5         # shared paragraph words that let a longer quotation shadow another
+BATCH_TALKS = 32
+
+MAGIC = b"DLQUOTES"
+FORMAT_VERSION = 1
+
+# A word of the original text, combining marks included, so spans index the
+# stored (NFD) paragraph; _fold maps it to the search_index token.
+WORD_RE = re.compile(r"[^\W_](?:[^\W_]|[\u0300-\u036f])*(?:['\u2019](?:[^\W_]|[\u0300-\u036f])+)*")
+
+
+@lru_cache(maxsize=1 << 16)
+def _fold(word: str) -> str:
+    return "".join(tokenize(word))
+
+
+class Match(NamedTuple):
+    paragraph: int       # position in the paragraphs passed to QuoteIndex.find
+    verse: int
+    start: int           # character span in the paragraph
+    end: int
+    verse_start: int     # word span in the verse
+    verse_end: int
+    coverage: float      # fraction of the verse's words quoted
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def build_quote_index(
+    data_dir: Path = DATA_DIR, out_path: Path = QUOTE_INDEX_PATH, corpus_path: Optional[Path] = None
+) -> dict:
+    """Hash every verse window and write the sorted window table.
+
+    *corpus_path* defaults to the corpus of *data_dir*.
+    """
+    vocab: Dict[str, int] = {}
+    ids = array("I")
+    verse_len = array("H")
+    with open_corpus(corpus_path, data_dir=data_dir) as corpus:
+        for verse_id in range(len(corpus)):
+            words = tokenize(corpus.verse_text(verse_id))
+            ids.extend(vocab.setdefault(w, len(vocab)) for w in words)
+            verse_len.append(len(words))
+    tokens = np.frombuffer(ids, dtype=np.uint32)
+    lengths = np.frombuffer(verse_len, dtype=np.uint16).astype(np.int64)
+    owner = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+    position = np.arange(len(tokens), dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    hashes, starts = shingle_hashes(tokens, owner, NGRAM)
+    verse, pos = owner[starts], position[starts]
+    order = np.lexsort((pos, verse, hashes))
+    hashes, verse, pos = hashes[order], verse[order], pos[order]
+
+    # Drop windows shared by too many verses.
+    new_verse = np.ones(len(hashes), dtype=bool)
+    new_verse[1:] = (hashes[1:] != hashes[:-1]) | (verse[1:] != verse[:-1])
+    run_start, run_size = runs(hashes)
+    n_verses = np.add.reduceat(new_verse.astype(np.int64), run_start) if len(run_start) else run_start
+    keep = np.repeat(n_verses <= MAX_POSTINGS, run_size)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "ngram": NGRAM,
+        "max_postings": MAX_POSTINGS,
+        "n_verses": len(lengths),
+        "n_terms": len(vocab),
+        "n_windows": int(keep.sum()),
+        "dropped_windows": int(len(keep) - keep.sum()),
+    }
+    return write_packed(out_path, MAGIC, header, [
+        ("terms", "\n".join(vocab).encode("utf-8")),
+        ("gram_hash", hashes[keep]),
+        ("gram_verse", verse[keep].astype(np.uint32)),
+        ("gram_pos", pos[keep].astype(np.uint16)),
+        ("verse_len", lengths.astype(np.uint16)),
+    ])
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+class QuoteIndex:
+    """Memory-mapped reader for an index written by :func:`build_quote_index`."""
+
+    def __init__(self, path: Path = QUOTE_INDEX_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+        header = self._packed.header
+        self.ngram: int = header["ngram"]
+        terms = str(self._packed.raw("terms"), "utf-8")
+        self.vocab = {term: i for i, term in enumerate(terms.split("\n"))} if terms else {}
+        self._oov = len(self.vocab)  # never part of an indexed window
+        self.gram_hash = np.frombuffer(self._packed.raw("gram_hash"), dtype=np.uint64)
+        self.gram_verse = np.frombuffer(self._packed.raw("gram_verse"), dtype=np.uint32)
+        self.gram_pos = np.frombuffer(self._packed.raw("gram_pos"), dtype=np.uint16)
+        self.verse_len = np.frombuffer(self._packed.raw("verse_len"), dtype=np.uint16)
+
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "QuoteIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def find(self, paragraphs: Sequence[str]) -> List[Match]:
+        """Verse quotations in *paragraphs*, in paragraph and text order."""
+        ids, word_start, word_end, para = array("I"), array("I"), array("I"), array("I")
+        vocab, oov = self.vocab, self._oov
+        for p, text in enumerate(paragraphs):
+            for m in WORD_RE.finditer(text):
+                word = _fold(m.group())
+                if word:
+                    ids.append(vocab.get(word, oov))
+                    word_start.append(m.start())
+                    word_end.append(m.end())
+                    para.append(p)
+        if not ids:
+            return []
+        para = np.frombuffer(para, dtype=np.uint32)
+        hashes, starts = shingle_hashes(np.frombuffer(ids, dtype=np.uint32), para, self.ngram)
+
+        # Every (window, verse, verse position) hit.
+        lo = np.searchsorted(self.gram_hash, hashes, "left")
+        count = np.searchsorted(self.gram_hash, hashes, "right") - lo
+        w = np.repeat(starts, count)
+        post = np.repeat(lo, count) + ragged_arange(count)
+        if not len(post):
+            return []
+        verse = self.gram_verse[post].astype(np.int64)
+        vpos = self.gram_pos[post].astype(np.int64)
+        p = para[w].astype(np.int64)
+        order = np.lexsort((vpos, w, verse, p))
+        w, verse, vpos, p = w[order], verse[order], vpos[order], p[order]
+
+        # Chain hits that keep moving forward in both texts.
+        step = np.diff(vpos)
+        new = np.ones(len(w), dtype=bool)
+        new[1:] = (
+            (p[1:] != p[:-1]) | (verse[1:] != verse[:-1])
+            | (np.diff(w) > MAX_GAP) | (step > MAX_GAP) | (step < -self.ngram)
+        )
+        run_start = np.flatnonzero(new)
+        run = np.cumsum(new) - 1
+
+        # Verse words covered: the union of [vpos, vpos + ngram) per chain.
+        by_pos = np.lexsort((vpos, run))
+        r, v = run[by_pos], vpos[by_pos]
+        gap = np.full(len(v), self.ngram, dtype=np.int64)
+        same = r[1:] == r[:-1]
+        gap[:-1][same] = np.minimum(np.diff(v)[same], self.ngram)
+        covered = np.bincount(r, weights=gap, minlength=len(run_start))
+
+        run_verse = verse[run_start]
+        size = self.verse_len[run_verse].astype(np.int64)
+        need = np.minimum(MIN_TOKENS, np.maximum(self.ngram, np.ceil(MIN_COVERAGE * size)))
+        found = np.flatnonzero(covered >= need)
+
+        first_w = w[run_start]
+        last_w = np.maximum.reduceat(w, run_start)
+        v_lo = np.minimum.reduceat(vpos, run_start)
+        v_hi = np.maximum.reduceat(vpos, run_start) + self.ngram
+        found = _best_aligned(p[run_start][found], first_w[found], last_w[found] + self.ngram, covered[found], found)
+        matches = [
+            Match(
+                int(p[run_start[i]]), int(run_verse[i]),
+                word_start[first_w[i]], word_end[last_w[i] + self.ngram - 1],
+                int(v_lo[i]), int(v_hi[i]), float(covered[i] / size[i]),
+            )
+            for i in found
+        ]
+        matches.sort(key=lambda m: (m.paragraph, m.start, m.verse))
+        return matches
+
+
+def _best_aligned(para: np.ndarray, lo: np.ndarray, hi: np.ndarray, covered: np.ndarray, ids: np.ndarray) -> List[int]:
+    """*ids* of the chains not dominated by another chain in the same paragraph.
+
+    A chain is dominated when a chain covering more verse words shares at
+    least ``OVERLAP`` of its paragraph words ``[lo, hi)``.
+    """
+    order = np.lexsort((-covered, para)).tolist()
+    para, lo, hi, covered, ids = para.tolist(), lo.tolist(), hi.tolist(), covered.tolist(), ids.tolist()
+    keep: List[int] = []
+    kept: List[int] = []
+    for j, i in enumerate(order):
+        if j and para[i] != para[order[j - 1]]:
+            kept = []
+        span = hi[i] - lo[i]
+        if any(
+            covered[k] > covered[i] and min(hi[i], hi[k]) - max(lo[i], lo[k]) >= OVERLAP * span
+            for k in kept
+        ):
+            continue
+        kept.append(i)
+        keep.append(ids[i])
+    return keep
+
+
+def open_quote_index(
+    path: Path = QUOTE_INDEX_PATH, data_dir: Path = DATA_DIR, corpus_path: Optional[Path] = None
+) -> QuoteIndex:
+    """Open the quotation index, building it from *data_dir* first if needed."""
+    if not Path(path).exists():
+        build_quote_index(data_dir, path, corpus_path)
+    return QuoteIndex(path)
+
+# ---------------------------------------------------------------------------
+# Scan
+# ---------------------------------------------------------------------------
+
+_worker_index: Optional[QuoteIndex] = None
+
+Batch = List[Tuple[str, List[Tuple[int, str]]]]
+
+
+def _init_worker(index_path: Path) -> None:
+    global _worker_index
+    _worker_index = QuoteIndex(index_path)
+
+
+def _scan_batch(batch: Batch) -> List[Tuple[str, int, Match]]:
+    """``(talk URL, paragraph number, match)`` for a batch of ``(url, paragraphs)``."""
+    out = []
+    for url, paragraphs in batch:
+        for m in _worker_index.find([text for _n, text in paragraphs]):
+            out.append((url, paragraphs[m.paragraph][0], m))
+    return out
+
+
+def _batches(talks: Iterable[dict], size: int = BATCH_TALKS) -> Iterator[Batch]:
+    batch: Batch = []
+    for talk in talks:
+        paragraphs = [(para["paragraph_number"], para["paragraph"] or "") for para in talk.get("content") or []]
+        batch.append((talk["url"], paragraphs))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def scan_talks(
+    talks: Iterable[dict],
+    index_path: Path = QUOTE_INDEX_PATH,
+    workers: Optional[int] = None,
+    data_dir: Path = DATA_DIR,
+    corpus_path: Optional[Path] = None,
+) -> Iterator[Tuple[str, int, Match]]:
+    """Stream ``(talk URL, paragraph number, match)`` for every quotation in *talks*.
+
+    Talks are scanned in batches by *workers* processes (default: one per
+    core; 1 scans in this process). Results come back in talk order and only
+    a few batches are in flight, so the archive is never held in memory.
+    A missing index is built from *data_dir* first.
+    """
+    if not Path(index_path).exists():
+        build_quote_index(data_dir, index_path, corpus_path)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(index_path)
+        for batch in _batches(talks):
+            yield from _scan_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index_path,)) as pool:
+        pending = deque()
+        for batch in _batches(talks):
+            pending.append(pool.submit(_scan_batch, batch))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Find verse quotations in conference talks")
+    sub = ap.add_subparsers(dest="command", required=True)
+    index_help = "Quote index, built if missing (default: <data-dir>/build/quote_index.bin)"
+
+    b = sub.add_parser("build", help="Index the verse windows")
+    b.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    b.add_argument("--out", type=Path, default=None, help="Output index (default: <data-dir>/build/quote_index.bin)")
+
+    s = sub.add_parser("scan", help="Scan a talk archive and write matches as JSON lines")
+    s.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json)")
+    s.add_argument("--out", type=Path, default=None, help="Matches as JSON lines (default: <data-dir>/build/verse_quotes.jsonl)")
+    s.add_argument("--workers", type=int, default=None)
+    s.add_argument("--index", type=Path, default=None, help=index_help)
+    s.add_argument("--data-dir", type=Path, default=DATA_DIR)
+
+    m = sub.add_parser("match", help="Find quotations in a piece of text")
+    m.add_argument("text")
+    m.add_argument("--index", type=Path, default=None, help=index_help)
+    m.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    args = ap.parse_args()
+    default_index = Path(args.data_dir) / "build" / QUOTE_INDEX_PATH.name
+
+    if args.command == "build":
+        start = time.time()
+        args.out = args.out or default_index
+        header = build_quote_index(args.data_dir, args.out)
+        print(
+            f"Indexed {header['n_windows']} windows of {header['n_verses']} verses "
+            f"({header['dropped_windows']} common ones dropped) into {args.out} ({time.time() - start:.1f}s)"
+        )
+        return
+
+    args.index = args.index or default_index
+    with open_corpus(data_dir=args.data_dir) as corpus:
+        verses = VerseTable.from_corpus(corpus)
+
+    if args.command == "match":
+        with open_quote_index(args.index, args.data_dir) as index:
+            for match in index.find([args.text]):
+                print(f"{match.coverage:4.0%}  {verses.label(match.verse):<24} {args.text[match.start:match.end]!r}")
+        return
+
+    start = time.time()
+    args.out = args.out or Path(args.data_dir) / "build" / QUOTES_PATH.name
+    n_matches = 0
+    talks = set()
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with args.out.open("w", encoding="utf-8") as fp:
+        for url, paragraph, match in scan_talks(iter_talks(args.talks), args.index, args.workers, args.data_dir):
+            fp.write(json.dumps({
+                "talk": url,
+                "paragraph": paragraph,
+                "verse": match.verse,
+                "reference": verses.label(match.verse),
+                "start": match.start,
+                "end": match.end,
+                "verse_words": [match.verse_start, match.verse_end],
+                "coverage": round(match.coverage, 3),
+            }, ensure_ascii=False) + "\n")
+            n_matches += 1
+            talks.add(url)
+    print(f"{n_matches} quotations in {len(talks)} talks -> {args.out} ({time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
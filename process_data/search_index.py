@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import sys
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from corpus_store import BUILD_DIR, DATA_DIR, PackedFile, open_corpus, write_packed
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from talk_io import iter_talks  # noqa: E402
+
+"""
+Persistent inverted index over scripture verses, Bible Dictionary / Topical
+Guide paragraphs and conference talk paragraphs.
+
+Posting lists are stored per term as three varint streams (document deltas,
+term frequencies, in-document position deltas) inside one memory-mapped file.
+Queries decode only the lists they touch (vectorised with NumPy) and rank with
+BM25. Text in double quotes is matched as a phrase.
+
+Verses are indexed first, so for ``source == "verse"`` the document ID equals
+the corpus verse ID.
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+INDEX_PATH = BUILD_DIR / "search_index.bin"
+BIBLE_DICTIONARY_PATHS = [DATA_DIR / "bible_dictionary.json", DATA_DIR / "bible_dictionary_entries.json"]
+TOPICAL_GUIDE_PATH = DATA_DIR / "topical_guide_entries.json"
+
+SOURCES = ["verse", "bible_dictionary", "topical_guide", "conference"]
+
+MAGIC = b"DLINDEX1"
+FORMAT_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# ---------------------------------------------------------------------------
+# Tokenising
+# ---------------------------------------------------------------------------
+COMBINING_RE = re.compile(r"[\u0300-\u036f]")
+TOKEN_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens with accents folded (``Nephi’s`` -> ``nephi's``)."""
+    text = unicodedata.normalize("NFKD", text.lower().replace("’", "'"))
+    return TOKEN_RE.findall(COMBINING_RE.sub("", text))
+
+# ---------------------------------------------------------------------------
+# Varint coding (LEB128, vectorised)
+# ---------------------------------------------------------------------------
+
+def varint_encode(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode unsigned ints; return ``(bytes, bytes_per_value)``."""
+    v = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(v), dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35, 42, 49, 56):
+        nbytes += v >= (1 << shift)
+    starts = np.cumsum(nbytes) - nbytes
+    idx = np.arange(int(nbytes.sum())) - np.repeat(starts, nbytes)
+    out = ((np.repeat(v, nbytes) >> (7 * idx).astype(np.uint64)) & 0x7F).astype(np.uint8)
+    out[idx < np.repeat(nbytes, nbytes) - 1] |= 0x80
+    return out, nbytes
+
+
+def varint_decode(buf) -> np.ndarray:
+    """Decode a buffer produced by :func:`varint_encode`."""
+    b = np.frombuffer(buf, dtype=np.uint8)
+    if not len(b):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(b < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    idx = np.arange(len(b)) - np.repeat(starts, ends - starts + 1)
+    vals = (b & 0x7F).astype(np.uint64) << (7 * idx).astype(np.uint64)
+    return np.add.reduceat(vals, starts)
+
+# ---------------------------------------------------------------------------
+# Documents
+# ---------------------------------------------------------------------------
+
+def _first_existing(paths: Sequence[Path]) -> Optional[Path]:
+    return next((p for p in paths if p.exists()), None)
+
+
+def iter_documents(
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    corpus_path: Optional[Path] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """Yield ``(source, locator, text)`` for everything that gets indexed.
+
+    *talks_path* defaults to the first conference talk file found by
+    ``talk_io.find_talks_file``; *corpus_path* to the corpus of *data_dir*.
+    """
+    with open_corpus(corpus_path, data_dir=data_dir) as corpus:
+        titles = [b["title"] for b in corpus.books]
+        for ch, (_book_id, chapter, _n) in enumerate(corpus.chapters()):
+            title = titles[corpus.chapter_book[ch]]
+            verses = range(corpus.chapter_first_verse[ch], corpus.chapter_first_verse[ch + 1])
+            for number, verse_id in enumerate(verses, 1):
+                yield "verse", f"{title} {chapter}:{number}", corpus.verse_text(verse_id)
+
+    for source, path in (
+        ("bible_dictionary", _first_existing([data_dir / p.name for p in BIBLE_DICTIONARY_PATHS])),
+        ("topical_guide", data_dir / TOPICAL_GUIDE_PATH.name),
+    ):
+        if path is None or not path.exists():
+            continue
+        for entry in json.loads(path.read_text(encoding="utf-8")):
+            for para in entry.get("paragraphs", []):
+                yield source, f"{entry['entry']}#{para['paragraph_number']}", para["text"]
+
+    for talk in iter_talks(talks_path):
+        for para in talk.get("content") or []:
+            yield "conference", f"{talk['url']}#{para['paragraph_number']}", para["paragraph"]
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _prefix_sums(counts: np.ndarray) -> np.ndarray:
+    """``[0, c0, c0+c1, ...]`` as int64."""
+    out = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=out[1:])
+    return out
+
+
+def build_index(documents: Iterable[Tuple[str, str, str]], out_path: Path = INDEX_PATH) -> dict:
+    """Tokenise *documents* and write the on-disk index."""
+    vocab: dict[str, int] = {}
+    occ_term = array("I")
+    occ_doc = array("I")
+    occ_pos = array("I")
+    doc_len = array("I")
+    doc_source = array("B")
+    locators: list[str] = []
+
+    for doc_id, (source, locator, text) in enumerate(documents):
+        tokens = tokenize(text)
+        occ_term.extend(vocab.setdefault(tok, len(vocab)) for tok in tokens)
+        occ_doc.extend([doc_id] * len(tokens))
+        occ_pos.extend(range(len(tokens)))
+        doc_len.append(len(tokens))
+        doc_source.append(SOURCES.index(source))
+        locators.append(locator)
+
+    # Renumber terms alphabetically so the vocabulary section is sorted.
+    terms = sorted(vocab)
+    remap = np.empty(len(terms), dtype=np.uint32)
+    remap[[vocab[t] for t in terms]] = np.arange(len(terms), dtype=np.uint32)
+
+    t = remap[np.frombuffer(occ_term, dtype=np.uint32)]
+    d = np.frombuffer(occ_doc, dtype=np.uint32)
+    p = np.frombuffer(occ_pos, dtype=np.uint32)
+    order = np.lexsort((p, d, t))
+    t, d, p = t[order], d[order], p[order]
+
+    # One posting per (term, doc) pair.
+    new_pair = np.ones(len(t), dtype=bool)
+    new_pair[1:] = (t[1:] != t[:-1]) | (d[1:] != d[:-1])
+    pair_start = np.flatnonzero(new_pair)
+    pair_term = t[pair_start]
+    pair_doc = d[pair_start].astype(np.int64)
+    tf = np.diff(np.append(pair_start, len(t)))
+
+    new_term = np.ones(len(pair_term), dtype=bool)
+    new_term[1:] = pair_term[1:] != pair_term[:-1]
+    doc_delta = np.diff(pair_doc, prepend=0)
+    doc_delta[new_term] = pair_doc[new_term]
+
+    pos_delta = np.diff(p.astype(np.int64), prepend=0)
+    pos_delta[new_pair] = p[new_pair]
+
+    docs_bytes, docs_n = varint_encode(doc_delta)
+    tf_bytes, tf_n = varint_encode(tf)
+    pos_bytes, pos_n = varint_encode(pos_delta)
+
+    # Byte offsets of each term's slice in the three streams.
+    n_terms = len(terms)
+    df = np.bincount(pair_term, minlength=n_terms).astype(np.uint32)
+    pairs_per_term = _prefix_sums(df)
+    occ_per_term = _prefix_sums(np.bincount(t, minlength=n_terms))
+    docs_off = _prefix_sums(docs_n)[pairs_per_term].astype(np.uint64)
+    tf_off = _prefix_sums(tf_n)[pairs_per_term].astype(np.uint64)
+    pos_off = _prefix_sums(pos_n)[occ_per_term].astype(np.uint64)
+
+    locator_blob = "\n".join(locators).encode("utf-8")
+    header = {
+        "version": FORMAT_VERSION,
+        "sources": SOURCES,
+        "n_docs": len(doc_len),
+        "n_terms": n_terms,
+        "avg_doc_len": (sum(doc_len) / len(doc_len)) if doc_len else 0.0,
+    }
+    return write_packed(out_path, MAGIC, header, [
+        ("terms", "\n".join(terms).encode("utf-8")),
+        ("df", df),
+        ("docs_off", docs_off),
+        ("tf_off", tf_off),
+        ("pos_off", pos_off),
+        ("docs", docs_bytes),
+        ("tfs", tf_bytes),
+        ("positions", pos_bytes),
+        ("doc_len", doc_len),
+        ("doc_source", doc_source),
+        ("locators", locator_blob),
+    ])
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+class SearchIndex:
+    """Memory-mapped reader for an index written by :func:`build_index`."""
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+        header = self._packed.header
+        self.sources: List[str] = header["sources"]
+        self.n_docs: int = header["n_docs"]
+        self.avg_doc_len: float = header["avg_doc_len"] or 1.0
+
+        terms = str(self._packed.raw("terms"), "utf-8")
+        self.vocab = {term: i for i, term in enumerate(terms.split("\n"))} if terms else {}
+        self.df = np.frombuffer(self._packed.raw("df"), dtype=np.uint32)
+        self._docs_off = np.frombuffer(self._packed.raw("docs_off"), dtype=np.uint64)
+        self._tf_off = np.frombuffer(self._packed.raw("tf_off"), dtype=np.uint64)
+        self._pos_off = np.frombuffer(self._packed.raw("pos_off"), dtype=np.uint64)
+        self._docs = self._packed.raw("docs")
+        self._tfs = self._packed.raw("tfs")
+        self._positions = self._packed.raw("positions")
+        self.doc_len = np.frombuffer(self._packed.raw("doc_len"), dtype=np.uint32)
+        self.doc_source = np.frombuffer(self._packed.raw("doc_source"), dtype=np.uint8)
+
+        blob = self._packed.raw("locators")
+        self._locators = blob
+        # Start offset of every locator in the newline-joined blob.
+        newlines = np.flatnonzero(np.frombuffer(blob, dtype=np.uint8) == 0x0A)
+        self._locator_starts = np.concatenate(([0], newlines + 1))
+        self._locator_ends = np.append(newlines, len(blob))
+
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- postings -----------------------------------------------------------
+    def locator(self, doc_id: int) -> str:
+        return str(self._locators[self._locator_starts[doc_id]:self._locator_ends[doc_id]], "utf-8")
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """``(doc_ids, term_frequencies)`` for one term (empty if unknown)."""
+        i = self.vocab.get(term)
+        if i is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        docs = np.cumsum(varint_decode(self._docs[self._docs_off[i]:self._docs_off[i + 1]])).astype(np.int64)
+        tfs = varint_decode(self._tfs[self._tf_off[i]:self._tf_off[i + 1]]).astype(np.int64)
+        return docs, tfs
+
+    def positions(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Every ``(doc_id, position)`` occurrence of *term*, as two arrays."""
+        docs, tfs = self.postings(term)
+        if not len(docs):
+            return docs, docs
+        i = self.vocab[term]
+        deltas = varint_decode(self._positions[self._pos_off[i]:self._pos_off[i + 1]]).astype(np.int64)
+        # Deltas restart at every document boundary.
+        running = np.cumsum(deltas)
+        group_start = np.cumsum(tfs) - tfs
+        base = np.repeat(running[group_start] - deltas[group_start], tfs)
+        return np.repeat(docs, tfs), running - base
+
+    def _phrase_postings(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Documents containing *tokens* consecutively, with match counts."""
+        # Start from the rarest token so the candidate set stays small.
+        order = sorted(range(len(tokens)), key=lambda i: self.df[self.vocab[tokens[i]]] if tokens[i] in self.vocab else 0)
+        keys = None
+        for offset in order:
+            docs, pos = self.positions(tokens[offset])
+            # Key each occurrence by (doc, position where the phrase would start).
+            keep = pos >= offset
+            k = (docs[keep] << 32) | (pos[keep] - offset)
+            if keys is None:
+                keys = k
+            elif len(k):
+                idx = np.minimum(np.searchsorted(k, keys), len(k) - 1)
+                keys = keys[k[idx] == keys]
+            else:
+                keys = k
+            if not len(keys):
+                break
+        if keys is None or not len(keys):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        docs, counts = np.unique(keys >> 32, return_counts=True)
+        return docs, counts
+
+    # -- ranking ------------------------------------------------------------
+    def _bm25(self, docs: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        df = len(docs)
+        idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+        dl = self.doc_len[docs]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * dl / self.avg_doc_len)
+        return idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        sources: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[str, str, float]]:
+        """Return the top *k* ``(source, locator, score)`` hits for *query*."""
+        return [(self.sources[self.doc_source[d]], self.locator(d), s) for d, s in self.search_ids(query, k, sources)]
+
+    def search_ids(
+        self,
+        query: str,
+        k: int = 10,
+        sources: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Like :meth:`search` but returns ``(doc_id, score)`` pairs."""
+        clauses: list[Tuple[np.ndarray, np.ndarray]] = []
+        for phrase in PHRASE_RE.findall(query):
+            tokens = tokenize(phrase)
+            if len(tokens) == 1:
+                clauses.append(self.postings(tokens[0]))
+            elif tokens:
+                clauses.append(self._phrase_postings(tokens))
+        for tok in tokenize(PHRASE_RE.sub(" ", query)):
+            clauses.append(self.postings(tok))
+        clauses = [c for c in clauses if len(c[0])]
+        if not clauses:
+            return []
+
+        docs = np.concatenate([c[0] for c in clauses])
+        scores = np.concatenate([self._bm25(*c) for c in clauses])
+        if sources is not None:
+            wanted = np.isin(self.doc_source[docs], [self.sources.index(s) for s in sources])
+            docs, scores = docs[wanted], scores[wanted]
+            if not len(docs):
+                return []
+
+        uniq, inverse = np.unique(docs, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+        if len(totals) > k:
+            top = np.argpartition(-totals, k)[:k]
+        else:
+            top = np.arange(len(totals))
+        top = top[np.argsort(-totals[top], kind="stable")]
+        return [(int(uniq[i]), float(totals[i])) for i in top]
+
+
+def open_index(
+    path: Path = INDEX_PATH,
+    data_dir: Path = DATA_DIR,
+    talks_path: Optional[Path] = None,
+    corpus_path: Optional[Path] = None,
+) -> SearchIndex:
+    """Open the search index, building it from *data_dir* and the talk file first if needed."""
+    if not Path(path).exists():
+        build_index(iter_documents(data_dir, talks_path, corpus_path), path)
+    return SearchIndex(path)
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or query the full-text search index")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Index verses, dictionary entries and conference talks")
+    b.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    b.add_argument("--talks", type=Path, default=None, help="conference_talks.jsonl (or .json)")
+    b.add_argument("--out", type=Path, default=None, help="Output index (default: <data-dir>/build/search_index.bin)")
+
+    q = sub.add_parser("query", help='Search, e.g. \'"faith is not" hope\'')
+    q.add_argument("query")
+    q.add_argument("-k", type=int, default=10)
+    q.add_argument("--source", action="append", choices=SOURCES, help="Restrict to a source (repeatable)")
+    q.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    q.add_argument("--index", type=Path, default=None, help="Index to query (default: <data-dir>/build/search_index.bin)")
+    args = ap.parse_args()
+    default_index = Path(args.data_dir) / "build" / INDEX_PATH.name
+
+    if args.command == "build":
+        start = time.time()
+        args.out = args.out or default_index
+        header = build_index(iter_documents(args.data_dir, args.talks), args.out)
+        print(f"Indexed {header['n_docs']} documents / {header['n_terms']} terms into {args.out} ({time.time() - start:.1f}s)")
+        return
+
+    with SearchIndex(args.index or default_index) as index:
+        start = time.perf_counter()
+        hits = index.search(args.query, args.k, args.source)
+        elapsed = (time.perf_counter() - start) * 1000
+        for source, locator, score in hits:
+            print(f"{score:7.3f}  {source:<16} {locator}")
+        print(f"\n{len(hits)} hits in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from corpus_store import BUILD_DIR, DATA_DIR, PackedFile, iter_chapter_files, open_corpus, verse_footnotes, write_packed
+from footnote_edges import EDGES_PATH, KINDS, open_edges
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "retreive_data"))
+from scripture_refs import VerseTable, parse_reference  # noqa: E402
+
+"""
+Character-span index over the verse text: footnote anchors and italics.
+
+Every verse in the chapter JSON marks the words its footnotes hang on
+(``footnotes[].start`` / ``end``) and the words printed in italics
+(``italics[].start`` / ``end``), as character offsets into the verse text.
+This module packs those spans into sorted arrays (``data/build/spans.bin``):
+
+    verse_indptr     spans of verse v are rows indptr[v] .. indptr[v + 1]
+    span_start/end   sorted by start within a verse
+    span_max_end     running maximum of span_end within the verse
+    span_kind        footnote / italic
+    span_note        footnote ID (the same IDs as footnote_edges.py)
+    note_kinds       bit mask of the edge kinds each footnote carries
+    note_text        the footnote strings themselves
+
+"Which spans cover characters [a, b)" is two binary searches: spans starting
+before *b* are a prefix of the verse's rows, and because ``span_max_end`` is
+non-decreasing the first row that can still reach past *a* is found the same
+way. "Which words carry a TG link" is a mask over the verse's rows.
+
+:func:`render_chapter` walks the spans of a whole chapter (one contiguous
+slice) once and emits HTML or Markdown with italics, TG-linked words,
+footnote markers ("19a") and the footnote list. Markdown has no markup for
+TG links, so those words are wrapped in the same inline ``<span class="tg">``
+as in HTML.
+
+    python process_data/span_index.py build
+    python process_data/span_index.py covering "Mosiah 3:19" 8 20
+    python process_data/span_index.py render "Mosiah 3" --format md
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+SPANS_PATH = BUILD_DIR / "spans.bin"
+
+SPAN_KINDS = ["footnote", "italic"]
+NO_NOTE = 0xFFFFFFFF
+FORMATS = ["html", "md"]
+
+MAGIC = b"DLSPANS1"
+FORMAT_VERSION = 1
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def build_spans(data_dir: Path = DATA_DIR, out_path: Path = SPANS_PATH, edges_path: Optional[Path] = None) -> dict:
+    """Collect every footnote / italic span under *data_dir* and write the index.
+
+    Footnote IDs and edge kinds come from the footnote edge list, which is
+    built first if needed; both walk the chapter files in the same order.
+    *edges_path* defaults to ``footnote_edges.bin`` next to *out_path*.
+    """
+    if edges_path is None:
+        edges_path = Path(out_path).parent / EDGES_PATH.name
+    with open_corpus(data_dir=data_dir) as corpus:
+        n_verses = len(corpus)
+    with open_edges(edges_path, data_dir) as edges:
+        n_notes = len(edges.note_verse)
+        note_kinds = np.zeros(n_notes, dtype=np.uint8)
+        np.bitwise_or.at(note_kinds, edges.edge_note, (1 << edges.edge_kind.astype(np.uint8)).astype(np.uint8))
+
+    verse_indptr = array("I", [0])
+    rows: List[Tuple[int, int, int, int]] = []
+    note_offsets = array("I", [0])
+    note_text = bytearray()
+    verse_id = 0
+    for _volume_id, _book_id, _chapter, path in iter_chapter_files(data_dir):
+        for verse in json.loads(path.read_text(encoding="utf-8"))["chapter"]["verses"]:
+            spans = []
+            for note in verse_footnotes(verse):
+                spans.append((note.get("start", 0), note.get("end", 0), 0, len(note_offsets) - 1))
+                note_text += note.get("footnote", "").encode("utf-8")
+                note_offsets.append(len(note_text))
+            for italic in verse.get("italics") or []:
+                spans.append((italic["start"], italic["end"], 1, NO_NOTE))
+            spans.sort()
+            rows.extend(spans)
+            verse_indptr.append(len(rows))
+            verse_id += 1
+    if verse_id != n_verses:
+        raise ValueError(f"Chapter files hold {verse_id} verses but the corpus has {n_verses}; rebuild the corpus")
+    if len(note_offsets) - 1 != n_notes:
+        raise ValueError("Footnote edge list is out of date; rebuild it with footnote_edges.py build")
+
+    table = np.asarray(rows, dtype=np.int64).reshape(-1, 4)
+    starts, ends = table[:, 0].astype(np.uint16), table[:, 1].astype(np.uint16)
+    # Running max of the end offset, restarted at every verse.
+    max_end = ends.astype(np.int64)
+    indptr = np.frombuffer(verse_indptr, dtype=np.uint32).astype(np.int64)
+    verse_of = np.repeat(np.arange(n_verses), np.diff(indptr))
+    shifted = max_end + verse_of * (1 << 16)  # later verses always dominate
+    max_end = (np.maximum.accumulate(shifted) - verse_of * (1 << 16)).astype(np.uint16)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "span_kinds": SPAN_KINDS,
+        "note_kinds": KINDS,
+        "n_verses": n_verses,
+        "n_notes": n_notes,
+        "n_spans": {kind: int((table[:, 2] == i).sum()) for i, kind in enumerate(SPAN_KINDS)},
+    }
+    return write_packed(out_path, MAGIC, header, [
+        ("verse_indptr", verse_indptr),
+        ("span_start", starts),
+        ("span_end", ends),
+        ("span_max_end", max_end),
+        ("span_kind", table[:, 2].astype(np.uint8)),
+        ("span_note", table[:, 3].astype(np.uint32)),
+        ("note_kinds", note_kinds),
+        ("note_offsets", note_offsets),
+        ("note_text", note_text),
+    ])
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+class SpanIndex:
+    """Memory-mapped reader for an index written by :func:`build_spans`."""
+
+    def __init__(self, path: Path = SPANS_PATH):
+        self._packed = PackedFile(path, MAGIC, FORMAT_VERSION)
+        header = self._packed.header
+        self.note_kind_names: List[str] = header["note_kinds"]
+
+        def col(name, dtype):
+            return np.frombuffer(self._packed.raw(name), dtype=dtype)
+
+        self.verse_indptr = col("verse_indptr", np.uint32)
+        self.span_start = col("span_start", np.uint16)
+        self.span_end = col("span_end", np.uint16)
+        self.span_max_end = col("span_max_end", np.uint16)
+        self.span_kind = col("span_kind", np.uint8)
+        self.span_note = col("span_note", np.uint32)
+        self.note_kinds = col("note_kinds", np.uint8)
+        self.note_offsets = col("note_offsets", np.uint32)
+        self._note_text = self._packed.raw("note_text")
+
+    def close(self) -> None:
+        self._packed.close()
+
+    def __enter__(self) -> "SpanIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def rows(self, verse_id: int) -> range:
+        """Span rows of one verse (sorted by start offset)."""
+        return range(int(self.verse_indptr[verse_id]), int(self.verse_indptr[verse_id + 1]))
+
+    def note_text(self, note_id: int) -> str:
+        return str(self._note_text[self.note_offsets[note_id]:self.note_offsets[note_id + 1]], "utf-8")
+
+    def covering(self, verse_id: int, start: int, end: Optional[int] = None, kinds: Sequence[str] = SPAN_KINDS) -> List[Tuple[str, int, int, int]]:
+        """``(kind, start, end, note_id)`` for spans overlapping characters ``[start, end)``.
+
+        *end* defaults to ``start + 1`` (the spans covering one character).
+        ``note_id`` is -1 for italics.
+        """
+        end = start + 1 if end is None else end
+        rows = self.rows(verse_id)
+        # Rows that start before *end* are a prefix; of those, rows whose
+        # running max end is <= *start* cannot overlap and form a prefix too.
+        hi = rows.start + int(np.searchsorted(self.span_start[rows.start:rows.stop], end, side="left"))
+        lo = rows.start + int(np.searchsorted(self.span_max_end[rows.start:hi], start, side="right"))
+        wanted = [SPAN_KINDS.index(k) for k in kinds]
+        out = []
+        for row in range(lo, hi):
+            if self.span_end[row] > start and self.span_kind[row] in wanted:
+                note = int(self.span_note[row])
+                out.append((SPAN_KINDS[self.span_kind[row]], int(self.span_start[row]), int(self.span_end[row]),
+                            -1 if note == NO_NOTE else note))
+        return out
+
+    def linked_spans(self, verse_id: int, kind: str = "tg") -> List[Tuple[int, int, int]]:
+        """``(start, end, note_id)`` of the footnoted words whose footnote has a *kind* edge."""
+        rows = self.rows(verse_id)
+        notes = self.span_note[rows.start:rows.stop]
+        is_note = notes != NO_NOTE
+        bit = np.uint8(1 << self.note_kind_names.index(kind))
+        hits = np.flatnonzero(is_note & ((self.note_kinds[np.where(is_note, notes, 0)] & bit) != 0)) + rows.start
+        return [(int(self.span_start[r]), int(self.span_end[r]), int(self.span_note[r])) for r in hits]
+
+
+def open_spans(path: Path = SPANS_PATH, data_dir: Path = DATA_DIR) -> SpanIndex:
+    """Open the span index, building it first if needed."""
+    if not Path(path).exists():
+        build_spans(data_dir, path)
+    return SpanIndex(path)
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _letter(i: int) -> str:
+    """a .. z, then aa, ab, ... (the site never goes past z, but be safe)."""
+    return chr(97 + i) if i < 26 else _letter(i // 26 - 1) + chr(97 + i % 26)
+
+
+def _segments(text: str, starts, ends, kinds, notes, tg_notes) -> List[Tuple[str, bool, bool, List[int]]]:
+    """Split *text* at every span boundary in one sweep.
+
+    Yields ``(piece, italic, tg_linked, footnotes ending here)``; footnote
+    markers go right after the last character of their span.
+    """
+    n = len(text)
+    delta = {}
+    ending = {}
+    for s, e, k, note in zip(starts, ends, kinds, notes):
+        s, e = min(s, n), min(e, n)
+        flags = (1, 0) if k == 1 else (0, 1) if note in tg_notes else (0, 0)
+        for pos, sign in ((s, 1), (e, -1)):
+            d = delta.setdefault(pos, [0, 0])
+            d[0] += sign * flags[0]
+            d[1] += sign * flags[1]
+        if k == 0:
+            ending.setdefault(e, []).append(note)
+    cuts = sorted({0, n, *delta})
+    pieces = []
+    italic = tg = 0
+    for a, b in zip(cuts, cuts[1:]):
+        d = delta.get(a, (0, 0))
+        italic, tg = italic + d[0], tg + d[1]
+        pieces.append((text[a:b], italic > 0, tg > 0, sorted(ending.get(b, []))))
+    if not pieces:  # empty verse: markers of zero-width notes still need a home
+        pieces.append(("", False, False, sorted(ending.get(0, []))))
+    return pieces
+
+
+def render_chapter(corpus, spans: SpanIndex, book_id: str, chapter: int, fmt: str = "html") -> str:
+    """One chapter as annotated HTML or Markdown, from one slice of the span arrays."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {FORMATS}")
+    verses = corpus.chapter_range(book_id, chapter)
+    title = f"{corpus.books[corpus.chapter_book[corpus.chapter_index(book_id, chapter)]]['title']} {chapter}"
+    lo, hi = int(spans.verse_indptr[verses.start]), int(spans.verse_indptr[verses.stop])
+    starts, ends = spans.span_start[lo:hi].tolist(), spans.span_end[lo:hi].tolist()
+    kinds, notes = spans.span_kind[lo:hi].tolist(), spans.span_note[lo:hi].tolist()
+    tg_bit = 1 << spans.note_kind_names.index("tg")
+
+    body: List[str] = []
+    footnotes: List[str] = []
+    for number, verse_id in enumerate(verses, 1):
+        a, b = int(spans.verse_indptr[verse_id]) - lo, int(spans.verse_indptr[verse_id + 1]) - lo
+        verse_notes = sorted(n for n, k in zip(notes[a:b], kinds[a:b]) if k == 0)
+        letters = {n: f"{number}{_letter(i)}" for i, n in enumerate(verse_notes)}
+        tg_notes = {n for n in verse_notes if spans.note_kinds[n] & tg_bit}
+
+        out = []
+        text = corpus.verse_text(verse_id)
+        for piece, italic, in_tg, ending in _segments(text, starts[a:b], ends[a:b], kinds[a:b], notes[a:b], tg_notes):
+            if fmt == "html":
+                piece = html.escape(piece)
+                if in_tg:
+                    piece = f'<span class="tg">{piece}</span>'
+                if italic:
+                    piece = f"<em>{piece}</em>"
+                piece += "".join(f'<sup><a href="#note-{letters[n]}">{letters[n][len(str(number)):]}</a></sup>' for n in ending)
+            else:
+                if in_tg and piece.strip():
+                    # Markdown has no markup of its own for this; inline HTML passes through
+                    lead, core, trail = piece[:len(piece) - len(piece.lstrip())], piece.strip(), piece[len(piece.rstrip()):]
+                    piece = f'{lead}<span class="tg">{core}</span>{trail}'
+                if italic and piece.strip():
+                    lead, core, trail = piece[:len(piece) - len(piece.lstrip())], piece.strip(), piece[len(piece.rstrip()):]
+                    piece = f"{lead}*{core}*{trail}"
+                piece += "".join(f"[^{letters[n]}]" for n in ending)
+            out.append(piece)
+
+        if fmt == "html":
+            body.append(f'<p class="verse" id="v{number}"><span class="verse-number">{number}</span> {"".join(out)}</p>')
+            footnotes.extend(
+                f'<li id="note-{letters[n]}"><span class="marker">{letters[n]}</span> {html.escape(spans.note_text(n))}</li>'
+                for n in verse_notes
+            )
+        else:
+            body.append(f"**{number}** {''.join(out)}")
+            footnotes.extend(f"[^{letters[n]}]: {spans.note_text(n)}" for n in verse_notes)
+
+    if fmt == "html":
+        notes_html = f'\n<ol class="footnotes">\n{chr(10).join(footnotes)}\n</ol>' if footnotes else ""
+        return f'<article class="chapter">\n<h2>{html.escape(title)}</h2>\n' + "\n".join(body) + notes_html + "\n</article>\n"
+    return f"## {title}\n\n" + "\n\n".join(body) + ("\n\n" + "\n".join(footnotes) if footnotes else "") + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Footnote / italic span index and annotated chapter rendering")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Pack every footnote and italic span")
+    b.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    b.add_argument("--out", type=Path, default=None, help="Output span index (default: <data-dir>/build/spans.bin)")
+    b.add_argument("--edges", type=Path, default=None,
+                   help="Footnote edge list to read (built if missing); default: footnote_edges.bin next to --out")
+
+    c = sub.add_parser("covering", help='Spans covering characters [start, end) of a verse, e.g. "Mosiah 3:19" 8 20')
+    c.add_argument("reference")
+    c.add_argument("start", type=int)
+    c.add_argument("end", type=int, nargs="?")
+    c.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    c.add_argument("--spans", type=Path, default=None, help="Span index, built if missing (default: <data-dir>/build/spans.bin)")
+
+    r = sub.add_parser("render", help='Annotated chapter, e.g. "Mosiah 3"')
+    r.add_argument("chapter")
+    r.add_argument("--format", choices=FORMATS, default="html")
+    r.add_argument("--out", type=Path, default=None)
+    r.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    r.add_argument("--spans", type=Path, default=None, help="Span index, built if missing (default: <data-dir>/build/spans.bin)")
+    args = ap.parse_args()
+    default_spans = Path(args.data_dir) / "build" / SPANS_PATH.name
+
+    if args.command == "build":
+        start = time.time()
+        args.out = args.out or default_spans
+        header = build_spans(args.data_dir, args.out, args.edges)
+        counts = ", ".join(f"{kind} {n}" for kind, n in header["n_spans"].items())
+        print(f"Wrote {args.out}: {counts} spans over {header['n_verses']} verses ({time.time() - start:.1f}s)")
+        return
+
+    with open_corpus(data_dir=args.data_dir) as corpus, open_spans(args.spans or default_spans, args.data_dir) as spans:
+        if args.command == "covering":
+            verse_ids = VerseTable.from_corpus(corpus).resolve(args.reference)
+            if not verse_ids:
+                raise SystemExit(f"Could not resolve {args.reference!r} to a verse")
+            text = corpus.verse_text(verse_ids[0])
+            started = time.perf_counter()
+            hits = spans.covering(verse_ids[0], args.start, args.end)
+            elapsed = (time.perf_counter() - started) * 1000
+            for kind, s, e, note in hits:
+                extra = f"  {spans.note_text(note)}" if note >= 0 else ""
+                print(f"{kind:<8} [{s}:{e}] {text[s:e]!r}{extra}")
+            words = [text[s:e] for s, e, _note in spans.linked_spans(verse_ids[0], "tg")]
+            print(f"TG-linked words: {', '.join(words) or '-'}  ({elapsed:.3f} ms)")
+            return
+
+        refs = parse_reference(args.chapter)
+        if not refs:
+            raise SystemExit(f"Could not parse {args.chapter!r} as a chapter")
+        started = time.perf_counter()
+        out = render_chapter(corpus, spans, refs[0].book_id, refs[0].chapter, args.format)
+        elapsed = (time.perf_counter() - started) * 1000
+    if args.out:
+        args.out.write_text(out, encoding="utf-8")
+        print(f"Wrote {args.out} ({elapsed:.1f} ms)")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
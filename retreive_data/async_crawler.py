@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+from tqdm import tqdm
+
+from fetch_conference_talks import (
+    extract_conference_links,
+    extract_talk_links,
+    extract_year_links,
+    is_decade_page,
+    link_base,
+    make_soup,
+    parse_talk_page,
+    save_conference_talks,
+)
+from response_cache import cache_mode, shared_cache
+from talk_io import TALKS_PATH, TalkWriter, is_jsonl
+
+"""
+asyncio crawler for the general conference archive.
+
+One pooled aiohttp session is shared by every request (keep-alive, bounded
+connections per host) and a token bucket per host caps the request rate.
+Conference pages are discovered concurrently and every talk URL is queued for
+fetching as soon as its conference page has been parsed, so talk downloads
+start while discovery is still running.
+
+Run from the repository root:
+    python retreive_data/async_crawler.py --per-host 8 --rate 10
+"""
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+MAIN_URL = "https://www.churchofjesuschrist.org/study/general-conference?lang=eng"
+HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; conference-crawler/1.0)"}
+
+DEFAULT_PER_HOST = 8        # simultaneous connections per host
+DEFAULT_RATE = 10.0         # requests per second per host
+DEFAULT_RETRIES = 4
+DEFAULT_TIMEOUT = 30
+
+# ---------------------------------------------------------------------------
+# Networking helpers
+# ---------------------------------------------------------------------------
+class TokenBucket:
+    """Allows *rate* acquisitions per second with bursts of up to *capacity*."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncFetcher:
+    """Pooled aiohttp client with per-host connection and rate limits."""
+
+    def __init__(
+        self,
+        per_host: int = DEFAULT_PER_HOST,
+        rate: float = DEFAULT_RATE,
+        retries: int = DEFAULT_RETRIES,
+        timeout: float = DEFAULT_TIMEOUT,
+        backoff: float = 2.0,
+    ):
+        self.per_host = per_host
+        self.rate = rate
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Same HTTP_CACHE modes as the requests-based scrapers (see response_cache.py)
+        self.cache_mode = cache_mode()
+        self.cache = shared_cache() if self.cache_mode != "off" else None
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.per_host)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.session.close()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate)
+        return self._buckets[host]
+
+    async def get_text(self, url: str) -> Optional[str]:
+        """GET *url* and return the body, or None after exhausting retries."""
+        if self.cache_mode in ("cache", "replay"):
+            entry = self.cache.lookup(url)
+            if entry is not None and entry["status"] < 400:
+                return entry["body"].decode(entry.get("encoding") or "utf-8", errors="replace")
+            if entry is not None or self.cache_mode == "replay":
+                print(f"Error fetching {url}: not available from the response cache")
+                return None
+
+        for attempt in range(1, self.retries + 1):
+            await self._bucket(url).acquire()
+            try:
+                async with self.session.get(url, allow_redirects=True) as r:
+                    if r.status >= 500 or r.status == 429:
+                        raise aiohttp.ClientResponseError(r.request_info, r.history, status=r.status)
+                    body = await r.read()
+                    if self.cache is not None:
+                        self.cache.store(url, r.status, r.headers, body, r.charset)
+                    r.raise_for_status()
+                    return body.decode(r.charset or "utf-8", errors="replace")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = getattr(e, "status", None)
+                if attempt == self.retries or (status is not None and status < 500 and status != 429):
+                    print(f"Error fetching {url}: {e}")
+                    return None
+                await asyncio.sleep(self.backoff * attempt)
+        return None
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+async def _soup(fetcher: AsyncFetcher, url: str) -> Optional[BeautifulSoup]:
+    html = await fetcher.get_text(url)
+    if html is None:
+        return None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, make_soup, html)
+
+
+async def _parse_talk(url: str, html: str) -> dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, parse_talk_page, url, html)
+
+
+async def crawl_conference_talks(
+    main_url: str = MAIN_URL,
+    per_host: int = DEFAULT_PER_HOST,
+    rate: float = DEFAULT_RATE,
+    talk_workers: Optional[int] = None,
+    sink: Optional[Callable[[dict], None]] = None,
+) -> List[dict]:
+    """Discover every conference and talk under *main_url* and scrape the talks.
+
+    Talks are passed to *sink* as they are parsed; without a sink they are
+    collected and returned. Discovered links are resolved against the host of
+    *main_url*. A talk that fails to fetch, parse or reach the sink is reported
+    and skipped; it never stops the worker.
+    """
+    talk_workers = talk_workers or per_host * 2
+    queue: asyncio.Queue = asyncio.Queue(maxsize=talk_workers * 4)
+    seen: set[str] = set()
+    results: List[dict] = []
+    sink = sink or results.append
+    base = link_base(main_url)
+    progress = tqdm(desc="Scraping talks", unit="talk")
+
+    async with AsyncFetcher(per_host=per_host, rate=rate) as fetcher:
+
+        async def discover_conference(conference_url: str) -> None:
+            soup = await _soup(fetcher, conference_url)
+            if soup is None:
+                return
+            for talk_url in extract_talk_links(soup, base):
+                if talk_url not in seen:
+                    seen.add(talk_url)
+                    progress.total = len(seen)
+                    await queue.put(talk_url)
+
+        async def discover_decade(decade_url: str) -> None:
+            soup = await _soup(fetcher, decade_url)
+            if soup is None:
+                return
+            await asyncio.gather(*(discover_conference(u) for u in extract_year_links(soup, base)))
+
+        async def discover() -> None:
+            soup = await _soup(fetcher, main_url)
+            if soup is None:
+                print(f"Failed to fetch content from {main_url}")
+                return
+            jobs = [
+                discover_decade(link) if is_decade_page(link) else discover_conference(link)
+                for link in extract_conference_links(soup, base)
+            ]
+            await asyncio.gather(*jobs)
+
+        async def talk_worker() -> None:
+            while True:
+                url = await queue.get()
+                try:
+                    if url is None:
+                        return
+                    try:
+                        html = await fetcher.get_text(url)
+                        if html is not None:
+                            talk = await _parse_talk(url, html)
+                            if talk:
+                                sink(talk)
+                    except Exception as e:
+                        # A dead worker would leave discover() blocked on a full queue
+                        print(f"Error scraping talk {url}: {e}")
+                    progress.update(1)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(talk_worker()) for _ in range(talk_workers)]
+        try:
+            await discover()
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            progress.close()
+
+    print(f"Total talks found: {len(seen)}")
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Crawl general conference talks with asyncio")
+    ap.add_argument("--url", default=MAIN_URL, help="Conference overview page")
+    ap.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST, help="Max simultaneous connections per host")
+    ap.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max requests per second per host")
+    ap.add_argument("--workers", type=int, default=None, help="Talk fetch workers (default: 2 x per-host)")
+    ap.add_argument("--out", default=str(TALKS_PATH), help="Output file: .jsonl[.gz|.zst] streams records, .json writes one array")
+    args = ap.parse_args()
+
+    if not is_jsonl(args.out):
+        talks = asyncio.run(crawl_conference_talks(args.url, args.per_host, args.rate, args.workers))
+        save_conference_talks(talks, args.out)
+        return
+
+    with TalkWriter(args.out) as writer:
+        asyncio.run(crawl_conference_talks(args.url, args.per_host, args.rate, args.workers, sink=writer.write))
+
+
+if __name__ == "__main__":
+    start = time.time()
+    main()
+    end = time.time()
+    print(f"Total time taken: {end - start} seconds")
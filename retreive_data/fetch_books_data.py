@@ -1,7 +1,12 @@
 import requests
+import argparse
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limit import RateLimiter
+from response_cache import cached_session
 
 # Correct base URL from the Open Scripture API documentation
 BASE_URL = "https://openscriptureapi.org/api/scriptures/v1/lds/en"
@@ -10,6 +15,15 @@ BASE_URL = "https://openscriptureapi.org/api/scriptures/v1/lds/en"
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Concurrent mode defaults (see main_concurrent)
+DEFAULT_WORKERS = 8       # chapters in flight at once
+DEFAULT_RATE = 10.0       # requests per second across all workers
+PROBE_WINDOW = 8          # chapters requested per book per round while its length is unknown
+
+# Shared keep-alive session; HTTP_CACHE=record/cache/replay routes it through the response cache.
+# The pool is sized so every concurrent worker can keep its own connection open.
+SESSION = cached_session(pool_maxsize=32)
+
 # Volumes to fetch
 VOLUMES = [
     "bookofmormon",
@@ -23,7 +37,7 @@ def fetch_volume_data(volume_id):
     """Fetch all metadata for a given volume from the Open Scripture API."""
     url = f"{BASE_URL}/volume/{volume_id}"
     try:
-        response = requests.get(url)
+        response = SESSION.get(url)
         response.raise_for_status()
         data = response.json()
         return data
@@ -34,13 +48,14 @@ def fetch_volume_data(volume_id):
 def fetch_chapter(volume_id, book_id, chapter_id):
     """Fetch a specific chapter for a book in a volume."""
     url = f"{BASE_URL}/volume/{volume_id}/{book_id}/{chapter_id}"
+    response = None
     try:
-        response = requests.get(url)
+        response = SESSION.get(url)
         response.raise_for_status()
         data = response.json()
         return data
     except requests.exceptions.RequestException as e:
-        if response.status_code == 404:
+        if response is not None and response.status_code == 404:
             # 404 indicates the chapter doesn't exist, which we'll use to stop iterating
             return None
         print(f"Error fetching chapter {chapter_id} for {volume_id}/{book_id}: {e}")
@@ -91,5 +106,123 @@ def main():
                 chapter_id += 1
                 time.sleep(0.1)  # Avoid hitting rate limits
 
+def chapter_path(volume_id, book_id, chapter_id):
+    return os.path.join(DATA_DIR, volume_id, book_id, f"{book_id}_{chapter_id}.json")
+
+def load_local_chapter(volume_id, book_id, chapter_id):
+    """Return the saved chapter if its file exists and holds a complete chapter, else None."""
+    path = chapter_path(volume_id, book_id, chapter_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    chapter = data.get("chapter") if isinstance(data, dict) else None
+    if not isinstance(chapter, dict) or not chapter.get("verses"):
+        return None
+    return data
+
+def is_last_chapter(book_id, chapter_id, chapter_data):
+    """The API links chapters into one list; a book ends where nextChapterId leaves it."""
+    return chapter_data.get("nextChapterId") != f"{book_id}{chapter_id + 1}"
+
+def local_chapter_count(volume_id, book_id):
+    """Chapter count known from the local files' nextChapterId chain, or None if the chain is incomplete."""
+    chapter_id = 1
+    while True:
+        chapter_data = load_local_chapter(volume_id, book_id, chapter_id)
+        if chapter_data is None:
+            return None
+        if is_last_chapter(book_id, chapter_id, chapter_data):
+            return chapter_id
+        chapter_id += 1
+
+def main_concurrent(workers=DEFAULT_WORKERS, rate=DEFAULT_RATE):
+    """Fetch every chapter with a bounded thread pool, skipping chapters already saved.
+
+    Books whose local files already describe their full length only fetch the
+    chapters that are missing or unreadable. For the rest, each round requests
+    the next PROBE_WINDOW chapters of every unfinished book at once and stops a
+    book at the first chapter whose nextChapterId points outside it (or at a 404).
+    """
+    limiter = RateLimiter(rate)
+
+    def fetch(job):
+        volume_id, book_id, chapter_id = job
+        chapter_data = load_local_chapter(volume_id, book_id, chapter_id)
+        if chapter_data is not None:
+            return chapter_data, False
+        limiter.wait()
+        chapter_data = fetch_chapter(volume_id, book_id, str(chapter_id))
+        if chapter_data:
+            save_data(chapter_path(volume_id, book_id, chapter_id), chapter_data)
+        return chapter_data, True
+
+    known = []    # (volume_id, book_id, chapter_count)
+    unknown = []  # (volume_id, book_id)
+    for volume_id in VOLUMES:
+        volume_dir = os.path.join(DATA_DIR, volume_id)
+        os.makedirs(volume_dir, exist_ok=True)
+
+        print(f"Fetching metadata for {volume_id}...")
+        volume_data = fetch_volume_data(volume_id)
+        if not volume_data:
+            print(f"Failed to fetch metadata for {volume_id}. Skipping.")
+            continue
+        save_data(os.path.join(volume_dir, f"{volume_id}_data.json"), volume_data)
+
+        for book in volume_data.get("books", []):
+            book_id = book["_id"]
+            os.makedirs(os.path.join(volume_dir, book_id), exist_ok=True)
+            count = local_chapter_count(volume_id, book_id)
+            if count is None:
+                unknown.append((volume_id, book_id))
+            else:
+                known.append((volume_id, book_id, count))
+
+    fetched = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Books with a known length: only missing chapters hit the network.
+        jobs = [
+            (volume_id, book_id, chapter_id)
+            for volume_id, book_id, count in known
+            for chapter_id in range(1, count + 1)
+            if load_local_chapter(volume_id, book_id, chapter_id) is None
+        ]
+        print(f"{len(known)} books complete on disk except {len(jobs)} chapters; {len(unknown)} books to discover.")
+        for _chapter_data, from_network in executor.map(fetch, jobs):
+            fetched += from_network
+
+        # Books of unknown length: speculative windows, all books in parallel.
+        start = {book: 1 for book in unknown}
+        while start:
+            jobs = [
+                (volume_id, book_id, chapter_id)
+                for (volume_id, book_id), first in start.items()
+                for chapter_id in range(first, first + PROBE_WINDOW)
+            ]
+            results = dict(zip(jobs, executor.map(fetch, jobs)))
+            fetched += sum(from_network for _chapter_data, from_network in results.values())
+            for (volume_id, book_id), first in list(start.items()):
+                for chapter_id in range(first, first + PROBE_WINDOW):
+                    chapter_data, _from_network = results[(volume_id, book_id, chapter_id)]
+                    if not chapter_data or is_last_chapter(book_id, chapter_id, chapter_data):
+                        del start[(volume_id, book_id)]
+                        break
+                else:
+                    start[(volume_id, book_id)] = first + PROBE_WINDOW
+
+    print(f"Fetched {fetched} chapter requests from the API.")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download the standard works from the Open Scripture API")
+    parser.add_argument("--workers", type=int, default=0,
+                        help=f"Fetch chapters concurrently with this many threads (e.g. {DEFAULT_WORKERS}); 0 keeps the sequential crawl")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max requests per second in concurrent mode")
+    args = parser.parse_args()
+    if args.workers > 0:
+        main_concurrent(args.workers, args.rate)
+    else:
+        main()
\ No newline at end of file
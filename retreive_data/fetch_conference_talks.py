@@ -5,11 +5,30 @@ import re
 import unicodedata
 import time
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import queue
+import threading
 import base64
 import json
 from urllib.parse import urlparse, parse_qs
 import os
+import argparse
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+from fetch_manifest import FetchManifest, BatchCheckpoint, MANIFEST_PATH, CHECKPOINT_DIR
+from talk_io import TalkWriter, TALKS_PATH, is_jsonl
+from response_cache import cached_session
+import scripture_refs
+
+BASE_URL = "https://www.churchofjesuschrist.org"
+MAIN_URL = BASE_URL + "/study/general-conference?lang=eng"
+
+# Shared keep-alive session; HTTP_CACHE=record/cache/replay routes it through the response cache
+SESSION = cached_session()
 
 """
 This is modified/adapted from the following Source. I found that there were a few things not working, and I also added one.
@@ -21,13 +40,20 @@ https://www.reddit.com/r/latterdaysaints/comments/1f8lbpj/i_built_a_script_to_sc
 https://github.com/johnmwood/LDS-Conference-Scraper
 """
 
+def make_soup(markup):
+    """BeautifulSoup using lxml when available (far faster than html5lib), else html.parser."""
+    try:
+        return BeautifulSoup(markup, "lxml")
+    except FeatureNotFound:
+        return BeautifulSoup(markup, "html.parser")
+
 def get_soup_overview(url):
     """Create a tree structure (BeautifulSoup) out of a GET request's HTML."""
     try:
-        r = requests.get(url, allow_redirects=True)
+        r = SESSION.get(url, allow_redirects=True)
         r.raise_for_status()
         # print(f"Successfully fetched overview page: {r.url}")
-        return BeautifulSoup(r.content, "html5lib")
+        return make_soup(r.content)
     except requests.RequestException as e:
         print(f"Error fetching overview page {url}: {e}")
         return None
@@ -36,6 +62,39 @@ def is_decade_page(url):
     """Check if a page is a decade selection page based on URL pattern."""
     return bool(re.search(r"/study/general-conference/\d{4}\d{4}", url))
 
+def link_base(url):
+    """scheme://host of *url*; relative links found on that page are resolved against it."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+def extract_conference_links(soup, base=BASE_URL):
+    """Conference (year/month) and decade-page links on the conference overview page."""
+    return [
+        base + a["href"]
+        for a in soup.find_all("a", href=True)
+        if re.search(r"/study/general-conference/(\d{4}/(04|10)|\d{4}\d{4})", a["href"])
+    ]
+
+def extract_year_links(decade_soup, base=BASE_URL):
+    """Year/month conference links listed on a decade selection page."""
+    return [
+        base + a["href"]
+        for a in decade_soup.find_all("a", href=True)
+        if re.search(r"/study/general-conference/\d{4}/(04|10)", a["href"])
+    ]
+
+def extract_talk_links(soup, base=BASE_URL):
+    """De-duplicated talk links (year/month/talk-title) on a conference page."""
+    # The regex ensures that only links ending with a talk title after the month are returned
+    talk_links = [
+        base + a["href"]
+        for a in soup.find_all("a", href=True)
+        if re.search(r"/study/general-conference/\d{4}/(04|10)/[^/]+$", a["href"])
+    ]
+
+    # Remove duplicate links
+    return list(set(talk_links))
+
 def scrape_conference_pages(main_page_url):
     """
     Retrieve a list of URLs for each conference (year/month) from the main page.
@@ -49,23 +108,15 @@ def scrape_conference_pages(main_page_url):
     all_conference_links = []
 
     # Find all the links that match the conference year/month or decade patterns
-    links = [
-        "https://www.churchofjesuschrist.org" + a["href"]
-        for a in soup.find_all("a", href=True)
-        if re.search(r"/study/general-conference/(\d{4}/(04|10)|\d{4}\d{4})", a["href"])
-    ]
+    base = link_base(main_page_url)
+    links = extract_conference_links(soup, base)
 
     for link in links:
         if is_decade_page(link):
             # If it's a decade page, scrape the individual year/month links from that page
             decade_soup = get_soup_overview(link)
             if decade_soup:
-                year_links = [
-                    "https://www.churchofjesuschrist.org" + a["href"]
-                    for a in decade_soup.find_all("a", href=True)
-                    if re.search(r"/study/general-conference/\d{4}/(04|10)", a["href"])
-                ]
-                all_conference_links.extend(year_links)
+                all_conference_links.extend(extract_year_links(decade_soup, base))
         else:
             # If it's a direct conference link, add it to the list
             all_conference_links.append(link)
@@ -80,16 +131,7 @@ def scrape_talk_urls(conference_url):
     if soup is None:
         return []
 
-    # Find links that match the talk pattern (year/month/talk-title)
-    # The regex ensures that only links ending with a talk title after the month are returned
-    talk_links = [
-        "https://www.churchofjesuschrist.org" + a["href"]
-        for a in soup.find_all("a", href=True)
-        if re.search(r"/study/general-conference/\d{4}/(04|10)/[^/]+$", a["href"])
-    ]
-
-    # Remove duplicate links
-    talk_links = list(set(talk_links))
+    talk_links = extract_talk_links(soup, link_base(conference_url))
 
     # print(f"Found {len(talk_links)} talk links in {conference_url}") 
     # if talk_links:
@@ -97,146 +139,62 @@ def scrape_talk_urls(conference_url):
     return talk_links
 
 
-def get_html_and_initial_state(url):
+INITIAL_STATE_RE = re.compile(r'window\.__INITIAL_STATE__\s*=\s*"(.*?)"\s*;', re.DOTALL)
+INITIAL_STATE_BYTES_RE = re.compile(rb'window\.__INITIAL_STATE__\s*=\s*"(.*?)"\s*;', re.DOTALL)
+
+def decode_initial_state(encoded_state):
+    """Base64 -> JSON; json.loads reads the decoded UTF-8 bytes directly."""
+    return json.loads(base64.b64decode(encoded_state))
+
+def extract_initial_state(html_text, url):
     """
-    Fetches HTML content from a URL and extracts __INITIAL_STATE__ data.
+    Extracts and decodes the __INITIAL_STATE__ data embedded in a talk page's HTML.
     The __INITIAL_STATE__ often contains dynamic data like footnotes.
     """
-    try:
-        r = requests.get(url, allow_redirects=True)
-        r.raise_for_status()
-        # print(f"Successfully fetched talk page: {r.url}") 
-
-        html_text = r.text
-        initial_state_data = None
-
-        # Attempt to extract __INITIAL_STATE__ using regex first (more direct)
-        # This regex looks for the variable assignment window.__INITIAL_STATE__ = "..." ;
-        match = re.search(r'window\.__INITIAL_STATE__\s*=\s*"(.*?)"\s*;', html_text, re.DOTALL)
+    initial_state_data = None
 
-        if match:
-            encoded_state = match.group(1) # Capture the content within the quotes
-            try:
-                decoded_state_bytes = base64.b64decode(encoded_state)
-                decoded_state_str = decoded_state_bytes.decode('utf-8')
-                initial_state_data = json.loads(decoded_state_str)
-                # print("Successfully parsed initial state JSON using regex.") 
-            except (base64.errors.B64DecodeError, json.JSONDecodeError, Exception) as e:
-                print(f"Error processing __INITIAL_STATE__ content with regex for {url}: {e}")
-        else:
-            # Fallback to BeautifulSoup if regex fails (less reliable but a fallback)
-            try:
-                # Create a BeautifulSoup object just for finding the script tag by ID
-                temp_soup = BeautifulSoup(html_text, "html.parser") # Use html.parser as a fallback parser
-                initial_state_script = temp_soup.find('script', id='__INITIAL_STATE__')
-
-                if initial_state_script and initial_state_script.string:
-                    # print(f"Found __INITIAL_STATE__ script tag using BeautifulSoup fallback for {url}.") 
-                    encoded_state = initial_state_script.string.strip()
-                    # Remove trailing semicolon if present
-                    if encoded_state.endswith(';'):
-                        encoded_state = encoded_state[:-1]
-                    decoded_state_bytes = base64.b64decode(encoded_state)
-                    decoded_state_str = decoded_state_bytes.decode('utf-8')
-                    initial_state_data = json.loads(decoded_state_str)
-                    # print("Successfully parsed initial state JSON using BeautifulSoup fallback.") 
-                # else:
-                    # print(f"Could not find __INITIAL_STATE__ script tag using BeautifulSoup fallback or it was empty for {url}.") 
-
-            except Exception as e:
-                 print(f"Error with BeautifulSoup fallback for {url}: {e}")
+    # Attempt to extract __INITIAL_STATE__ using regex first (more direct)
+    # This regex looks for the variable assignment window.__INITIAL_STATE__ = "..." ;
+    match = INITIAL_STATE_RE.search(html_text)
 
+    if match:
+        encoded_state = match.group(1) # Capture the content within the quotes
+        try:
+            initial_state_data = decode_initial_state(encoded_state)
+            # print("Successfully parsed initial state JSON using regex.") 
+        except (base64.errors.B64DecodeError, json.JSONDecodeError, Exception) as e:
+            print(f"Error processing __INITIAL_STATE__ content with regex for {url}: {e}")
+    else:
+        # Fallback to BeautifulSoup if regex fails (less reliable but a fallback)
+        try:
+            # Create a BeautifulSoup object just for finding the script tag by ID
+            temp_soup = BeautifulSoup(html_text, "html.parser") # Use html.parser as a fallback parser
+            initial_state_script = temp_soup.find('script', id='__INITIAL_STATE__')
+
+            if initial_state_script and initial_state_script.string:
+                # print(f"Found __INITIAL_STATE__ script tag using BeautifulSoup fallback for {url}.") 
+                encoded_state = initial_state_script.string.strip()
+                # Remove trailing semicolon if present
+                if encoded_state.endswith(';'):
+                    encoded_state = encoded_state[:-1]
+                initial_state_data = decode_initial_state(encoded_state)
+                # print("Successfully parsed initial state JSON using BeautifulSoup fallback.") 
+            # else:
+                # print(f"Could not find __INITIAL_STATE__ script tag using BeautifulSoup fallback or it was empty for {url}.") 
 
-        return html_text, initial_state_data # Return both raw html and parsed state data
+        except Exception as e:
+             print(f"Error with BeautifulSoup fallback for {url}: {e}")
 
-    except requests.RequestException as e:
-        print(f"Error fetching talk page {url}: {e}")
-        return None, None # Return None for both if initial fetch fails
+    return initial_state_data
 
 def parse_scripture_uri(uri):
     """
     Parses a scripture URI like /study/scriptures/bofm/mosiah/3?lang=eng&id=p19#p19
     into 'Book Chapter:Verse' format.
     """
-    if not uri or '/study/scriptures/' not in uri:
-        return None # Not a scripture URI
-
+    # Book slugs and the URI grammar live in scripture_refs (shared with scrape_tg_and_bd)
     try:
-        # Remove the /study/ prefix
-        path = uri.replace('/study/scriptures/', '')
-
-        # Split by ? or # to get the core path and parameters/fragment
-        parts = re.split(r'[?#]', path)
-        core_path = parts[0] # e.g., bofm/mosiah/3
-
-        # Split the core path into book and chapter
-        path_segments = core_path.split('/')
-        if len(path_segments) < 2:
-            # Handle cases like just /study/scriptures/bofm (if they exist)
-            if len(path_segments) == 1 and path_segments[0]:
-                 book_short = path_segments[0]
-                 chapter = None
-            else:
-                return None # Not in expected book/chapter format
-
-        else:
-            book_short = path_segments[-2] # e.g., mosiah
-            chapter = path_segments[-1] # e.g., 3
-
-
-        # Attempt to get the verse/paragraph ID from the query parameters or fragment
-        verse = None
-        if len(parts) > 1:
-            params_fragment = parts[1]
-            # Check for id=p# pattern in query string
-            query_match = re.search(r'id=p(\d+)', params_fragment)
-            if query_match:
-                verse = query_match.group(1)
-            else:
-                # Check for p# pattern in fragment (after #)
-                fragment_match = re.search(r'p(\d+)', params_fragment)
-                if fragment_match:
-                    verse = fragment_match.group(1)
-
-        # Mapping of short book codes to full names
-        book_map = {
-            'bofm': 'Book of Mormon',
-            'ot': 'Old Testament',
-            'nt': 'New Testament',
-            'dc-testament': 'Doctrine and Covenants',
-            'pgp': 'Pearl of Great Price',
-            'gen': 'Genesis', 'ex': 'Exodus', 'lev': 'Leviticus', 'num': 'Numbers', 'deut': 'Deuteronomy',
-            'josh': 'Joshua', 'judg': 'Judges', 'ruth': 'Ruth', '1-sam': '1 Samuel', '2-sam': '2 Samuel',
-            '1-kgs': '1 Kings', '2-kgs': '2 Kings', '1-chr': '1 Chronicles', '2-chr': '2 Chronicles',
-            'ezra': 'Ezra', 'neh': 'Nehemiah', 'esth': 'Esther', 'job': 'Job', 'ps': 'Psalms',
-            'prov': 'Proverbs', 'eccl': 'Ecclesiastes', 'song': 'Song of Solomon', 'isa': 'Isaiah',
-            'jer': 'Jeremiah', 'lam': 'Lamentations', 'ezek': 'Ezekiel', 'dan': 'Daniel', 'hosea': 'Hosea',
-            'joel': 'Joel', 'amos': 'Amos', 'obad': 'Obadiah', 'jonah': 'Jonah', 'micah': 'Micah',
-            'nahum': 'Nahum', 'hab': 'Habakkuk', 'zeph': 'Zephaniah', 'hag': 'Haggai', 'zech': 'Zechariah',
-            'mal': 'Malachi',
-            'matt': 'Matthew', 'mark': 'Mark', 'luke': 'Luke', 'john': 'John', 'acts': 'Acts', 'rom': 'Romans',
-            '1-cor': '1 Corinthians', '2-cor': '2 Corinthians', 'gal': 'Galatians', 'eph': 'Ephesians',
-            'philip': 'Philippians', 'col': 'Colossians', '1-thes': '1 Thessalonians', '2-thes': '2 Thessalonians',
-            '1-tim': '1 Timothy', '2-tim': '2 Timothy', 'titus': 'Titus', 'philem': 'Philemon', 'heb': 'Hebrews',
-            'james': 'James', '1-pet': '1 Peter', '2-pet': '2 Peter', '1-jn': '1 John', '2-jn': '2 John',
-            '3-jn': '3 John', 'jude': 'Jude', 'rev': 'Revelation',
-            '1-ne': '1 Nephi', '2-ne': '2 Nephi', 'jacob': 'Jacob', 'enos': 'Enos', 'jarom': 'Jarom',
-            'omni': 'Omni', 'w-of-m': 'Words of Mormon', 'mosiah': 'Mosiah', 'alma': 'Alma', 'hel': 'Helaman',
-            '3-ne': '3 Nephi', '4-ne': '4 Nephi', 'morm': 'Mormon', 'ether': 'Ether', 'moro': 'Moroni',
-            'dc': 'Doctrine and Covenants', 'js-h': 'Joseph Smith—History', 'js-m': 'Joseph Smith—Matthew',
-            'a-of-f': 'Articles of Faith', 'abr': 'Abraham', 'fac': 'Facsimile'
-        }
-        book_full = book_map.get(book_short, book_short) # Use full name if found, otherwise use short
-
-        if chapter and verse:
-            return f"{book_full} {chapter}:{verse}"
-        elif chapter:
-            return f"{book_full} {chapter}" # Return just book and chapter if no verse found
-        elif book_full:
-            return book_full # Return just the book if no chapter/verse
-        else:
-            return None # Still not in a recognized format
-
+        return scripture_refs.uri_label(uri)
     except Exception as e:
         print(f"Error parsing URI {uri}: {e}")
         return None # Return None if parsing fails
@@ -250,11 +208,96 @@ def scrape_talk_data(url):
     list of all footnotes in the main talk data.
     """
     try:
-        html_content, initial_state_data = get_html_and_initial_state(url)
+        r = SESSION.get(url, allow_redirects=True)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Error fetching talk page {url}: {e}")
+        return {}
+
+    return parse_talk_page(url, r.text)
+
+def build_footnote_lookup(url, initial_state_data):
+    """
+    Maps footnote IDs (the data-scroll-id of note-ref markers) to their number and
+    parsed scripture references, using the talk's decoded __INITIAL_STATE__.
+    """
+    footnote_lookup = {} # Dictionary for quick lookup by footnote_id
 
-        if html_content is None:
-            return {}
+    if initial_state_data:
+        try:
+            parsed_url = urlparse(url)
+
+            # Extract language code from query parameters
+            query_params = parse_qs(parsed_url.query)
+            language_code = query_params.get('lang', ['eng'])[0]  # default 'eng'
+
+            # Construct the talk_uri_key used in the initial state JSON structure
+            # The path in contentStore is /lang_code/path/after/study
+            path_after_study = parsed_url.path.replace('/study', '')
+            # Ensure we don't double-prepend the language code if it's already there
+            if path_after_study.startswith(f'/{language_code}'):
+                talk_uri_key = path_after_study
+            else:
+                talk_uri_key = f'/{language_code}{path_after_study}'
+
+            # Navigate the JSON structure to find the footnotes data
+            footnotes_data_from_state = (
+                initial_state_data
+                .get('reader', {})
+                .get('contentStore', {})
+                .get(talk_uri_key, {})
+                .get('content', {})
+                .get('footnotes', {})
+            )
+
+            # Build the lookup dictionary from the extracted data
+            for note_id, note_details in footnotes_data_from_state.items():
+                # Ensure note_details is a dictionary before accessing its items
+                if isinstance(note_details, dict):
+                    # Extract the dynamic URIs from the 'referenceUris' list within note_details
+                    dynamic_uris = [
+                        ref.get('href')
+                        for ref in note_details.get('referenceUris', [])
+                        if isinstance(ref, dict) and ref.get('href')
+                    ]
+
+                    # Parse dynamic URIs to get scripture references
+                    parsed_references = [parse_scripture_uri(uri) for uri in dynamic_uris]
+                    # Filter out any None results if parsing failed or it wasn't a scripture URI
+                    parsed_references = [ref for ref in parsed_references if ref]
+
+                    # Store only the necessary details in the lookup
+                    footnote_lookup[note_id] = {
+                        'footnote_id': note_id,  # Keep ID for reference
+                        'footnote_number': note_details.get('marker', '').rstrip('.'),  # e.g., '1'
+                        'parsed_scripture_references': parsed_references,  # e.g., ['Mosiah 3:19']
+                    }
+
+        except Exception as e:
+            print(f'Error processing footnotes from initial state for {url}: {e}')
+    # else:
+        # print(f'Initial state data not available to extract footnotes for {url}. No footnotes will be linked.')
+    return footnote_lookup
 
+def parse_talk_page(url, html_content, initial_state_data=None):
+    """
+    Builds the talk record for an already-fetched talk page (see scrape_talk_data).
+    Shared by the threaded scraper and the asyncio crawler.
+    Uses the single-parse lxml extractor when lxml is installed; pass initial_state_data
+    only if it has already been decoded.
+    """
+    if lxml_html is not None:
+        return parse_talk_page_lxml(url, html_content, initial_state_data)
+    if initial_state_data is None:
+        initial_state_data = extract_initial_state(html_content, url)
+    return parse_talk_page_bs4(url, html_content, initial_state_data)
+
+def parse_talk_page_bs4(url, html_content, initial_state_data):
+    """
+    BeautifulSoup implementation of parse_talk_page (the original extractor).
+    Kept as the fallback when lxml is unavailable and as the benchmark baseline.
+    """
+    try:
         # Create BeautifulSoup object for parsing the main content HTML
         try:
             # Try different parsers for the main content
@@ -271,62 +314,7 @@ def scrape_talk_data(url):
 
 
         # This ensures the footnote data is available when processing paragraphs
-        footnote_lookup = {} # Dictionary for quick lookup by footnote_id
-
-        if initial_state_data:
-            try:
-                parsed_url = urlparse(url)
-
-                # Extract language code from query parameters
-                query_params = parse_qs(parsed_url.query)
-                language_code = query_params.get('lang', ['eng'])[0]  # default 'eng'
-
-                # Construct the talk_uri_key used in the initial state JSON structure
-                # The path in contentStore is /lang_code/path/after/study
-                path_after_study = parsed_url.path.replace('/study', '')
-                # Ensure we don't double-prepend the language code if it's already there
-                if path_after_study.startswith(f'/{language_code}'):
-                    talk_uri_key = path_after_study
-                else:
-                    talk_uri_key = f'/{language_code}{path_after_study}'
-
-                # Navigate the JSON structure to find the footnotes data
-                footnotes_data_from_state = (
-                    initial_state_data
-                    .get('reader', {})
-                    .get('contentStore', {})
-                    .get(talk_uri_key, {})
-                    .get('content', {})
-                    .get('footnotes', {})
-                )
-
-                # Build the lookup dictionary from the extracted data
-                for note_id, note_details in footnotes_data_from_state.items():
-                    # Ensure note_details is a dictionary before accessing its items
-                    if isinstance(note_details, dict):
-                        # Extract the dynamic URIs from the 'referenceUris' list within note_details
-                        dynamic_uris = [
-                            ref.get('href')
-                            for ref in note_details.get('referenceUris', [])
-                            if isinstance(ref, dict) and ref.get('href')
-                        ]
-
-                        # Parse dynamic URIs to get scripture references
-                        parsed_references = [parse_scripture_uri(uri) for uri in dynamic_uris]
-                        # Filter out any None results if parsing failed or it wasn't a scripture URI
-                        parsed_references = [ref for ref in parsed_references if ref]
-
-                        # Store only the necessary details in the lookup
-                        footnote_lookup[note_id] = {
-                            'footnote_id': note_id,  # Keep ID for reference
-                            'footnote_number': note_details.get('marker', '').rstrip('.'),  # e.g., '1'
-                            'parsed_scripture_references': parsed_references,  # e.g., ['Mosiah 3:19']
-                        }
-
-            except Exception as e:
-                print(f'Error processing footnotes from initial state for {url}: {e}')
-        # else:
-            # print(f'Initial state data not available to extract footnotes for {url}. No footnotes will be linked.')
+        footnote_lookup = build_footnote_lookup(url, initial_state_data)
 
         # --- Extract Talk Metadata ---
         article_tag = soup.find('article', {'id': 'main'})
@@ -404,16 +392,215 @@ def scrape_talk_data(url):
         print(f'Failed to scrape {url}: {e}')
         return {}
 
+def _has_class(name):
+    """XPath predicate matching one token of the class attribute (like BeautifulSoup's class_=)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+TALK_XPATH = {
+    'article': "//article[@id='main']",
+    'state_script': "//script[@id='__INITIAL_STATE__']",
+    'title': ".//h1",
+    'header': ".//header",
+    'quote': f".//p[{_has_class('kicker')}]",
+    'conference': ".//div[contains(@class, 'catalogTitle')]",
+    'byline': f".//div[{_has_class('byline')}]",
+    'author': f".//p[{_has_class('author-name')}]",
+    'role': f".//p[{_has_class('author-role')}]",
+    'body': f".//div[{_has_class('body-block')}]",
+    'markers': f".//a[{_has_class('note-ref')}][@data-scroll-id]",
+}
+
+def _first(node, key):
+    found = node.xpath(TALK_XPATH[key]) if node is not None else []
+    return found[0] if found else None
+
+def _text(node, default):
+    return node.text_content().strip() if node is not None else default
+
+def parse_talk_page_lxml(url, html_content, initial_state_data=None):
+    """
+    Single-parse extractor: builds one lxml tree and reads metadata, paragraphs, footnote
+    markers and (if the regex misses it) the __INITIAL_STATE__ script from that tree.
+    Produces the same record as parse_talk_page_bs4.
+    """
+    try:
+        tree = lxml_html.fromstring(html_content)
+    except Exception as e:
+        print(f"Error parsing main content for {url}: {e}")
+        return {}
+
+    try:
+        if initial_state_data is None:
+            state_re = INITIAL_STATE_BYTES_RE if isinstance(html_content, bytes) else INITIAL_STATE_RE
+            match = state_re.search(html_content)
+            script = None if match else _first(tree, 'state_script')
+            try:
+                if match:
+                    initial_state_data = decode_initial_state(match.group(1))
+                elif script is not None and script.text:
+                    initial_state_data = decode_initial_state(script.text.strip().rstrip(';'))
+            except Exception as e:
+                print(f"Error processing __INITIAL_STATE__ content for {url}: {e}")
+
+        footnote_lookup = build_footnote_lookup(url, initial_state_data)
+
+        # --- Extract Talk Metadata ---
+        article_tag = _first(tree, 'article')
+        title = _text(_first(article_tag, 'title'), 'No Title Found')
+        header_div = _first(article_tag, 'header')
+
+        quote = 'No Quote Found'
+        conference = 'No Conference Found'
+        speaker = 'No Speaker Found'
+        calling = 'No Calling Found'
+
+        if header_div is not None:
+            quote = _text(_first(header_div, 'quote'), 'No Quote Found')
+            conference = _text(_first(header_div, 'conference'), 'No Conference Found')
+
+            byline_div = _first(header_div, 'byline')
+            if byline_div is not None:
+                speaker_raw = _text(_first(byline_div, 'author'), 'No Speaker Found')
+                speaker = speaker_raw[3:].strip() if speaker_raw.lower().startswith('by ') else speaker_raw
+                calling = _text(_first(byline_div, 'role'), 'No Calling Found')
+
+        content_array_div = _first(article_tag, 'body')
+        content_with_embedded_footnotes = []
+
+        if content_array_div is not None:
+            for idx, para in enumerate(content_array_div.iter('p'), start=1):
+                # Same as BeautifulSoup's get_text(strip=True): strip each text node, join with ''
+                paragraph_text = ''.join(t.strip() for t in para.xpath('.//text()'))
+                if not paragraph_text:
+                    continue
+
+                linked_footnotes_for_paragraph = [
+                    footnote_lookup[note_id]
+                    for note_id in (m.get('data-scroll-id') for m in para.xpath(TALK_XPATH['markers']))
+                    if note_id in footnote_lookup
+                ]
+
+                content_with_embedded_footnotes.append({
+                    'paragraph_number': idx,
+                    'paragraph': paragraph_text,
+                    'linked_footnotes': [dict(f) for f in linked_footnotes_for_paragraph],
+                })
+
+        year_match = re.search(r'/((?:19|20)\d{2})/', url)
+        year = year_match.group(1) if year_match else 'No Year Found'
+        season = 'April' if '/04/' in url else 'October'
+
+        return {
+            'title': title,
+            'speaker': speaker,
+            'calling': calling,
+            'year': year,
+            'season': season,
+            'url': url,
+            'content': content_with_embedded_footnotes,
+            'quote': quote,
+        }
+    except Exception as e:
+        print(f'Failed to scrape {url}: {e}')
+        return {}
+
 def scrape_talk_data_parallel(urls):
     """Scrapes all talks in parallel using ThreadPoolExecutor."""
     with ThreadPoolExecutor(max_workers=10) as executor:  # Adjust `max_workers` as needed
         results = list(tqdm(executor.map(scrape_talk_data, urls), total=len(urls), desc="Scraping talks in parallel"))
     return [result for result in results if result]  # Filter out empty results
 
-def main_scrape_process():
+def iter_scraped_talks(urls, max_workers=10):
+    """
+    Yields talk records as soon as they are scraped (in completion order).
+    At most 2 * max_workers talks are in flight, so memory does not grow with len(urls).
+    """
+    urls = iter(urls)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        for url in urls:
+            in_flight.add(executor.submit(scrape_talk_data, url))
+            if len(in_flight) >= 2 * max_workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in in_flight:
+            yield future.result()
+
+_thread_state = threading.local()
+
+def fetch_talk_bytes(url):
+    """I/O stage: download a talk page's raw bytes over a per-thread keep-alive session."""
+    session = getattr(_thread_state, "session", None)
+    if session is None:
+        session = _thread_state.session = cached_session()
+    try:
+        r = session.get(url, allow_redirects=True)
+        r.raise_for_status()
+        return r.content
+    except requests.RequestException as e:
+        print(f"Error fetching talk page {url}: {e}")
+        return None
+
+def iter_scraped_talks_multiprocess(urls, fetch_workers=16, parse_workers=None, queue_size=64):
+    """
+    Two-stage pipeline: fetch_workers threads only download raw bytes, and a ProcessPoolExecutor
+    runs parse_talk_page on every core. A bounded queue between the stages (and a cap of
+    2 * parse_workers parse jobs in flight) applies backpressure to the downloaders.
+    Yields talk records in completion order.
+    """
+    parse_workers = parse_workers or os.cpu_count() or 1
+    url_queue = queue.Queue()
+    for url in urls:
+        url_queue.put(url)
+    raw_queue = queue.Queue(maxsize=queue_size)
+
+    def fetcher():
+        while True:
+            try:
+                url = url_queue.get_nowait()
+            except queue.Empty:
+                return
+            body = fetch_talk_bytes(url)
+            if body is not None:
+                raw_queue.put((url, body))  # blocks while the parse stage is behind
+            else:
+                raw_queue.put((url, None))
+
+    def close_when_done(threads):
+        for t in threads:
+            t.join()
+        raw_queue.put(None)
+
+    threads = [threading.Thread(target=fetcher, daemon=True) for _ in range(fetch_workers)]
+    for t in threads:
+        t.start()
+    threading.Thread(target=close_when_done, args=(threads,), daemon=True).start()
+
+    max_in_flight = 2 * parse_workers
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        in_flight = set()
+        fetching = True
+        while fetching or in_flight:
+            while fetching and len(in_flight) < max_in_flight:
+                try:
+                    item = raw_queue.get(timeout=0.05 if in_flight else None)
+                except queue.Empty:
+                    break
+                if item is None:
+                    fetching = False
+                elif item[1] is None:
+                    yield {}  # failed download; keeps progress counts accurate
+                else:
+                    in_flight.add(pool.submit(parse_talk_page, *item))
+            if in_flight:
+                done, in_flight = wait(in_flight, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+def main_scrape_process(out_path=TALKS_PATH, parse_processes=None):
     """Main function to orchestrate the scraping process."""
-    main_url = "https://www.churchofjesuschrist.org/study/general-conference?lang=eng"
-    conference_urls = scrape_conference_pages(main_url)
+    conference_urls = scrape_conference_pages(MAIN_URL)
 
     all_talk_urls = []
     for conference_url in tqdm(conference_urls, desc="Scraping conferences"):
@@ -421,8 +608,108 @@ def main_scrape_process():
 
     print(f"Total talks found: {len(all_talk_urls)}")
 
-    conference_talks = scrape_talk_data_parallel(all_talk_urls)
+    if not is_jsonl(out_path):
+        # Legacy single JSON array (holds every talk in memory)
+        conference_talks = scrape_talk_data_parallel(all_talk_urls)
+        save_conference_talks(conference_talks, out_path)
+        return
+
+    # Stream each normalized talk to disk as soon as it is scraped
+    if parse_processes == 0:
+        talks = iter_scraped_talks(all_talk_urls)
+    else:
+        talks = iter_scraped_talks_multiprocess(all_talk_urls, parse_workers=parse_processes)
+    with TalkWriter(out_path) as writer:
+        for talk in tqdm(talks, total=len(all_talk_urls), desc="Scraping talks in parallel"):
+            writer.write(talk)
+
+def fetch_if_changed(url, manifest):
+    """
+    Conditional GET against the manifest's ETag/Last-Modified for *url*.
+    Returns the response, or None if the server (or the content hash) says it is unchanged.
+    """
+    r = SESSION.get(url, headers=manifest.conditional_headers(url), allow_redirects=True)
+    if r.status_code == 304:
+        return None
+    r.raise_for_status()
+    if manifest.is_unchanged(url, r.content):
+        return None
+    return r
+
+def scrape_talk_urls_incremental(conference_url, manifest):
+    """Like scrape_talk_urls, but reuses the talk list stored for unchanged conference pages."""
+    try:
+        r = fetch_if_changed(conference_url, manifest)
+    except requests.RequestException as e:
+        print(f"Error fetching overview page {conference_url}: {e}")
+        known = manifest.get(conference_url)
+        return known.get("links", []) if known else []
+
+    if r is None:
+        return manifest.get(conference_url).get("links", [])
+
+    talk_links = extract_talk_links(make_soup(r.content), link_base(conference_url))
+    manifest.record(manifest.make_entry(conference_url, r.headers, r.content, links=talk_links))
+    return talk_links
+
+def scrape_talk_data_incremental(url, manifest, checkpoint):
+    """Fetch a talk only if it changed; checkpoint the parsed record. Returns True if re-scraped."""
+    try:
+        r = fetch_if_changed(url, manifest)
+    except requests.RequestException as e:
+        print(f"Error fetching talk page {url}: {e}")
+        return False
+    if r is None:
+        return False
+
+    talk = parse_talk_page(url, r.text)
+    if not talk:
+        return False
+    checkpoint.add(talk, manifest.make_entry(url, r.headers, r.content))
+    return True
 
+def incremental_scrape_process(new_only=False, manifest_path=MANIFEST_PATH, checkpoint_dir=CHECKPOINT_DIR, out_path=TALKS_PATH):
+    """
+    Resumable version of main_scrape_process.
+    Talks are checkpointed in append-only batches as they are scraped, and the manifest lets later
+    runs send conditional GETs so only new conferences and changed talks are downloaded again.
+    With new_only=True, talks already in the manifest are not re-checked at all.
+    """
+    manifest = FetchManifest(manifest_path)
+    checkpoint = BatchCheckpoint(manifest, checkpoint_dir)
+
+    conference_urls = scrape_conference_pages(MAIN_URL)
+
+    all_talk_urls = []
+    for conference_url in tqdm(conference_urls, desc="Scraping conferences"):
+        all_talk_urls.extend(scrape_talk_urls_incremental(conference_url, manifest))
+    all_talk_urls = list(dict.fromkeys(all_talk_urls))
+
+    if new_only:
+        all_talk_urls = [url for url in all_talk_urls if url not in manifest]
+    print(f"Total talks to check: {len(all_talk_urls)}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            changed = list(tqdm(
+                executor.map(lambda url: scrape_talk_data_incremental(url, manifest, checkpoint), all_talk_urls),
+                total=len(all_talk_urls),
+                desc="Checking talks",
+            ))
+    finally:
+        # Whatever finished before an interruption is kept for the next run.
+        checkpoint.flush()
+    print(f"Talks new or changed: {sum(changed)}")
+
+    if is_jsonl(out_path):
+        with TalkWriter(out_path) as writer:
+            for talk in checkpoint.records():
+                writer.write(talk)
+    else:
+        save_conference_talks(list(checkpoint.records()), out_path)
+
+def save_conference_talks(conference_talks, path="conference_talks.json"):
+    """Normalize the scraped talk records and write them to *path*."""
     conference_df = pd.DataFrame(conference_talks)
 
     # Normalize Unicode and clean data
@@ -433,12 +720,22 @@ def main_scrape_process():
             conference_df[col] = conference_df[col].apply(lambda x: unicodedata.normalize("NFD", x) if isinstance(x, str) else x)
             conference_df[col] = conference_df[col].apply(lambda x: x.replace("\t", "") if isinstance(x, str) else x)
 
-    conference_df.to_json("conference_talks.json", orient="records", indent=4)
-    print("Data also saved to 'conference_talks.json'.")
+    conference_df.to_json(path, orient="records", indent=4)
+    print(f"Data also saved to '{path}'.")
 
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Scrape general conference talks")
+    ap.add_argument("--incremental", action="store_true", help="Resume/refresh using the fetch manifest and checkpoints")
+    ap.add_argument("--new-only", action="store_true", help="With --incremental, skip talks already in the manifest")
+    ap.add_argument("--out", default=str(TALKS_PATH), help="Output file: .jsonl[.gz|.zst] streams records, .json writes one array")
+    ap.add_argument("--processes", type=int, default=None, help="Parse processes for .jsonl output (default: all cores, 0: parse in the fetch threads)")
+    args = ap.parse_args()
+
     start = time.time()
-    main_scrape_process()
+    if args.incremental:
+        incremental_scrape_process(new_only=args.new_only, out_path=args.out)
+    else:
+        main_scrape_process(args.out, args.processes)
     end = time.time()
     print(f"Total time taken: {end - start} seconds")
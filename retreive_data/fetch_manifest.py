@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+"""
+Bookkeeping for incremental scrapes.
+
+``FetchManifest`` is an append-only JSONL log with one line per successful
+fetch (URL, ETag, Last-Modified, SHA-256 of the body, fetch time). The latest
+line for a URL wins, so a later run can send conditional GETs and skip
+anything that has not changed.
+
+``BatchCheckpoint`` appends scraped records to numbered JSONL batch files.
+Manifest lines are only written after the batch holding their record has been
+flushed to disk, so a crash never leaves a URL marked as fetched without its
+data.
+"""
+
+MANIFEST_PATH = Path("conference_manifest.jsonl")
+CHECKPOINT_DIR = Path("conference_checkpoints")
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class FetchManifest:
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as fp:
+                for line in fp:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from an interrupted run.
+                        continue
+                    self.entries[entry["url"]] = entry
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.entries
+
+    def get(self, url: str) -> Optional[dict]:
+        return self.entries.get(url)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """``If-None-Match`` / ``If-Modified-Since`` headers for a known URL."""
+        entry = self.entries.get(url)
+        headers: Dict[str, str] = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def make_entry(self, url: str, response_headers, body: bytes, **extra) -> dict:
+        """Build (but do not store) a manifest entry for a fetched response."""
+        return {
+            "url": url,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "sha256": content_hash(body),
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **extra,
+        }
+
+    def is_unchanged(self, url: str, body: bytes) -> bool:
+        """True if *body* hashes the same as the last recorded fetch of *url*."""
+        entry = self.entries.get(url)
+        return bool(entry) and entry.get("sha256") == content_hash(body)
+
+    def record(self, *entries: dict) -> None:
+        """Append entries to the log (and the in-memory view)."""
+        if not entries:
+            return
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as fp:
+                for entry in entries:
+                    fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                fp.flush()
+                os.fsync(fp.fileno())
+            for entry in entries:
+                self.entries[entry["url"]] = entry
+
+
+class BatchCheckpoint:
+    """Append-only batches of scraped records, keyed by their ``url`` field."""
+
+    def __init__(self, manifest: FetchManifest, directory: Path = CHECKPOINT_DIR, batch_size: int = 100):
+        self.manifest = manifest
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self._pending: List[Tuple[dict, dict]] = []
+        self._lock = threading.Lock()
+        existing = sorted(self.directory.glob("batch_*.jsonl"))
+        self._next = int(existing[-1].stem.split("_")[1]) + 1 if existing else 1
+
+    def add(self, record: dict, manifest_entry: dict) -> None:
+        with self._lock:
+            self._pending.append((record, manifest_entry))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        path = self.directory / f"batch_{self._next:05d}.jsonl"
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as fp:
+            for record, _entry in self._pending:
+                fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp, path)
+        self.manifest.record(*(entry for _record, entry in self._pending))
+        self._pending = []
+        self._next += 1
+
+    def records(self) -> Iterator[dict]:
+        """Latest checkpointed record per URL, across every batch."""
+        latest: Dict[str, dict] = {}
+        for path in sorted(self.directory.glob("batch_*.jsonl")):
+            with path.open(encoding="utf-8") as fp:
+                for line in fp:
+                    if line.strip():
+                        record = json.loads(line)
+                        latest[record["url"]] = record
+        return iter(latest.values())
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import threading
+import time
+
+"""
+Request pacing shared by the threaded scrapers (fetch_books_data,
+scrape_conference_topics). The asyncio crawler has its own per-host
+TokenBucket and scrape_tg_and_bd backs off adaptively instead.
+"""
+
+
+class RateLimiter:
+    """Spaces calls to wait() at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
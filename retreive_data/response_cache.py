@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+"""
+Content-addressed cache of raw HTTP responses, shared by every scraper in
+this folder.
+
+Bodies are stored gzip-compressed under ``objects/<sha[:2]>/<sha>.gz`` (so a
+page fetched twice with identical content is stored once) and an append-only
+``index.jsonl`` records the URL, status, headers, encoding, fetch time and
+body hash of each response. The latest index line for a URL wins.
+
+The mode comes from the ``HTTP_CACHE`` environment variable:
+
+    off     (default) talk to the network only
+    record  always fetch from the network and store every response
+    cache   serve from the cache when possible, fetch and store otherwise
+    replay  serve only from the cache; a miss is a ConnectionError and no
+            network I/O happens at all
+
+``HTTP_CACHE_DIR`` overrides the cache location (default ``http_cache``), e.g.
+
+    HTTP_CACHE=replay python retreive_data/fetch_conference_talks.py
+"""
+
+CACHE_DIR = Path(os.environ.get("HTTP_CACHE_DIR", "http_cache"))
+MODES = ("off", "record", "cache", "replay")
+
+# Server errors and rate limiting are never cached; 404s are (fetch_books_data
+# relies on them to find the last chapter of a book).
+UNCACHEABLE_STATUS = {429}
+
+
+class CacheMiss(requests.ConnectionError):
+    """Raised in replay mode for a URL that was never recorded."""
+
+
+class ResponseCache:
+    def __init__(self, directory: Path = CACHE_DIR):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.index_path = self.directory / "index.jsonl"
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.index_path.exists():
+            with self.index_path.open(encoding="utf-8") as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from an interrupted run
+                    self.entries[entry["url"]] = entry
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.entries
+
+    def _object_path(self, sha: str) -> Path:
+        return self.objects / sha[:2] / f"{sha}.gz"
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """Index entry for *url* plus its decompressed ``body``, or None."""
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        path = self._object_path(entry["sha256"])
+        if not path.exists():
+            return None
+        return {**entry, "body": gzip.decompress(path.read_bytes())}
+
+    def store(self, url: str, status: int, headers, body: bytes, encoding: Optional[str] = None) -> Optional[dict]:
+        if status >= 500 or status in UNCACHEABLE_STATUS:
+            return None
+        sha = hashlib.sha256(body).hexdigest()
+        path = self._object_path(sha)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(gzip.compress(body, compresslevel=6))
+            os.replace(tmp, path)
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": dict(headers),
+            "encoding": encoding,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "sha256": sha,
+        }
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self.index_path.open("a", encoding="utf-8") as fp:
+                fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries[url] = entry
+        return entry
+
+
+def to_response(entry: dict, request: Optional[requests.PreparedRequest] = None) -> requests.Response:
+    """Rebuild a requests.Response from a cached entry."""
+    r = requests.Response()
+    r.status_code = entry["status"]
+    r.headers = CaseInsensitiveDict(entry["headers"])
+    r._content = entry["body"]
+    r.encoding = entry.get("encoding")
+    r.url = entry["url"]
+    r.request = request
+    r.reason = "OK (cached)" if r.status_code < 400 else "cached"
+    return r
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter that records to / replays from a ResponseCache (GET only)."""
+
+    def __init__(self, cache: ResponseCache, mode: str, **kw):
+        super().__init__(**kw)
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {MODES}")
+        self.cache = cache
+        self.mode = mode
+
+    def send(self, request, **kw):
+        if request.method != "GET" or self.mode == "off":
+            return super().send(request, **kw)
+
+        if self.mode in ("cache", "replay"):
+            entry = self.cache.lookup(request.url)
+            if entry is not None:
+                return to_response(entry, request)
+            if self.mode == "replay":
+                raise CacheMiss(f"{request.url} is not in the response cache (replay mode)", request=request)
+
+        response = super().send(request, **kw)
+        if response.status_code == 304:
+            # A conditional GET: nothing new to store.
+            return response
+        # Redirects are followed by the session, so each hop is cached under its own URL.
+        self.cache.store(request.url, response.status_code, response.headers, response.content, response.encoding)
+        return response
+
+
+_shared: Dict[Path, ResponseCache] = {}
+_shared_lock = threading.Lock()
+
+
+def cache_mode() -> str:
+    mode = os.environ.get("HTTP_CACHE", "off").lower()
+    if mode not in MODES:
+        raise ValueError(f"HTTP_CACHE must be one of {MODES}, got {mode!r}")
+    return mode
+
+
+def shared_cache(directory: Path = CACHE_DIR) -> ResponseCache:
+    """One ResponseCache instance per directory for the whole process."""
+    directory = Path(directory)
+    with _shared_lock:
+        if directory not in _shared:
+            _shared[directory] = ResponseCache(directory)
+        return _shared[directory]
+
+
+def install(
+    session: requests.Session, mode: Optional[str] = None, directory: Path = CACHE_DIR, **adapter_kw
+) -> requests.Session:
+    """Mount the caching adapter on *session*.
+
+    In ``off`` mode nothing is mounted unless *adapter_kw* (HTTPAdapter options
+    such as ``pool_maxsize``) is given, in which case a plain HTTPAdapter is.
+    """
+    mode = mode or cache_mode()
+    if mode != "off":
+        adapter = CachingAdapter(shared_cache(directory), mode, **adapter_kw)
+    elif adapter_kw:
+        adapter = HTTPAdapter(**adapter_kw)
+    else:
+        return session
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def cached_session(pool_maxsize: Optional[int] = None, **headers) -> requests.Session:
+    """A new requests.Session wired to the cache mode from the environment.
+
+    *pool_maxsize* sizes the keep-alive pool for sessions shared by many threads.
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter_kw = {"pool_connections": 4, "pool_maxsize": pool_maxsize} if pool_maxsize else {}
+    return install(session, **adapter_kw)
@@ -1,27 +1,36 @@
 from __future__ import annotations
 
+import argparse
 import json
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urljoin, urlparse, parse_qs
 
-import requests
 from bs4 import BeautifulSoup, Tag
 
+from rate_limit import RateLimiter
+from response_cache import CacheMiss, cached_session
+
 BASE_URL = "https://www.churchofjesuschrist.org"
 TOPIC_OVERVIEW_URL = f"{BASE_URL}/study/general-conference/topics?lang=eng"
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; scrape-topics/1.0)"}
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 2.0  # topic pages per second across all workers (the sequential crawl's 0.5 s pause)
+OUT_PATH = Path("data") / "topic_talk_mappings.json"
+# Keep-alive pool shared by every crawler thread; honours HTTP_CACHE (see response_cache.py)
+SESSION = cached_session(pool_maxsize=32, **HEADERS)
 
 def get_soup(url: str) -> BeautifulSoup:
     """Return a BeautifulSoup for *url* (retrying once on a transient error)."""
     for attempt in range(2):
         try:
-            r = requests.get(url, headers=HEADERS, timeout=20)
+            r = SESSION.get(url, timeout=20)
             r.raise_for_status()
             return BeautifulSoup(r.text, "html.parser")
         except Exception as exc:
-            if attempt == 0:
+            if attempt == 0 and not isinstance(exc, CacheMiss):
                 time.sleep(3)
                 continue
             raise RuntimeError(f"Failed fetching {url}: {exc}") from exc
@@ -98,30 +107,111 @@ def scrape_topic_data(topic_url: str) -> dict:
         "talks": talks,
     }
 
+def normalize_topics(all_topics: list[dict]) -> dict:
+    """Store each talk once: a talk table keyed by URL plus talk-id lists per topic.
+
+    ``talks[i]["id"] == i``; a talk's fields come from the first topic that
+    lists it.
+    """
+    talks: list[dict] = []
+    ids: dict[str, int] = {}
+    topics = []
+    for topic in all_topics:
+        talk_ids = []
+        for talk in topic["talks"]:
+            talk_id = ids.get(talk["url"])
+            if talk_id is None:
+                talk_id = ids[talk["url"]] = len(talks)
+                talks.append({"id": talk_id, **talk})
+            if talk_id not in talk_ids:
+                talk_ids.append(talk_id)
+        topics.append({"topic": topic["topic"], "topic_url": topic["topic_url"], "talk_ids": talk_ids})
+    return {"talks": talks, "topics": topics}
+
+def load_topic_mappings(path: Path = OUT_PATH) -> dict:
+    """Read topic_talk_mappings.json in either layout and return the normalized one."""
+    with Path(path).open(encoding="utf-8") as fp:
+        data = json.load(fp)
+    return data if isinstance(data, dict) else normalize_topics(data)
+
+def expand_topics(mappings: dict) -> list[dict]:
+    """Inverse of normalize_topics: the original list of topics with nested talks."""
+    talks = mappings["talks"]
+    return [
+        {
+            "topic": t["topic"],
+            "topic_url": t["topic_url"],
+            "talks": [{k: v for k, v in talks[i].items() if k != "id"} for i in t["talk_ids"]],
+        }
+        for t in mappings["topics"]
+    ]
+
+def scrape_topics_concurrent(
+    topic_links: list[str], workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE
+) -> list[dict]:
+    """Scrape topic pages with a bounded thread pool, starting at most *rate* pages per second.
+
+    Results keep *topic_links* order.
+    """
+    limiter = RateLimiter(rate)
+
+    def work(url: str):
+        limiter.wait()
+        try:
+            return scrape_topic_data(url)
+        except Exception as exc:
+            print(f"  ✗ Failed {url}: {exc}")
+            return None
+
+    all_topics = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for data in pool.map(work, topic_links):
+            if data is not None:
+                print(f"  ✓ {data['topic']} ({len(data['talks'])} talks)")
+                all_topics.append(data)
+    return all_topics
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Map general conference topics to talks")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Topic pages fetched at once; 0 keeps the sequential crawl with a 0.5 s pause")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="Max topic pages per second across all workers (0 = unlimited)")
+    parser.add_argument("--legacy", action="store_true",
+                        help="Write the old layout (each topic repeats its talks in full)")
+    parser.add_argument("--out", type=Path, default=OUT_PATH)
+    args = parser.parse_args()
+
     print("Fetching topic overview…")
     topic_links = scrape_topics_overview()
     print(f"Found {len(topic_links)} topics. Scraping each page…")
 
-    all_topics = []
-    for url in topic_links:
-        try:
-            data = scrape_topic_data(url)
-            all_topics.append(data)
-            print(f"  ✓ {data['topic']} ({len(data['talks'])} talks)")
-        except Exception as exc:
-            print(f"  ✗ Failed {url}: {exc}")
-            continue
-        time.sleep(0.5)
+    if args.workers > 0:
+        all_topics = scrape_topics_concurrent(topic_links, args.workers, args.rate)
+    else:
+        all_topics = []
+        for url in topic_links:
+            try:
+                data = scrape_topic_data(url)
+                all_topics.append(data)
+                print(f"  ✓ {data['topic']} ({len(data['talks'])} talks)")
+            except Exception as exc:
+                print(f"  ✗ Failed {url}: {exc}")
+                continue
+            time.sleep(0.5)
 
     # Save JSON
-    out_dir = Path("data")
-    out_dir.mkdir(exist_ok=True)
-    out_path = out_dir / "topic_talk_mappings.json"
+    out_path = args.out
+    out_path.parent.mkdir(parents=True, exist_ok=True)
     with out_path.open("w", encoding="utf-8") as fp:
-        json.dump(all_topics, fp, ensure_ascii=False, indent=4)
-
-    print(f"\nSaved {len(all_topics)} topics to {out_path.relative_to(Path.cwd())}")
+        if args.legacy:
+            json.dump(all_topics, fp, ensure_ascii=False, indent=4)
+        else:
+            mappings = normalize_topics(all_topics)
+            json.dump(mappings, fp, ensure_ascii=False, separators=(",", ":"))
+            print(f"{len(mappings['talks'])} distinct talks across {len(all_topics)} topics")
+
+    print(f"\nSaved {len(all_topics)} topics to {out_path}")
 
 if __name__ == "__main__":
     main()
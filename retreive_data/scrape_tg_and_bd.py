@@ -3,15 +3,21 @@ from __future__ import annotations
 import argparse
 import json
 import re
+import shutil
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Dict, Optional, Set
-from urllib.parse import urljoin, urlparse, parse_qs
+from urllib.parse import urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup, Tag
 
+import response_cache
+import scripture_refs
+
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
@@ -28,81 +34,94 @@ HEADERS = {
 }
 
 SCRIPTURE_PATH_RE = re.compile(r"/study/scriptures/([^/]+)/([^/]+)/([^/?#]+)")
-VERSE_RE = re.compile(r"p(\d+)")
+
+DEFAULT_WORKERS = 12                 # concurrent entry fetches in --workers mode
+DATA_DIR = Path("data")                  # both entry files are written here
+CHECKPOINT_DIR = DATA_DIR / "tg_bd_checkpoints"
 
 # ---------------------------------------------------------------------------
 # Networking helpers
 # ---------------------------------------------------------------------------
+class AdaptiveThrottle:
+    """Spacing between requests shared by every thread using a session.
+
+    The delay grows multiplicatively whenever the server answers 429/5xx (or
+    asks for a Retry-After) and decays back towards zero on each success.
+    """
+
+    def __init__(self, max_delay: float = 30.0, factor: float = 2.0, decay: float = 0.8):
+        self.delay = 0.0
+        self.max_delay = max_delay
+        self.factor = factor
+        self.decay = decay
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    def slow_down(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.delay = min(self.max_delay, max(self.delay * self.factor, 0.05, retry_after or 0.0))
+            if retry_after:
+                self._next = max(self._next, time.monotonic() + retry_after)
+
+    def speed_up(self) -> None:
+        with self._lock:
+            self.delay = self.delay * self.decay if self.delay > 0.01 else 0.0
+
+
+def retry_after_seconds(r: requests.Response) -> Optional[float]:
+    try:
+        return float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        return None  # absent, or an HTTP date
+
+
 class RetrySession(requests.Session):
     def __init__(self, retries: int = 4, backoff: float = 2.0):
         super().__init__()
         self.retries = retries
         self.backoff = backoff
+        self.throttle = AdaptiveThrottle()
         self.headers.update(HEADERS)
 
     def get(self, url: str, **kw):  # type: ignore[override]
         for attempt in range(1, self.retries + 1):
+            self.throttle.wait()
             try:
                 r = super().get(url, timeout=30, **kw)
                 if r.status_code >= 500 or r.status_code in {429}:
+                    self.throttle.slow_down(retry_after_seconds(r))
                     raise requests.HTTPError(str(r.status_code))
+                self.throttle.speed_up()
                 return r
+            except response_cache.CacheMiss:
+                raise  # replay mode: retrying cannot help
             except (requests.RequestException, requests.HTTPError):
                 if attempt == self.retries:
                     raise
                 time.sleep(self.backoff * attempt)
         raise RuntimeError("unreachable")
 
-SESSION = RetrySession()
+SESSION = response_cache.install(RetrySession())  # honours HTTP_CACHE
 
 # ---------------------------------------------------------------------------
 # Utility
 # ---------------------------------------------------------------------------
-SPECIAL_BOOKS = {
-    'bofm': 'Book of Mormon',
-    'ot': 'Old Testament',
-    'nt': 'New Testament',
-    'dc-testament': 'Doctrine and Covenants',
-    'pgp': 'Pearl of Great Price',
-    'gen': 'Genesis', 'ex': 'Exodus', 'lev': 'Leviticus', 'num': 'Numbers', 'deut': 'Deuteronomy',
-    'josh': 'Joshua', 'judg': 'Judges', 'ruth': 'Ruth', '1-sam': '1 Samuel', '2-sam': '2 Samuel',
-    '1-kgs': '1 Kings', '2-kgs': '2 Kings', '1-chr': '1 Chronicles', '2-chr': '2 Chronicles',
-    'ezra': 'Ezra', 'neh': 'Nehemiah', 'esth': 'Esther', 'job': 'Job', 'ps': 'Psalms',
-    'prov': 'Proverbs', 'eccl': 'Ecclesiastes', 'song': 'Song of Solomon', 'isa': 'Isaiah',
-    'jer': 'Jeremiah', 'lam': 'Lamentations', 'ezek': 'Ezekiel', 'dan': 'Daniel', 'hosea': 'Hosea',
-    'joel': 'Joel', 'amos': 'Amos', 'obad': 'Obadiah', 'jonah': 'Jonah', 'micah': 'Micah',
-    'nahum': 'Nahum', 'hab': 'Habakkuk', 'zeph': 'Zephaniah', 'hag': 'Haggai', 'zech': 'Zechariah',
-    'mal': 'Malachi',
-    'matt': 'Matthew', 'mark': 'Mark', 'luke': 'Luke', 'john': 'John', 'acts': 'Acts', 'rom': 'Romans',
-    '1-cor': '1 Corinthians', '2-cor': '2 Corinthians', 'gal': 'Galatians', 'eph': 'Ephesians',
-    'philip': 'Philippians', 'col': 'Colossians', '1-thes': '1 Thessalonians', '2-thes': '2 Thessalonians',
-    '1-tim': '1 Timothy', '2-tim': '2 Timothy', 'titus': 'Titus', 'philem': 'Philemon', 'heb': 'Hebrews',
-    'james': 'James', '1-pet': '1 Peter', '2-pet': '2 Peter', '1-jn': '1 John', '2-jn': '2 John',
-    '3-jn': '3 John', 'jude': 'Jude', 'rev': 'Revelation',
-    '1-ne': '1 Nephi', '2-ne': '2 Nephi', 'jacob': 'Jacob', 'enos': 'Enos', 'jarom': 'Jarom',
-    'omni': 'Omni', 'w-of-m': 'Words of Mormon', 'mosiah': 'Mosiah', 'alma': 'Alma', 'hel': 'Helaman',
-    '3-ne': '3 Nephi', '4-ne': '4 Nephi', 'morm': 'Mormon', 'ether': 'Ether', 'moro': 'Moroni',
-    'dc': 'Doctrine and Covenants', 'js-h': 'Joseph Smith—History', 'js-m': 'Joseph Smith—Matthew',
-    'a-of-f': 'Articles of Faith', 'abr': 'Abraham', 'fac': 'Facsimile'
-}
-
-def slug_to_book(slug: str) -> str:
-    return SPECIAL_BOOKS.get(slug, slug.replace("-", " ").title())
+# Book slugs are shared with fetch_conference_talks (see scripture_refs.py)
+slug_to_book = scripture_refs.slug_to_book
 
 def parse_scripture_uri(href: str) -> Optional[str]:
     """Return e.g. "Ezek 21:26" or None."""
-    m = SCRIPTURE_PATH_RE.match(urlparse(href).path)
-    if not m:
+    if not SCRIPTURE_PATH_RE.match(urlparse(href).path):
         return None
-    _canon, book_slug, chapter = m.groups()
-    book = slug_to_book(book_slug)
-
-    parsed = urlparse(href)
-    qs = parse_qs(parsed.query)
-    qv = qs.get("id", [""])[0]
-    verse_match = VERSE_RE.search(qv) or VERSE_RE.search(parsed.fragment)
-    verse = verse_match.group(1).lstrip("0") if verse_match else None
-    return f"{book} {chapter}:{verse}" if verse else f"{book} {chapter}"
+    return scripture_refs.uri_label(href)
 
 # ---------------------------------------------------------------------------
 # Scraping routines
@@ -194,7 +213,7 @@ def scrape_entry(url: str) -> List[dict]:
 # ---------------------------------------------------------------------------
 
 def ensure_data_dir() -> Path:
-    p = Path("data")
+    p = DATA_DIR
     p.mkdir(exist_ok=True)
     return p
 
@@ -217,18 +236,121 @@ def scrape_collection(label: str, index_url: str, prefix: str, max_n: Optional[i
     return out
 
 
+# ---------------------------------------------------------------------------
+# Concurrent driver with per-entry checkpoints
+# ---------------------------------------------------------------------------
+
+def collection_checkpoint_dir(ckpt_root: Path, label: str) -> Path:
+    return Path(ckpt_root) / label.lower()
+
+
+def checkpoint_path(ckpt_dir: Path, entry_url: str) -> Path:
+    slug = urlparse(entry_url).path.rstrip("/").rsplit("/", 1)[-1]
+    name = re.sub(r"[^\w.-]", "_", slug) or "index"
+    return ckpt_dir / f"{name}.json"
+
+
+def load_checkpoint(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None  # missing, or torn by an interrupted write
+
+
+def write_checkpoint(path: Path, record: dict) -> None:
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+
+def clear_checkpoints(ckpt_dir: Path) -> None:
+    shutil.rmtree(ckpt_dir, ignore_errors=True)
+
+
+def merge_checkpoints(links: List[Dict[str, str]], ckpt_dir: Path) -> List[dict]:
+    """Entries in index order; ones without a checkpoint carry an error like scrape_collection's."""
+    out = []
+    for link in links:
+        record = load_checkpoint(checkpoint_path(ckpt_dir, link["entry_url"]))
+        out.append(record if record is not None else {**link, "paragraphs": [], "error": "not scraped"})
+    return out
+
+
+def scrape_collection_concurrent(
+    label: str,
+    index_url: str,
+    prefix: str,
+    max_n: Optional[int],
+    workers: int = DEFAULT_WORKERS,
+    ckpt_root: Path = CHECKPOINT_DIR,
+) -> List[dict]:
+    """scrape_collection with a bounded worker pool.
+
+    Each finished entry is written to ``<ckpt_root>/<label>/<slug>.json``;
+    entries that already have a checkpoint are skipped, so an interrupted run
+    picks up where it stopped. Failed entries are not checkpointed and are
+    retried next time. The merged list keeps index order.
+
+    The checkpoints only bridge interrupted runs: main() deletes them once
+    the collection has been written without errors, and ``--fresh`` discards
+    them up front.
+    """
+    ckpt_dir = collection_checkpoint_dir(ckpt_root, label)
+    ckpt_dir.mkdir(parents=True, exist_ok=True)
+    links = collect_links(index_url, prefix, max_n)
+    todo = [link for link in links if load_checkpoint(checkpoint_path(ckpt_dir, link["entry_url"])) is None]
+    total = len(todo)
+    print(f"{label}: {len(links) - total}/{len(links)} entries already checkpointed, {total} to fetch")
+
+    def work(link: Dict[str, str]) -> dict:
+        record = {**link, "paragraphs": scrape_entry(link["entry_url"])}
+        write_checkpoint(checkpoint_path(ckpt_dir, link["entry_url"]), record)
+        return record
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(work, link): link for link in todo}
+        for i, fut in enumerate(as_completed(futures), 1):
+            link = futures[fut]
+            try:
+                fut.result()
+                print(f"{label}: {i}/{total} ✓ {link['entry']}")
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"{label}: {i}/{total} ✗ {link['entry']} — {e}")
+
+    return merge_checkpoints(links, ckpt_dir)
+
+
 def main():
     ap = argparse.ArgumentParser(description="Scrape Topical Guide & Bible Dictionary")
     ap.add_argument("--max", type=int, default=None, help="Only first N entries per collection")
+    ap.add_argument("--workers", type=int, default=0,
+                    help=f"Fetch entries concurrently (e.g. {DEFAULT_WORKERS}) with resumable per-entry checkpoints; "
+                         "0 keeps the sequential scrape")
+    ap.add_argument("--checkpoint-dir", type=Path, default=CHECKPOINT_DIR, help="Where --workers mode keeps checkpoints")
+    ap.add_argument("--fresh", action="store_true", help="Discard checkpoints left by an interrupted --workers run")
     args = ap.parse_args()
 
     ddir = ensure_data_dir()
 
-    tg_data = scrape_collection("TG", TG_INDEX_URL, "/study/scriptures/tg/", args.max)
-    dump(ddir / "topical_guide_entries.json", tg_data)
-
-    bd_data = scrape_collection("BD", BD_INDEX_URL, "/study/scriptures/bd/", args.max)
-    dump(ddir / "bible_dictionary_entries.json", bd_data)
+    def scrape(label: str, index_url: str, prefix: str, filename: str) -> None:
+        if args.workers <= 0:
+            dump(ddir / filename, scrape_collection(label, index_url, prefix, args.max))
+            return
+        ckpt_dir = collection_checkpoint_dir(args.checkpoint_dir, label)
+        if args.fresh:
+            clear_checkpoints(ckpt_dir)
+        data = scrape_collection_concurrent(label, index_url, prefix, args.max, args.workers, args.checkpoint_dir)
+        dump(ddir / filename, data)
+        if not any("error" in record for record in data):
+            # Complete: the next run scrapes the site again instead of re-emitting this one.
+            clear_checkpoints(ckpt_dir)
+
+    if args.workers > 0:
+        # One keep-alive connection per worker instead of requests' default pool of 10.
+        response_cache.install(SESSION, pool_connections=2, pool_maxsize=args.workers)
+
+    scrape("TG", TG_INDEX_URL, "/study/scriptures/tg/", "topical_guide_entries.json")
+    scrape("BD", BD_INDEX_URL, "/study/scriptures/bd/", "bible_dictionary_entries.json")
 
     print("\n[✓] Done — files written to", ddir)
 
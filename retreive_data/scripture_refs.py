@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+"""
+One place for every way the project spells a scripture reference.
+
+    full name      "Mosiah 3:19", "Doctrine and Covenants 76:22"
+    abbreviation   "1 Ne. 3:7", "D&C 68:25", "JS—H 1:17"   (chapter footnotes)
+    URL slug       /study/scriptures/bofm/mosiah/3?id=p19#p19
+    chapter id     "1nephi1"                                 (Open Scripture API)
+
+All of them map to a canonical ``book_id`` (the API's, e.g. ``1nephi``) and,
+through a :class:`VerseTable`, to a dense integer verse ID. Verse IDs follow
+the order of the chapter list the table is built from; built from
+``Corpus.chapters()`` they are exactly the corpus verse IDs.
+
+Verse lists and ranges expand to every verse they cover:
+"Alma 32:21–43", "Alma 32:21, 27–28" and "Alma 32:43–33:2".
+"""
+
+# (book_id, full name, footnote abbreviation, churchofjesuschrist.org slug)
+BOOKS: List[Tuple[str, str, str, str]] = [
+    # Book of Mormon
+    ("1nephi", "1 Nephi", "1 Ne.", "1-ne"),
+    ("2nephi", "2 Nephi", "2 Ne.", "2-ne"),
+    ("jacob", "Jacob", "Jacob", "jacob"),
+    ("enos", "Enos", "Enos", "enos"),
+    ("jarom", "Jarom", "Jarom", "jarom"),
+    ("omni", "Omni", "Omni", "omni"),
+    ("wordsofmormon", "Words of Mormon", "W of M", "w-of-m"),
+    ("mosiah", "Mosiah", "Mosiah", "mosiah"),
+    ("alma", "Alma", "Alma", "alma"),
+    ("helaman", "Helaman", "Hel.", "hel"),
+    ("3nephi", "3 Nephi", "3 Ne.", "3-ne"),
+    ("4nephi", "4 Nephi", "4 Ne.", "4-ne"),
+    ("mormon", "Mormon", "Morm.", "morm"),
+    ("ether", "Ether", "Ether", "ether"),
+    ("moroni", "Moroni", "Moro.", "moro"),
+    # Old Testament
+    ("genesis", "Genesis", "Gen.", "gen"),
+    ("exodus", "Exodus", "Ex.", "ex"),
+    ("leviticus", "Leviticus", "Lev.", "lev"),
+    ("numbers", "Numbers", "Num.", "num"),
+    ("deuteronomy", "Deuteronomy", "Deut.", "deut"),
+    ("joshua", "Joshua", "Josh.", "josh"),
+    ("judges", "Judges", "Judg.", "judg"),
+    ("ruth", "Ruth", "Ruth", "ruth"),
+    ("1samuel", "1 Samuel", "1 Sam.", "1-sam"),
+    ("2samuel", "2 Samuel", "2 Sam.", "2-sam"),
+    ("1kings", "1 Kings", "1 Kgs.", "1-kgs"),
+    ("2kings", "2 Kings", "2 Kgs.", "2-kgs"),
+    ("1chronicles", "1 Chronicles", "1 Chr.", "1-chr"),
+    ("2chronicles", "2 Chronicles", "2 Chr.", "2-chr"),
+    ("ezra", "Ezra", "Ezra", "ezra"),
+    ("nehemiah", "Nehemiah", "Neh.", "neh"),
+    ("esther", "Esther", "Esth.", "esth"),
+    ("job", "Job", "Job", "job"),
+    ("psalms", "Psalms", "Ps.", "ps"),
+    ("proverbs", "Proverbs", "Prov.", "prov"),
+    ("ecclesiastes", "Ecclesiastes", "Eccl.", "eccl"),
+    ("songofsolomon", "Song of Solomon", "Song", "song"),
+    ("isaiah", "Isaiah", "Isa.", "isa"),
+    ("jeremiah", "Jeremiah", "Jer.", "jer"),
+    ("lamentations", "Lamentations", "Lam.", "lam"),
+    ("ezekiel", "Ezekiel", "Ezek.", "ezek"),
+    ("daniel", "Daniel", "Dan.", "dan"),
+    ("hosea", "Hosea", "Hosea", "hosea"),
+    ("joel", "Joel", "Joel", "joel"),
+    ("amos", "Amos", "Amos", "amos"),
+    ("obadiah", "Obadiah", "Obad.", "obad"),
+    ("jonah", "Jonah", "Jonah", "jonah"),
+    ("micah", "Micah", "Micah", "micah"),
+    ("nahum", "Nahum", "Nahum", "nahum"),
+    ("habakkuk", "Habakkuk", "Hab.", "hab"),
+    ("zephaniah", "Zephaniah", "Zeph.", "zeph"),
+    ("haggai", "Haggai", "Hag.", "hag"),
+    ("zechariah", "Zechariah", "Zech.", "zech"),
+    ("malachi", "Malachi", "Mal.", "mal"),
+    # New Testament
+    ("matthew", "Matthew", "Matt.", "matt"),
+    ("mark", "Mark", "Mark", "mark"),
+    ("luke", "Luke", "Luke", "luke"),
+    ("john", "John", "John", "john"),
+    ("acts", "Acts", "Acts", "acts"),
+    ("romans", "Romans", "Rom.", "rom"),
+    ("1corinthians", "1 Corinthians", "1 Cor.", "1-cor"),
+    ("2corinthians", "2 Corinthians", "2 Cor.", "2-cor"),
+    ("galatians", "Galatians", "Gal.", "gal"),
+    ("ephesians", "Ephesians", "Eph.", "eph"),
+    ("philippians", "Philippians", "Philip.", "philip"),
+    ("colossians", "Colossians", "Col.", "col"),
+    ("1thessalonians", "1 Thessalonians", "1 Thes.", "1-thes"),
+    ("2thessalonians", "2 Thessalonians", "2 Thes.", "2-thes"),
+    ("1timothy", "1 Timothy", "1 Tim.", "1-tim"),
+    ("2timothy", "2 Timothy", "2 Tim.", "2-tim"),
+    ("titus", "Titus", "Titus", "titus"),
+    ("philemon", "Philemon", "Philem.", "philem"),
+    ("hebrews", "Hebrews", "Heb.", "heb"),
+    ("james", "James", "James", "james"),
+    ("1peter", "1 Peter", "1 Pet.", "1-pet"),
+    ("2peter", "2 Peter", "2 Pet.", "2-pet"),
+    ("1john", "1 John", "1 Jn.", "1-jn"),
+    ("2john", "2 John", "2 Jn.", "2-jn"),
+    ("3john", "3 John", "3 Jn.", "3-jn"),
+    ("jude", "Jude", "Jude", "jude"),
+    ("revelation", "Revelation", "Rev.", "rev"),
+    # Doctrine and Covenants
+    ("doctrineandcovenants", "Doctrine and Covenants", "D&C", "dc"),
+    # Pearl of Great Price
+    ("moses", "Moses", "Moses", "moses"),
+    ("abraham", "Abraham", "Abr.", "abr"),
+    ("josephsmithmatthew", "Joseph Smith—Matthew", "JS—M", "js-m"),
+    ("josephsmithhistory", "Joseph Smith—History", "JS—H", "js-h"),
+    ("articlesoffaith", "Articles of Faith", "A of F", "a-of-f"),
+]
+
+BOOK_NAMES: Dict[str, str] = {book_id: name for book_id, name, _abbr, _slug in BOOKS}
+
+# URL slug -> display name, for every slug the site uses (not only books).
+BOOK_SLUGS: Dict[str, str] = {
+    "bofm": "Book of Mormon",
+    "ot": "Old Testament",
+    "nt": "New Testament",
+    "dc-testament": "Doctrine and Covenants",
+    "pgp": "Pearl of Great Price",
+    **{slug: name for _book_id, name, _abbr, slug in BOOKS},
+    "fac": "Facsimile",
+}
+
+# Other spellings seen in the data, keyed like book_key().
+EXTRA_ALIASES = {
+    "psalm": "psalms",
+    "songofsongs": "songofsolomon",
+    "dandc": "doctrineandcovenants",
+    "jsh": "josephsmithhistory",
+    "jsm": "josephsmithmatthew",
+    "aoff": "articlesoffaith",
+}
+
+REF_RE = re.compile(
+    r"^\s*(?P<book>.*?[^\d\s])\s*(?P<chapter>\d+)"
+    r"(?:\s*:\s*(?P<verses>\d+(?:\s*[-–—]\s*\d+(?:\s*:\s*\d+)?)?(?:\s*,\s*\d+(?:\s*[-–—]\s*\d+)?)*))?\s*$"
+)
+VERSE_PART_RE = re.compile(r"(\d+)(?:\s*[-–—]\s*(\d+)(?:\s*:\s*(\d+))?)?")
+CHAPTER_ID_RE = re.compile(r"^(?P<book>[a-z0-9]+?)(?P<chapter>\d+)$")
+SCRIPTURE_PATH_RE = re.compile(r"/study/scriptures/(?P<path>[^?#]*)")
+URI_VERSE_RE = re.compile(r"p(\d+)(?:\s*-\s*p(\d+))?")
+
+
+class Ref(NamedTuple):
+    """``book_id chapter:first-last``; ``first``/``last`` are None for a whole chapter.
+
+    ``last_chapter`` differs from ``chapter`` only for ranges such as
+    "Alma 32:43–33:2".
+    """
+
+    book_id: str
+    chapter: int
+    first: Optional[int] = None
+    last: Optional[int] = None
+    last_chapter: Optional[int] = None
+
+
+def book_key(name: str) -> str:
+    """Lower-case *name* and drop everything but letters, digits and ``&``."""
+    name = unicodedata.normalize("NFKC", name).lower()
+    return "".join(ch for ch in name if ch.isalnum() or ch == "&")
+
+
+def _alias_table() -> Dict[str, str]:
+    table: Dict[str, str] = {}
+    for book_id, name, abbr, slug in BOOKS:
+        for alias in (book_id, name, abbr, slug):
+            table[book_key(alias)] = book_id
+    table.update(EXTRA_ALIASES)
+    return table
+
+
+BOOK_ALIASES: Dict[str, str] = _alias_table()
+
+
+@lru_cache(maxsize=None)
+def lookup_book(name: str) -> Optional[str]:
+    """Canonical book_id for any known spelling of a book, or None."""
+    return BOOK_ALIASES.get(book_key(name))
+
+
+def slug_to_book(slug: str) -> str:
+    """Display name for a URL slug (title-cased slug when unknown)."""
+    return BOOK_SLUGS.get(slug, slug.replace("-", " ").title())
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=65536)
+def parse_reference(text: str) -> Tuple[Ref, ...]:
+    """Parse one reference ("Alma 32:21, 27–28", "1 Ne. 3:7", "D&C 4") into Refs.
+
+    Returns an empty tuple when the book is unknown or the text is not a
+    reference.
+    """
+    m = REF_RE.match(text or "")
+    if not m:
+        return ()
+    book_id = lookup_book(m.group("book"))
+    if book_id is None:
+        return ()
+    chapter = int(m.group("chapter"))
+    if not m.group("verses"):
+        return (Ref(book_id, chapter),)
+    refs = []
+    for first, last, last_verse in VERSE_PART_RE.findall(m.group("verses")):
+        if last_verse:
+            # "43–33:2": the range ends in a later chapter.
+            refs.append(Ref(book_id, chapter, int(first), int(last_verse), int(last)))
+        else:
+            refs.append(Ref(book_id, chapter, int(first), int(last or first)))
+    return tuple(refs)
+
+
+def parse_uri(uri: str) -> Optional[Ref]:
+    """Ref for a /study/scriptures/... link, or None for anything else (incl. non-book pages)."""
+    if not uri:
+        return None
+    m = SCRIPTURE_PATH_RE.search(uri)
+    if not m:
+        return None
+    segments = [s for s in m.group("path").split("/") if s]
+    if len(segments) < 3:
+        return None
+    book_id = lookup_book(segments[-2])
+    if book_id is None or not segments[-1].isdigit():
+        return None
+    parsed = urlparse(uri)
+    ids = parse_qs(parsed.query).get("id", [""])[0]
+    vm = URI_VERSE_RE.search(ids) or URI_VERSE_RE.search(parsed.fragment)
+    if not vm:
+        return Ref(book_id, int(segments[-1]))
+    first = int(vm.group(1))
+    return Ref(book_id, int(segments[-1]), first, int(vm.group(2) or first))
+
+
+def uri_label(uri: str) -> Optional[str]:
+    """"Book chapter:verse" for a scripture link, the form stored by the scrapers.
+
+    Falls back to "Book chapter" / "Book" for links without a verse / chapter
+    and to the title-cased slug for books not in :data:`BOOK_SLUGS`.
+    """
+    if not uri:
+        return None
+    m = SCRIPTURE_PATH_RE.search(uri)
+    if not m:
+        return None
+    segments = [s for s in m.group("path").split("/") if s]
+    if not segments:
+        return None
+    if len(segments) == 1:
+        return slug_to_book(segments[0])
+    book, chapter = slug_to_book(segments[-2]), segments[-1]
+    parsed = urlparse(uri)
+    ids = parse_qs(parsed.query).get("id", [""])[0]
+    vm = URI_VERSE_RE.search(ids) or URI_VERSE_RE.search(parsed.fragment)
+    verse = vm.group(1).lstrip("0") if vm else None
+    return f"{book} {chapter}:{verse}" if verse else f"{book} {chapter}"
+
+
+def parse_chapter_id(chapter_id: str) -> Optional[Tuple[str, int]]:
+    """``"1nephi1"`` -> ``("1nephi", 1)``; None for unknown books."""
+    m = CHAPTER_ID_RE.match(chapter_id or "")
+    if not m or m.group("book") not in BOOK_NAMES:
+        return None
+    return m.group("book"), int(m.group("chapter"))
+
+
+def format_ref(book_id: str, chapter: int, verse: Optional[int] = None) -> str:
+    name = BOOK_NAMES.get(book_id, book_id)
+    return f"{name} {chapter}:{verse}" if verse else f"{name} {chapter}"
+
+# ---------------------------------------------------------------------------
+# Dense verse IDs
+# ---------------------------------------------------------------------------
+
+class VerseTable:
+    """Dense integer verse IDs over an ordered list of ``(book_id, chapter, verse_count)``.
+
+    Lookups are O(1) (book -> first chapter -> first verse); reverse lookups
+    bisect the chapter offsets.
+    """
+
+    def __init__(self, chapters: Iterable[Tuple[str, int, int]]):
+        self.book_ids: List[str] = []
+        self._book_first_chapter: Dict[str, int] = {}
+        self.chapter_book = array("H")
+        self.chapter_number = array("H")
+        self.chapter_first_verse = array("I", [0])
+        for book_id, chapter, n_verses in chapters:
+            if book_id not in self._book_first_chapter:
+                self._book_first_chapter[book_id] = len(self.chapter_number)
+                self.book_ids.append(book_id)
+            self.chapter_book.append(len(self.book_ids) - 1)
+            self.chapter_number.append(chapter)
+            self.chapter_first_verse.append(self.chapter_first_verse[-1] + n_verses)
+        self._cache: Dict[str, Tuple[int, ...]] = {}
+
+    @classmethod
+    def from_corpus(cls, corpus) -> "VerseTable":
+        """Table whose IDs are the verse IDs of a corpus_store.Corpus."""
+        return cls(corpus.chapters())
+
+    def __len__(self) -> int:
+        return self.chapter_first_verse[-1]
+
+    def chapters(self) -> Iterable[Tuple[str, int, int]]:
+        for ch, chapter in enumerate(self.chapter_number):
+            yield (
+                self.book_ids[self.chapter_book[ch]],
+                chapter,
+                self.chapter_first_verse[ch + 1] - self.chapter_first_verse[ch],
+            )
+
+    def chapter_index(self, book_id: str, chapter: int) -> int:
+        first = self._book_first_chapter.get(book_id)
+        if first is None:
+            raise KeyError(f"Unknown book {book_id!r}")
+        idx = first + chapter - 1
+        if chapter < 1 or idx >= len(self.chapter_number) or self.book_ids[self.chapter_book[idx]] != book_id:
+            raise KeyError(f"{book_id} has no chapter {chapter}")
+        return idx
+
+    def chapter_range(self, book_id: str, chapter: int) -> range:
+        idx = self.chapter_index(book_id, chapter)
+        return range(self.chapter_first_verse[idx], self.chapter_first_verse[idx + 1])
+
+    def verse_id(self, book_id: str, chapter: int, verse: int) -> int:
+        verses = self.chapter_range(book_id, chapter)
+        if not 1 <= verse <= len(verses):
+            raise KeyError(f"{book_id} {chapter} has no verse {verse}")
+        return verses[verse - 1]
+
+    def key(self, verse_id: int) -> Tuple[str, int, int]:
+        """``(book_id, chapter, verse)`` for a verse ID."""
+        if not 0 <= verse_id < len(self):
+            raise IndexError(verse_id)
+        ch = bisect_right(self.chapter_first_verse, verse_id) - 1
+        return self.book_ids[self.chapter_book[ch]], self.chapter_number[ch], verse_id - self.chapter_first_verse[ch] + 1
+
+    def label(self, verse_id: int) -> str:
+        return format_ref(*self.key(verse_id))
+
+    def expand(self, ref: Ref, whole_chapters: bool = False) -> range:
+        """Verse IDs covered by *ref* (empty if it falls outside the table).
+
+        Chapter-only refs cover the chapter when *whole_chapters* is set and
+        nothing otherwise. Verse numbers past the end of a chapter are clipped.
+        """
+        try:
+            verses = self.chapter_range(ref.book_id, ref.chapter)
+        except KeyError:
+            return range(0)
+        if ref.first is None:
+            return verses if whole_chapters else range(0)
+        if ref.last_chapter is not None and ref.last_chapter != ref.chapter:
+            try:
+                end_verses = self.chapter_range(ref.book_id, ref.last_chapter)
+            except KeyError:
+                return range(0)
+            last = end_verses.start + min(ref.last, len(end_verses)) - 1
+        else:
+            last = verses.start + min(ref.last, len(verses)) - 1
+        first = verses.start + ref.first - 1
+        return range(first, last + 1) if ref.first <= len(verses) else range(0)
+
+    def resolve(self, text: str, whole_chapters: bool = False) -> Tuple[int, ...]:
+        """Sorted, de-duplicated verse IDs for one reference string (cached)."""
+        cache_key = f"{int(whole_chapters)}{text}"
+        ids = self._cache.get(cache_key)
+        if ids is None:
+            found = set()
+            for ref in parse_reference(text):
+                found.update(self.expand(ref, whole_chapters))
+            ids = self._cache[cache_key] = tuple(sorted(found))
+        return ids
+
+    def resolve_uri(self, uri: str, whole_chapters: bool = False) -> range:
+        ref = parse_uri(uri)
+        return self.expand(ref, whole_chapters) if ref else range(0)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import threading
+import unicodedata
+from pathlib import Path
+from typing import IO, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst output
+    zstandard = None
+
+"""
+Streaming storage for scraped conference talks.
+
+Talks are written one JSON object per line as soon as they are scraped, so
+memory use does not grow with the size of the archive. A ``.gz`` or ``.zst``
+suffix on the output path turns on compression (``.zst`` needs the
+``zstandard`` package). Readers accept these files as well as the older
+``conference_talks.json`` array written by ``save_conference_talks``.
+"""
+
+TALKS_PATH = Path("conference_talks.jsonl")
+# Looked for, in order, by readers that are not given an explicit path.
+TALKS_PATH_CANDIDATES = [
+    Path("conference_talks.jsonl"),
+    Path("conference_talks.jsonl.gz"),
+    Path("conference_talks.jsonl.zst"),
+    Path("conference_talks.json"),
+]
+
+
+def open_text(path: Path, mode: str = "r") -> IO[str]:
+    """Open *path* as UTF-8 text, compressing/decompressing by suffix."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError("Reading or writing .zst files requires the 'zstandard' package")
+        raw = path.open(mode + "b")
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+def normalize_talk(talk: dict) -> dict:
+    """Same cleaning save_conference_talks applies: NFD-normalize string fields and drop tabs."""
+    return {
+        key: unicodedata.normalize("NFD", value).replace("\t", "") if isinstance(value, str) else value
+        for key, value in talk.items()
+    }
+
+
+class TalkWriter:
+    """Thread-safe JSONL writer; use as a context manager."""
+
+    def __init__(self, path: Path = TALKS_PATH):
+        self.path = Path(path)
+        self.count = 0
+        self._fp: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "TalkWriter":
+        self._fp = open_text(self.path, "w")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._fp.close()
+        print(f"Saved {self.count} talks to '{self.path}'.")
+
+    def write(self, talk: dict) -> None:
+        if not talk:
+            return
+        line = json.dumps(normalize_talk(talk), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._fp.write(line)
+            self.count += 1
+
+
+def is_jsonl(path: Path) -> bool:
+    """True for ``.jsonl`` paths, optionally with a compression suffix."""
+    suffixes = Path(path).suffixes
+    if suffixes and suffixes[-1] in (".gz", ".zst"):
+        suffixes = suffixes[:-1]
+    return bool(suffixes) and suffixes[-1] == ".jsonl"
+
+
+def find_talks_file(candidates: List[Path] = TALKS_PATH_CANDIDATES) -> Optional[Path]:
+    return next((p for p in candidates if p.exists()), None)
+
+
+def iter_talks(path: Optional[Path] = None) -> Iterator[dict]:
+    """Yield talk records from a JSONL (optionally compressed) or JSON-array file."""
+    path = Path(path) if path is not None else find_talks_file()
+    if path is None or not path.exists():
+        return
+    if not is_jsonl(path):
+        with open_text(path) as fp:
+            yield from json.load(fp)
+        return
+    with open_text(path) as fp:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
@@ -1,29 +1,158 @@
+import sys
+import time
+from pathlib import Path
+
+import altair as alt
+import pandas as pd
 import streamlit as st
-import pandas as pd # Added for potential future use, but using Markdown for lists now
+
+APP_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(APP_DIR.parent / "process_data"))
+from graph_explorer import explore, find_node  # noqa: E402
+from graph_rag import NODE_TYPES, open_retriever  # noqa: E402
+from search_index import SOURCES  # noqa: E402
+
+"""
+Streamlit front end for the scripture / conference talk knowledge graph.
+
+Run from the repository root (the data files are looked up under ``data/``):
+    streamlit run sped_talk_streamlit_interface/home.py
+
+Streamlit re-executes this script on every interaction, so nothing expensive
+happens at the top level:
+* the corpus, search index, citation graph and embedding index are opened
+  once per server process through ``st.cache_resource``;
+* query results are memoised with ``st.cache_data`` (TTL + size limits);
+* only the section picked in the navigation bar is rendered, so the other
+  sections cost nothing on a rerun.
+"""
+
+# --- Config ---
+QUERY_TTL = 600          # seconds a memoised query result stays valid
+QUERY_CACHE_SIZE = 256   # memoised results per query function
+EXPLORER_MAX_NODES = 300 # upper bound on the subgraph sent to the browser
+
+render_start = time.perf_counter()
 
 # --- Page Configuration ---
 st.set_page_config(
-    page_title="Network Analysis with Knowledge Graphs & Neo4j",
+    page_title="Digital Liahona: Knowledge Graphs over Scriptures & Conference Talks",
     page_icon="📡",
     layout="wide",
     initial_sidebar_state="collapsed",
 )
 
 # --- Main Title ---
-st.title("📡 Visualizing Network Connections: A Knowledge Graph Approach with Neo4j")
-st.caption("Demonstrating how graph databases help analyze network activity and identify anomalies.")
-
-# --- Tabs for Different Sections ---
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "🕸️ What are Knowledge Graphs?",
-    "🚀 Meet Neo4j",
-    "💻 Building Our Network Graph",
-    "🔍 Querying for Insights & Anomalies",
-    "🌐 Diverse Real-World Use Cases" # Updated Tab Title
-])
+st.title("📡 Digital Liahona: A Knowledge Graph of Scriptures & Conference Talks")
+st.caption("Search, retrieve and explore how conference talks, verses and Topical Guide / Bible Dictionary entries cite each other.")
+
+# --- Shared resources (loaded once per process) ---
+@st.cache_resource(show_spinner="Loading corpus, indexes and citation graph...")
+def load_retriever():
+    """GraphRetriever holding the corpus, search index, citation graph and embeddings."""
+    return open_retriever()
+
+
+@st.cache_data(show_spinner=False)
+def load_image(name: str) -> bytes:
+    return (APP_DIR / name).read_bytes()
+
+# --- Memoised queries ---
+@st.cache_data(ttl=QUERY_TTL, max_entries=QUERY_CACHE_SIZE, show_spinner=False)
+def search_hits(query: str, k: int, sources: tuple) -> pd.DataFrame:
+    retriever = load_retriever()
+    hits = retriever.index.search(query, k, list(sources) or None)
+    return pd.DataFrame(
+        [(source, locator, round(score, 3), retriever.text(source, locator)) for source, locator, score in hits],
+        columns=["source", "locator", "score", "text"],
+    )
+
+
+@st.cache_data(ttl=QUERY_TTL, max_entries=QUERY_CACHE_SIZE, show_spinner=False)
+def graph_bundle(query: str, k: int, hops: int, budget_ms: float, types: tuple) -> dict:
+    return load_retriever().retrieve(query, k=k, hops=hops, budget_ms=budget_ms, types=types or None)
+
+
+@st.cache_data(ttl=QUERY_TTL, max_entries=QUERY_CACHE_SIZE, show_spinner=False)
+def citing(reference: str) -> list:
+    """``[(verse label, talk URLs, TG / BD entries)]`` for every verse in *reference*."""
+    retriever = load_retriever()
+    rows = []
+    for verse_id in retriever.verses.resolve(reference):
+        hits = retriever.graph.citing(verse_id)
+        rows.append((retriever.verses.label(verse_id), hits["talks"], hits["entries"]))
+    return rows
+
+@st.cache_data(ttl=QUERY_TTL, max_entries=QUERY_CACHE_SIZE, show_spinner=False)
+def explore_subgraph(node_text: str, hops: int, cap: int, max_nodes: int):
+    """Sampled, laid-out neighbourhood (see graph_explorer.py), or None if *node_text* matches nothing."""
+    retriever = load_retriever()
+    center = find_node(retriever.graph, retriever.verses, node_text)
+    if center is None:
+        return None
+    return explore(retriever.graph, retriever.verses, center, hops, cap, min(max_nodes, EXPLORER_MAX_NODES))
+
+# --- DATA SECTIONS ---
+def render_search():
+    st.header("📖 Search the Scriptures & Talks")
+    col_query, col_sources, col_k = st.columns([3, 2, 1])
+    query = col_query.text_input("Search", placeholder='e.g. "charity never faileth" or faith hope')
+    sources = col_sources.multiselect("Sources", SOURCES)
+    k = col_k.number_input("Results", 5, 100, 20, step=5)
+    if not query.strip():
+        st.info('Put a phrase in double quotes to match it exactly.')
+        return
+    hits = search_hits(query, int(k), tuple(sources))
+    if hits.empty:
+        st.warning("No matches.")
+        return
+    st.dataframe(hits, use_container_width=True, hide_index=True)
+
+
+def render_graphrag():
+    st.header("🧭 GraphRAG Retrieval")
+    st.markdown("""
+    Keyword and vector hits seed a walk over the citation graph
+    (talk → verse → Topical Guide / Bible Dictionary entry → verse → talk).
+    The result is a ranked context bundle that can be handed to an LLM.
+    """)
+    query = st.text_input("Question or topic", placeholder="e.g. faith unto repentance")
+    col_k, col_hops, col_budget, col_types = st.columns([1, 1, 1, 2])
+    k = col_k.number_input("Items", 3, 50, 10)
+    hops = col_hops.number_input("Hops", 0, 4, 2)
+    budget_ms = col_budget.number_input("Budget (ms)", 10, 5000, 250, step=50)
+    types = col_types.multiselect("Node types", NODE_TYPES)
+    if not query.strip():
+        return
+    bundle = graph_bundle(query, int(k), int(hops), float(budget_ms), tuple(types))
+    note = " (expansion stopped at the budget)" if bundle["truncated"] else ""
+    st.caption(f"{len(bundle['items'])} items from {bundle['seeds']} seeds in {bundle['elapsed_ms']:.1f} ms{note}")
+    for item in bundle["items"]:
+        via = f" ← {item['via']['label']}" if "via" in item else " (seed)"
+        with st.expander(f"{item['score']:.3f} · {item['type']} · {item['label']}{via}"):
+            for paragraph in item.get("text", []):
+                st.write(paragraph)
+
+
+def render_citations():
+    st.header("🔗 Who Cites This Verse?")
+    reference = st.text_input("Scripture reference", placeholder="e.g. Mosiah 3:19 or Alma 32:21-23")
+    if not reference.strip():
+        return
+    rows = citing(reference)
+    if not rows:
+        st.warning(f"Could not resolve {reference!r} to a verse.")
+        return
+    for label, talks, entries in rows:
+        st.subheader(label)
+        col_talks, col_entries = st.columns(2)
+        col_talks.markdown(f"**Talks ({len(talks)})**")
+        col_talks.markdown("\n".join(f"* {url}" for url in talks[:50]) or "_none_")
+        col_entries.markdown(f"**Topical Guide / Bible Dictionary ({len(entries)})**")
+        col_entries.markdown("\n".join(f"* {source.replace('_', ' ')}: {name}" for source, name in entries) or "_none_")
 
 # --- TAB 1: What are Knowledge Graphs? ---
-with tab1:
+def render_knowledge_graphs():
     st.header("🕸️ What are Knowledge Graphs?")
     st.markdown("""
     Imagine a way to store and connect information not just in rows and columns like a traditional database,
@@ -58,22 +187,15 @@ with tab1:
         * Schema can be more flexible and evolve easily to accommodate new data types or event details.
         """)
     st.info("For network analysis, graphs excel at modeling the intricate web of connections and interactions, making it easier to spot unusual patterns or trace attack paths that might be obscured in tabular data.")
-    # Updated image and parameter
-    st.image("https://sdmntprsouthcentralus.oaiusercontent.com/files/00000000-3690-61f7-bde5-093ee90d3a49/raw?se=2025-05-08T03%3A57%3A45Z&sp=r&sv=2024-08-04&sr=b&scid=bcc6c205-ebc7-5fa1-ab63-6576240ebe2b&skoid=0abefe37-d2bd-4fcb-bc88-32bccbef6f7d&sktid=a48cca56-e6da-484e-a814-9c849652bcb3&skt=2025-05-07T06%3A25%3A43Z&ske=2025-05-08T06%3A25%3A43Z&sks=b&skv=2024-08-04&sig=3Q%2BvbwcKmZj0r8c1glmTQCaahzgjQFqICZCcr6yzRMs%3D", # Example image, original was broken
-             caption="Graph vs. Relational",
-             width=900) # Updated from use_column_width
 
 
 # --- TAB 2: Meet Neo4j ---
-with tab2:
+def render_neo4j():
     st.header("🚀 Meet Neo4j: The Graph Database")
     st.markdown("""
     To build and manage these powerful graphs, we use specialized databases. One of the most popular is **Neo4j**.
     """)
-    col_logo, col_text, col_example_graph = st.columns([1,2,2]) # Added a column for the example graph
-    with col_logo:
-        # Found a working Neo4j logo URL
-        st.image("https://www.eleventhdimensionsolutions.com/wp-content/uploads/2023/04/Neo4j-2.jpg", width=150, caption="Neo4j Logo")
+    col_text, col_example_graph = st.columns([3,2])
     with col_text:
         st.markdown("""
         * **Native Graph Database:** Designed from the ground up to store, manage, and query connected data efficiently.
@@ -82,8 +204,8 @@ with tab2:
         * **Scalable and Performant:** Optimized for graph traversals, crucial for analyzing large and complex networks.
         """)
     with col_example_graph:
-        st.image("https://tbgraph.wordpress.com/wp-content/uploads/2020/04/starwars.png",
-                 caption="Example of a Graph: Nodes and Relationships (Star Wars Graph by TBGraph)",
+        st.image(load_image("graph.png"),
+                 caption="Example of a Graph: Nodes and Relationships",
                  use_container_width=True)
 
 
@@ -101,7 +223,7 @@ RETURN u.username, d.deviceId, r.ip;
     """, language="cypher")
 
 # --- TAB 3: Building Our Network Graph ---
-with tab3:
+def render_building():
     st.header("💻 Building Our Network Graph")
     st.markdown("We'll create nodes for users, devices, servers, and locations, then connect them with interaction relationships.")
 
@@ -171,7 +293,7 @@ MATCH (u:User {username: 'eve_m'}), (d:Device {deviceId: 'unknown_device_77'}),
     st.markdown("**(In Neo4j Browser, this graph would visually show these connections and potential attack paths or policy violations!)**")
 
 # --- TAB 4: Querying for Insights & Anomalies ---
-with tab4:
+def render_querying():
     st.header("🔍 Querying for Insights & Anomalies")
     st.markdown("Let's ask some security-relevant questions using Cypher.")
 
@@ -272,11 +394,59 @@ OPTIONAL MATCH p5 = (eve)-[:OWNS_DEVICE]->(owned_by_eve_device:Device)
 // to render all nodes and relationships within these paths.
 RETURN p1, p2, p3, p4, p5
     """, language="cypher")
-    st.image("graph.png")
+    render_graph_explorer()
+
+
+def _recenter():
+    st.session_state.explorer_node = st.session_state.explorer_pick
+
+
+def render_graph_explorer():
+    st.subheader("Explore the Citation Graph")
+    st.markdown("""
+    The same kind of traversal, run live over the scripture / talk citation graph. Neighbourhoods, sampling and
+    layout are computed on the server; nodes with more neighbours than the cap show a random sample of them.
+    """)
+    col_node, col_hops, col_cap, col_max = st.columns([3, 1, 1, 1])
+    node_text = col_node.text_input("Start from", key="explorer_node",
+                                    placeholder="e.g. Mosiah 3:19, TG Faith or a talk URL")
+    hops = col_hops.number_input("Hops", 1, 3, 1)
+    cap = col_cap.number_input("Neighbours per node", 5, 100, 20, step=5)
+    max_nodes = col_max.number_input("Max nodes", 20, EXPLORER_MAX_NODES, 150, step=10)
+    if not node_text.strip():
+        return
+    sub = explore_subgraph(node_text, int(hops), int(cap), int(max_nodes))
+    if sub is None:
+        st.warning(f"Nothing in the graph matches {node_text!r}.")
+        return
+
+    nodes = pd.DataFrame(sub["nodes"])
+    positions = nodes.set_index("key")[["x", "y"]]
+    edges = pd.DataFrame(sub["edges"], columns=["source", "target", "label"])
+    edges[["x", "y"]] = positions.loc[edges["source"]].to_numpy()
+    edges[["x2", "y2"]] = positions.loc[edges["target"]].to_numpy()
+
+    axis = dict(axis=None, scale=alt.Scale(domain=[-1.1, 1.1]))
+    lines = alt.Chart(edges).mark_rule(opacity=0.25).encode(
+        x=alt.X("x", **axis), y=alt.Y("y", **axis), x2="x2", y2="y2", tooltip=["label"],
+    )
+    points = alt.Chart(nodes).mark_circle(opacity=0.9).encode(
+        x=alt.X("x", **axis), y=alt.Y("y", **axis),
+        color=alt.Color("type", scale=alt.Scale(domain=NODE_TYPES)),
+        size=alt.Size("degree", scale=alt.Scale(type="sqrt", range=[30, 600]), legend=None),
+        tooltip=["label", "type", "degree", "hidden", "hop"],
+    )
+    st.altair_chart((lines + points).properties(height=600).interactive(), use_container_width=True)
+    sampled = " Some neighbours were sampled out." if sub["truncated"] else ""
+    st.caption(f"{len(nodes)} nodes / {len(edges)} edges.{sampled}")
+
+    col_pick, col_go = st.columns([4, 1])
+    col_pick.selectbox("Recenter on", nodes["label"].tolist()[1:], key="explorer_pick")
+    col_go.button("Recenter", on_click=_recenter)
 
 
 # --- TAB 5: Diverse Real-World Use Cases ---
-with tab5:
+def render_use_cases():
     st.header("🌐 Diverse Real-World Use Cases for Knowledge Graphs") # Updated Header
     st.markdown("""
     Knowledge graphs, powered by databases like Neo4j, are incredibly versatile and find applications across a multitude of domains beyond just cybersecurity. Their ability to model, connect, and query complex relationships provides significant value.
@@ -342,12 +512,27 @@ with tab5:
     st.info("""
     **The Core Advantage Across All Domains:** Knowledge graphs excel at making complex, interconnected data understandable and actionable, enabling deeper insights, better predictions, and more informed decisions.
     """)
-    st.balloons()
+
+
+# --- Navigation: only the selected section runs ---
+SECTIONS = {
+    "📖 Search": render_search,
+    "🧭 GraphRAG": render_graphrag,
+    "🔗 Citations": render_citations,
+    "🕸️ What are Knowledge Graphs?": render_knowledge_graphs,
+    "🚀 Meet Neo4j": render_neo4j,
+    "💻 Building Our Network Graph": render_building,
+    "🔍 Querying for Insights & Anomalies": render_querying,
+    "🌐 Diverse Real-World Use Cases": render_use_cases,
+}
+section = st.radio("Section", list(SECTIONS), horizontal=True, label_visibility="collapsed", key="section")
+SECTIONS[section]()
 
 
 st.sidebar.header("About this Demo")
 st.sidebar.info(
-    "This Streamlit application demonstrates how Knowledge Graphs and Neo4j can be used for "
-    "network analysis and a variety of other applications. The Cypher queries shown are for illustrative purposes."
+    "This Streamlit application searches and connects the scraped scriptures, conference talks and "
+    "Topical Guide / Bible Dictionary entries, and shows how Knowledge Graphs and Neo4j can be used for "
+    "network analysis and a variety of other applications. The network Cypher queries are for illustrative purposes."
 )
-
+st.sidebar.caption(f"Rendered in {(time.perf_counter() - render_start) * 1000:.1f} ms")
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+from async_crawler import crawl_conference_talks
+from bench_talk_extract import load_pages
+from fetch_conference_talks import parse_talk_page, scrape_conference_pages, scrape_talk_data, scrape_talk_urls
+
+OVERVIEW = "/study/general-conference?lang=eng"
+COPIES = 4  # each fixture talk is also served under a few extra slugs
+
+
+def _path(url):
+    parsed = urlparse(url)
+    return f"{parsed.path}?{parsed.query}"
+
+
+def _links(paths):
+    return "<html><body>" + "".join(f'<a href="{p}">x</a>' for p in paths) + "</body></html>"
+
+
+def build_site():
+    """Overview -> one direct conference + one decade page -> conferences -> fixture talks."""
+    pages, conferences = {}, {}
+    for url, html in load_pages():
+        path = _path(url)
+        conference = path.rsplit("/", 1)[0] + "?lang=eng"
+        slug, query = path.split("?")
+        copies = [path] + [f"{slug}-{i}?{query}" for i in range(1, COPIES)]
+        conferences.setdefault(conference, []).extend(copies)
+        pages.update((p, html) for p in copies)
+    direct, *by_decade = sorted(conferences)
+    decade = "/study/general-conference/20102019?lang=eng"
+    pages[OVERVIEW] = _links([direct, decade])
+    pages[decade] = _links(by_decade)
+    pages.update((c, _links(talks)) for c, talks in conferences.items())
+    return pages
+
+
+@pytest.fixture
+def site(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1,localhost")
+    pages = build_site()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def expected_talks(base):
+    """Records the fixture pages parse to when served from *base*."""
+    talks = {}
+    for url, html in load_pages():
+        slug, query = _path(url).split("?")
+        for i in range(COPIES):
+            local = f"{base}{slug}{'' if i == 0 else f'-{i}'}?{query}"
+            talks[local] = parse_talk_page(local, html)
+    return talks
+
+
+def test_threaded_scraper_follows_links_on_the_local_host(site):
+    conferences = scrape_conference_pages(site + OVERVIEW)
+    assert len(conferences) == 3
+    assert all(c.startswith(site) for c in conferences)
+
+    talk_urls = sorted(u for c in conferences for u in scrape_talk_urls(c))
+    expected = expected_talks(site)
+    assert talk_urls == sorted(expected)
+    for url in talk_urls[::COPIES]:
+        assert scrape_talk_data(url) == expected[url]
+
+
+def test_async_crawler_scrapes_every_fixture_talk(site):
+    talks = asyncio.run(crawl_conference_talks(site + OVERVIEW, per_host=2, rate=1000))
+    expected = expected_talks(site)
+    assert sorted(t["url"] for t in talks) == sorted(expected)
+    for talk in talks:
+        assert talk == expected[talk["url"]]
+        assert talk["title"]
+
+
+def test_async_crawler_survives_a_failing_sink(site):
+    received = []
+
+    def sink(talk):
+        if talk["url"].endswith("-1?lang=eng"):
+            raise RuntimeError("disk full")
+        received.append(talk["url"])
+
+    # One worker and a queue of four: a worker killed by the sink would leave discovery
+    # blocked on queue.put forever, so the crawl runs in a thread we can give up on
+    crawl = threading.Thread(
+        target=asyncio.run,
+        args=(crawl_conference_talks(site + OVERVIEW, per_host=1, rate=1000, talk_workers=1, sink=sink),),
+        daemon=True,
+    )
+    crawl.start()
+    crawl.join(timeout=60)
+    assert not crawl.is_alive(), "crawl hung after the sink raised"
+    expected = [u for u in expected_talks(site) if not u.endswith("-1?lang=eng")]
+    assert sorted(received) == sorted(expected)
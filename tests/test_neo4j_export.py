@@ -0,0 +1,126 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+import neo4j_export
+from neo4j_export import edge_statement, node_statement, run_batches, unwind_batches, write_import_csvs
+
+TALK_URLS = ["https://example.org/2019/a", "https://example.org/2021/b", "https://example.org/2023/c"]
+
+
+class FakeCorpus:
+    """Two chapters of one book, three verses."""
+
+    books = [{"title": "1 Nephi"}]
+    chapter_book = [0, 0]
+    chapter_first_verse = [0, 2, 3]
+    _text = ["First verse.", "Second verse.", "Third, with a comma."]
+
+    def chapters(self):
+        yield "1nephi", 1, 2
+        yield "1nephi", 2, 1
+
+    def verse_text(self, verse_id):
+        return self._text[verse_id]
+
+
+class FakeGraph:
+    talk_urls = TALK_URLS
+    sizes = {"verse": 3, "talk": 3, "entry": 2}
+    _edges = {
+        "talk_verse": ([0, 1, 1, 2], [0, 1, 2, 2]),
+        "entry_verse": ([0, 1], [1, 2]),
+        "entry_entry": ([0], [1]),
+    }
+
+    def entry(self, entry_id):
+        return [("topical_guide", "Faith"), ("bible_dictionary", "Hope")][entry_id]
+
+    def edges(self, relation):
+        src, dst = self._edges[relation]
+        return np.asarray(src, dtype=np.uint32), np.asarray(dst, dtype=np.uint32)
+
+
+class RecordingSession:
+    def __init__(self):
+        self.calls = []
+
+    def run(self, statement, **params):
+        self.calls.append((statement, params.get("rows")))
+
+
+@pytest.fixture
+def talks_path(tmp_path):
+    path = tmp_path / "talks.jsonl"
+    with path.open("w", encoding="utf-8") as fp:
+        for url, year in zip(TALK_URLS, ("2019", "2021", "2023")):
+            fp.write(json.dumps({"url": url, "speaker": "S", "year": year, "season": "April", "content": []}) + "\n")
+    return path
+
+
+def test_full_load_statements_and_batch_sizes(talks_path):
+    session = RecordingSession()
+    counts = run_batches(session, unwind_batches(FakeCorpus(), FakeGraph(), talks_path, batch_size=2))
+
+    assert counts == {"Verse": 3, "Talk": 3, "Entry": 2, "CITES": 4, "REFERENCES": 2, "SEE_ALSO": 1}
+    schema = [statement for statement, rows in session.calls if rows is None]
+    assert schema == [
+        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Verse) REQUIRE n.id IS UNIQUE",
+        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Talk) REQUIRE n.url IS UNIQUE",
+        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Entry) REQUIRE n.id IS UNIQUE",
+    ]
+    batches = [(statement, rows) for statement, rows in session.calls if rows is not None]
+    assert all(0 < len(rows) <= 2 for _statement, rows in batches)
+    verse_rows = [row for statement, rows in batches if statement == node_statement("Verse") for row in rows]
+    assert [row["ref"] for row in verse_rows] == ["1 Nephi 1:1", "1 Nephi 1:2", "1 Nephi 2:1"]
+
+
+def test_talks_merge_on_url(talks_path):
+    batches = list(unwind_batches(FakeCorpus(), FakeGraph(), talks_path))
+    assert node_statement("Talk") == "UNWIND $rows AS row MERGE (n:Talk {url: row.url}) SET n += row"
+    talk_rows = [row for kind, _statement, rows in batches if kind == "Talk" for row in rows]
+    assert all("id" not in row for row in talk_rows)
+    cites = [row for kind, _statement, rows in batches if kind == "CITES" for row in rows]
+    assert cites[0] == {"s": TALK_URLS[0], "e": 0}
+    assert "MATCH (a:Talk {url: row.s}) MATCH (b:Verse {id: row.e})" in edge_statement("Talk", "CITES", "Verse")
+
+
+def test_since_year_only_sends_new_talks_and_their_citations(talks_path):
+    session = RecordingSession()
+    batches = unwind_batches(FakeCorpus(), FakeGraph(), talks_path, since_year=2021)
+    counts = run_batches(session, batches)
+
+    assert counts == {"Talk": 2, "CITES": 3}
+    rows = {statement: rows for statement, rows in session.calls if rows is not None}
+    assert [row["url"] for row in rows[node_statement("Talk")]] == TALK_URLS[1:]
+    assert rows[edge_statement("Talk", "CITES", "Verse")] == [
+        {"s": TALK_URLS[1], "e": 1}, {"s": TALK_URLS[1], "e": 2}, {"s": TALK_URLS[2], "e": 2},
+    ]
+
+
+def test_import_csvs(tmp_path, talks_path):
+    out = tmp_path / "import"
+    counts = write_import_csvs(FakeCorpus(), FakeGraph(), out, talks_path)
+    assert counts == {
+        "verses.csv": 3, "talks.csv": 3, "entries.csv": 2, "cites.csv": 4, "references.csv": 2, "see_also.csv": 1,
+    }
+
+    def read(name):
+        with (out / name).open(encoding="utf-8", newline="") as fp:
+            return list(csv.reader(fp))
+
+    verses = read("verses.csv")
+    assert verses[0] == neo4j_export.NODE_HEADERS["Verse"]
+    assert verses[3] == ["2", "1 Nephi 2:1", "1nephi", "2", "1", "Third, with a comma."]
+    talks = read("talks.csv")
+    assert talks[0] == [":ID(Talk)", "url", "speaker", "year:int", "season"]
+    assert talks[1] == ["0", TALK_URLS[0], "S", "2019", "April"]
+    assert read("entries.csv")[1:] == [["0", "topical_guide", "Faith"], ["1", "bible_dictionary", "Hope"]]
+    assert read("cites.csv") == [[":START_ID(Talk)", ":END_ID(Verse)"], ["0", "0"], ["1", "1"], ["1", "2"], ["2", "2"]]
+    assert read("see_also.csv")[1:] == [["0", "1"]]
+
+    script = (out / "import.sh").read_text(encoding="utf-8")
+    assert "--id-type=integer" in script
+    assert f"--relationships=CITES={out / 'cites.csv'}" in script